@@ -11,9 +11,40 @@ class Config:
     
     # 系统常量 (PRD 1.3)
     START_DATE = "20150101"
+
+    # Tushare 频次配额 (2000 积分: 每接口 200 次/分钟)
+    TS_CALLS_PER_MIN = int(os.getenv("TS_CALLS_PER_MIN", "200"))
+    TS_BURST = int(os.getenv("TS_BURST", "5"))          # 令牌桶突发容量
+    TS_MAX_WORKERS = int(os.getenv("TS_MAX_WORKERS", "4"))  # 并发抓取线程数
+
+    # Tushare 运行模式: live (在线) / record (在线并录制样本) / replay (离线回放样本)
+    TS_MODE = os.getenv("TS_MODE", "live").lower()
+    TS_FIXTURE_DIR = os.getenv("TS_FIXTURE_DIR", "data/fixtures")
+    TS_REPLAY_LATENCY_MS = int(os.getenv("TS_REPLAY_LATENCY_MS", "0"))      # 回放时模拟的网络延迟
+    TS_REPLAY_CALLS_PER_MIN = int(os.getenv("TS_REPLAY_CALLS_PER_MIN", "0"))  # 回放时模拟的服务端限频 (0=不限)
+
+    # Tushare 本地响应缓存 (压缩 Parquet，历史数据永久缓存)
+    TS_CACHE_ENABLED = os.getenv("TS_CACHE_ENABLED", "1") == "1"
+    TS_CACHE_DIR = os.getenv("TS_CACHE_DIR", "data/ts_cache")
+    TS_CACHE_MAX_MB = int(os.getenv("TS_CACHE_MAX_MB", "2048"))
+
+    # DWS 行情炼制引擎: pandas (面板向量化) / sql (库内窗口函数)
+    DWS_ENGINE = os.getenv("DWS_ENGINE", "pandas").lower()
+    # DWS 并行炼制进程数 (1 = 单进程串行，默认)
+    # 子进程以 fork 方式启动，而 Web 进程内有后台任务/预取线程，fork 可能继承被占用的锁；
+    # 仅建议在命令行批量任务 (run_backfill.py 等) 中显式开启
+    DWS_WORKERS = int(os.getenv("DWS_WORKERS", "1"))
+
+    # DWS 列式镜像 (按年分区的 Parquet，炼制后增量同步，供研究/报表免数据库读取)
+    DWS_MIRROR_ENABLED = os.getenv("DWS_MIRROR_ENABLED", "1") == "1"
+    DWS_MIRROR_DIR = os.getenv("DWS_MIRROR_DIR", "data/dws_mirror")
+
+    # 后台任务队列: 同时运行的任务数上限 / 调度轮询间隔
+    JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
     
     # 完整性检查
-    if not TS_TOKEN:
+    if not TS_TOKEN and TS_MODE != "replay":
         raise ValueError("❌ 错误: 未在 .env 中找到 TS_TOKEN，请检查配置文件。")
     if not DB_URL:
         raise ValueError("❌ 错误: 未在 .env 中找到 DB_URL，请检查配置文件。")
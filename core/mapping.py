@@ -89,11 +89,17 @@ FINANCE_EXTRACT_PIPELINE = {
 # 3. 接口归属映射 (审计系统与 ReportFactory 使用：确定字段来源) [cite: 983]
 SOURCE_TABLE_MAP = {
     "income": ["revenue", "int_income", "n_income_attr_p", "prem_earned", "total_revenue"],
-    "balancesheet": ["total_assets", "total_liab", "money_cap", "goodwill", "intan_assets", "contract_liab", "st_borr"],
+    "balancesheet": ["total_assets", "total_liab", "money_cap", "goodwill", "intan_assets", "contract_liab", "st_borr",
+                     "oth_receiv", "prepayment", "total_hldr_eqy_exc_min_int"],
     "cashflow": ["n_cashflow_act", "n_cashflow_fnc_act"],
-    "fina_indicator": ["roe", "debt_to_assets", "grossprofit_margin", "netprofit_margin", "current_ratio", "quick_ratio", "roic"]
+    "fina_indicator": ["roe", "roe_dt", "debt_to_assets", "grossprofit_margin", "netprofit_margin", "current_ratio", "quick_ratio", "roic"]
 }
 
+# 热点字段: ods_finance_report 上的物理列 (写入时从 JSONB 载荷提取)，查询无需解析整份 JSONB
+# 调整 SOURCE_TABLE_MAP 即可增减: init_db 每次对齐已有库的列 (补列并从 data 回填，见 database/migrate.sync_hot_columns)；
+# 移除的字段其列保留但不再写入
+HOT_FINANCE_FIELDS = sorted({f for fields in SOURCE_TABLE_MAP.values() for f in fields})
+
 # 4. 报表类型映射 (用于数据清洗过滤) [cite: 1566, 1604, 1627]
 REPORT_TYPE_MAP = {
     "1": "合并报表",
@@ -0,0 +1,158 @@
+import hashlib
+import io
+import json
+import math
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from sqlalchemy import literal
+from sqlalchemy.dialects import postgresql
+
+# COPY 的 NULL 标记 (与 PostgreSQL 文本格式的默认 NULL 一致)
+COPY_NULL = "\\N"
+
+
+def to_jsonable(value):
+    """JSONB 写入前的规范化 (递归): numpy 标量转为 Python 标量，NaN / ±inf 转为 None"""
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _canonical_numbers(value):
+    """整数值的浮点数统一为整数: JSONB 以 numeric 存储，读回时 1e20 为整数而 5.0 仍为浮点"""
+    if isinstance(value, dict):
+        return {k: _canonical_numbers(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical_numbers(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def content_hash(payload) -> str:
+    """
+    载荷内容哈希 (键排序的规范 JSON 的 md5)，用于变更检测
+    先按 JSONB 写入口径规范化 (to_jsonable)，再统一数值形态，
+    因此写入前的记录与从 JSONB 读回的记录哈希一致
+    """
+    payload = _canonical_numbers(to_jsonable(payload))
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.md5(canonical.encode("utf-8")).hexdigest()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def bulk_upsert(db, model, df: pd.DataFrame, label: str = None, change_column: str = None,
+                quiet: bool = False) -> dict:
+    """
+    批量 Upsert 写入通道 (替代逐行 session.merge)
+    流程: DataFrame -> COPY 至临时表 -> INSERT ... ON CONFLICT DO UPDATE
+    说明: 复用 db 会话的当前事务，提交时机仍由调用方控制
+    change_column: 变更检测列 (如内容哈希)。指定时仅当该列变化才更新，
+                   并在 stats 中返回 inserted / updated / skipped 及变更行主键 changed
+    quiet: 不打印写入日志 (进度日志等高频小批量写入)
+    """
+    table = model.__table__
+    name = label or table.name
+    stats = {"table": name, "rows": 0, "seconds": 0.0, "rps": 0.0}
+    if change_column:
+        stats.update(inserted=0, updated=0, skipped=0, changed=[])
+    if df is None or df.empty:
+        return stats
+
+    start = time.perf_counter()
+
+    # 1. 只保留目标表存在的列，并按主键去重 (ON CONFLICT 不允许同批次重复主键)
+    cols = [c.name for c in table.columns if c.name in df.columns]
+    pk_cols = [c.name for c in table.primary_key.columns]
+    missing_pk = [c for c in pk_cols if c not in cols]
+    if missing_pk:
+        raise ValueError(f"bulk_upsert({name}): DataFrame 缺少主键列 {missing_pk}")
+
+    frame = df[cols].drop_duplicates(subset=pk_cols, keep='last')
+
+    # 2. JSONB 列序列化 (与 content_hash 同一规范化)，NaN 统一转换为 None (COPY 中写为 NULL 标记)
+    frame = frame.astype(object).where(pd.notnull(frame), None)
+    for col in table.columns:
+        if col.name in cols and isinstance(col.type, postgresql.JSONB):
+            frame[col.name] = frame[col.name].map(
+                lambda v: json.dumps(to_jsonable(v), ensure_ascii=False, default=str) if v is not None else None
+            )
+
+    # 3. 未提供的列：补齐模型中声明的默认值 (如 update_flag=func.now())
+    defaults = {}
+    for col in table.columns:
+        if col.name in cols or col.default is None:
+            continue
+        if col.default.is_scalar:
+            expr = literal(col.default.arg, type_=col.type)
+        elif col.default.is_clause_element:
+            expr = col.default.arg
+        else:
+            continue
+        defaults[col.name] = str(expr.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    # CSV 中未加引号的空字段默认按 NULL 读入，会把空字符串写成 NULL；
+    # 改用显式 NULL 标记，空字符串原样落地
+    buf = io.StringIO()
+    frame.to_csv(buf, index=False, header=False, na_rep=COPY_NULL)
+    buf.seek(0)
+
+    tmp = f"tmp_{table.name}_{uuid.uuid4().hex[:8]}"
+    col_sql = ", ".join(_quote(c) for c in cols)
+    insert_cols = cols + list(defaults)
+    select_sql = ", ".join([_quote(c) for c in cols] + list(defaults.values()))
+    update_cols = [c for c in cols if c not in pk_cols]
+    if update_cols:
+        conflict_sql = "DO UPDATE SET " + ", ".join(f"{_quote(c)} = EXCLUDED.{_quote(c)}" for c in update_cols)
+        if change_column:
+            conflict_sql += (f" WHERE {_quote(table.name)}.{_quote(change_column)} "
+                             f"IS DISTINCT FROM EXCLUDED.{_quote(change_column)}")
+    else:
+        conflict_sql = "DO NOTHING"
+    # xmax = 0 表示本次新插入的行；被 WHERE 拦下的未变行不会出现在 RETURNING 中
+    returning_sql = ""
+    if change_column:
+        returning_sql = " RETURNING (xmax = 0) AS inserted, " + ", ".join(_quote(c) for c in pk_cols)
+
+    # 4. 借用会话底层 psycopg2 连接执行 COPY
+    raw = db.connection().connection
+    with raw.cursor() as cur:
+        cur.execute(
+            f"CREATE TEMP TABLE {tmp} AS "
+            f"SELECT {col_sql} FROM {_quote(table.name)} WITH NO DATA"
+        )
+        cur.copy_expert(f"COPY {tmp} ({col_sql}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buf)
+        cur.execute(
+            f"INSERT INTO {_quote(table.name)} ({', '.join(_quote(c) for c in insert_cols)}) "
+            f"SELECT {select_sql} FROM {tmp} "
+            f"ON CONFLICT ({', '.join(_quote(c) for c in pk_cols)}) {conflict_sql}{returning_sql}"
+        )
+        if change_column:
+            returned = cur.fetchall()
+            stats["inserted"] = sum(1 for r in returned if r[0])
+            stats["updated"] = len(returned) - stats["inserted"]
+            stats["skipped"] = len(frame) - len(returned)
+            stats["changed"] = [dict(zip(pk_cols, r[1:])) for r in returned]
+        cur.execute(f"DROP TABLE {tmp}")  # 出错时随事务回滚一并撤销，无需 ON COMMIT DROP
+
+    elapsed = time.perf_counter() - start
+    stats["rows"] = len(frame)
+    stats["seconds"] = elapsed
+    stats["rps"] = len(frame) / elapsed if elapsed > 0 else 0.0
+    detail = ""
+    if change_column:
+        detail = f" [新增 {stats['inserted']} / 更新 {stats['updated']} / 未变 {stats['skipped']}]"
+    if not quiet:
+        print(f"  ⚡ BulkUpsert {name}: {stats['rows']} 行{detail}, {elapsed:.2f}s ({stats['rps']:.0f} rows/s)")
+    return stats
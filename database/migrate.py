@@ -0,0 +1,302 @@
+# FILE PATH: database/migrate.py
+import time
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database.models import engine as default_engine, Base, SchemaVersion, ODSFinanceReport
+from database.bulk_writer import bulk_upsert, content_hash
+from database.partitions import PARTITIONED_TABLES, is_partitioned
+from core.mapping import HOT_FINANCE_FIELDS
+
+# 版本化结构迁移 (替代 drop_all 重建)
+# 约定: 每个迁移必须幂等 (先检查再变更)，中途失败后重跑不会出错；
+#       新增的表由 init_db 的 create_all 创建，这里只处理已有表的变更
+
+MIGRATIONS = []  # (version, description, fn)
+# 离线迁移: version -> needed(bind)，返回待处理对象 (为空表示无需变更)
+# 这类迁移会长时间锁表，init_db 自动执行时遇到待处理对象即暂停，
+# 需停止同步任务后通过 tools/migrate_db.py --offline 显式执行
+OFFLINE_MIGRATIONS = {}
+
+MIGRATE_LOCK = 7_310_002  # pg_advisory_lock 键: 同一时刻只允许一个进程执行迁移
+BACKFILL_BATCH = 5000
+
+
+def migration(version: int, description: str):
+    """注册迁移步骤: fn(engine) -> 可选的说明文字"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def offline_migration(version: int, description: str, needed):
+    """注册离线迁移步骤 (needed 见 OFFLINE_MIGRATIONS)"""
+    def register(fn):
+        OFFLINE_MIGRATIONS[version] = needed
+        return migration(version, description)(fn)
+    return register
+
+
+# --- 工具函数 ---
+
+def _table_exists(conn, table_name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": table_name}).scalar()
+
+
+def _columns(conn, table_name: str) -> list:
+    return [r[0] for r in conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :name
+        ORDER BY ordinal_position
+    """), {"name": table_name})]
+
+
+def _index_state(conn, index_name: str):
+    """返回 None (不存在) / True (可用) / False (CONCURRENTLY 中断遗留的无效索引)"""
+    return conn.execute(text("""
+        SELECT i.indisvalid FROM pg_index i
+        WHERE i.indexrelid = to_regclass(:name)
+    """), {"name": index_name}).scalar()
+
+
+def create_index_concurrently(bind, index):
+    """
+    在线建索引: CREATE INDEX CONCURRENTLY 不阻塞读写，但不能在事务内执行，故使用 AUTOCOMMIT 连接
+    上次中断遗留的无效索引先删除再重建
+    """
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        state = _index_state(conn, index.name)
+        if state is True:
+            return False
+        if state is False:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+        cols = ", ".join(f'"{c.name}"' for c in index.columns)
+        conn.execute(text(f'CREATE INDEX CONCURRENTLY "{index.name}" ON "{index.table.name}" ({cols})'))
+        return True
+
+
+def _backfill_finance(bind, where: str, fill) -> int:
+    """
+    按主键顺序分批回填 ods_finance_report (键集分页，每批独立提交)
+    where 限定待回填的行，fill(data 列) -> {列名: 值序列}
+    """
+    pk = ["ts_code", "end_date", "report_type", "update_flag", "category"]
+    pk_sql = ", ".join(pk)
+    select_sql = text(f"""
+        SELECT {pk_sql}, data FROM ods_finance_report
+        WHERE ({pk_sql}) > (:ts_code, :end_date, :report_type, :update_flag, :category)
+          AND ({where})
+        ORDER BY {pk_sql}
+        LIMIT :n
+    """)
+    last = dict.fromkeys(pk, "")
+    filled = 0
+    db = Session(bind=bind)
+    try:
+        while True:
+            batch = pd.read_sql(select_sql, db.connection(), params={**last, "n": BACKFILL_BATCH})
+            if batch.empty:
+                break
+            last = batch.iloc[-1][pk].to_dict()
+            rows = batch[pk].assign(**fill(batch["data"]))
+            bulk_upsert(db, ODSFinanceReport, rows, label="ods_finance_report[backfill]")
+            db.commit()
+            filled += len(rows)
+    finally:
+        db.close()
+    return filled
+
+
+# --- 迁移步骤 ---
+
+@migration(1, "dws_market_indicators: 后复权列 (adj_factor / close_hfq)")
+def _hfq_columns(bind):
+    with bind.begin() as conn:
+        if not _table_exists(conn, "dws_market_indicators"):
+            return None
+        conn.execute(text("ALTER TABLE dws_market_indicators ADD COLUMN IF NOT EXISTS adj_factor DOUBLE PRECISION"))
+        conn.execute(text("ALTER TABLE dws_market_indicators ADD COLUMN IF NOT EXISTS close_hfq DOUBLE PRECISION"))
+    # 旧行 adj_factor 为空，增量炼制的复权因子校验不通过，会自动整段重算；
+    # 旧的 close_qfq 列保留 (不再写入)，避免重算完成前丢失前复权数据
+    return "旧口径行将在下次炼制时自动全量重算"
+
+
+def _hot_columns_pending(conn) -> list:
+    """
+    尚未就绪的热点字段: 列缺失，或列上还没有注释 (注释在回填完成后写入，作为完成标记)
+    新库由 create_all 建列并写入注释，为空
+    """
+    described = dict(conn.execute(text("""
+        SELECT a.attname, col_description(a.attrelid, a.attnum) FROM pg_attribute a
+        WHERE a.attrelid = to_regclass('ods_finance_report') AND a.attnum > 0 AND NOT a.attisdropped
+    """)).fetchall())
+    return [f for f in HOT_FINANCE_FIELDS if described.get(f) is None]
+
+
+def sync_hot_columns(bind):
+    """
+    热点字段列与 HOT_FINANCE_FIELDS 对齐 (每次 init_db 都执行，非版本化):
+    补建缺失的列，并对 列为空 且 data 中有该键 的行按批回填；全部回填后写入列注释
+    从 HOT_FINANCE_FIELDS 移除的字段，其列保留但不再写入
+    """
+    with bind.begin() as conn:
+        if not _table_exists(conn, "ods_finance_report"):
+            return None
+        pending = _hot_columns_pending(conn)
+        if not pending:
+            return None
+        for field in pending:
+            conn.execute(text(f'ALTER TABLE ods_finance_report ADD COLUMN IF NOT EXISTS "{field}" DOUBLE PRECISION'))
+
+    def fill(data):
+        return {f: data.map(lambda d, f=f: (d or {}).get(f)) for f in pending}
+    where = " OR ".join(f"(\"{f}\" IS NULL AND data ? '{f}')" for f in pending)
+    filled = _backfill_finance(bind, where, fill)
+
+    columns = ODSFinanceReport.__table__.columns
+    with bind.begin() as conn:
+        for field in pending:
+            conn.execute(text(f'COMMENT ON COLUMN ods_finance_report."{field}" IS :c'), {"c": columns[field].comment})
+    names = ", ".join(pending[:5]) + (" ..." if len(pending) > 5 else "")
+    return f"{len(pending)} 列 ({names})，已回填 {filled} 行"
+
+
+@migration(2, "ods_finance_report: 热点字段物理列，按批从 data 回填")
+def _finance_hot_columns(bind):
+    # 之后字段集合的增减由 run_migrations 每次调用 sync_hot_columns 完成
+    return sync_hot_columns(bind)
+
+
+@migration(3, "ods_finance_report: 复合索引 (ts_code, report_type, end_date)，CONCURRENTLY 在线创建")
+def _finance_index(bind):
+    with bind.connect() as conn:
+        if not _table_exists(conn, "ods_finance_report"):
+            return None
+    created = 0
+    for index in ODSFinanceReport.__table__.indexes:
+        created += create_index_concurrently(bind, index)
+    return f"新建索引 {created} 个"
+
+
+@migration(4, "ods_finance_report: payload_hash 内容哈希列，按批回填")
+def _finance_payload_hash(bind):
+    with bind.begin() as conn:
+        if not _table_exists(conn, "ods_finance_report"):
+            return None
+        conn.execute(text("ALTER TABLE ods_finance_report ADD COLUMN IF NOT EXISTS payload_hash VARCHAR(32)"))
+
+    # 只选哈希为空的行: 中断后重跑从未回填的行继续
+    def fill(data):
+        return {"payload_hash": data.map(content_hash)}
+    return f"已回填 {_backfill_finance(bind, 'payload_hash IS NULL', fill)} 行"
+
+
+def convert_to_partitioned(conn, table_name: str):
+    """
+    普通表 -> 按年分区表: 改名旧表 -> 按模型新建分区表 (含年度分区) -> 整表复制 -> 删除旧表
+    在同一事务中完成，失败即回滚到原状；期间旧表被锁，只作为离线迁移执行
+    """
+    legacy = f"{table_name}_legacy"
+    conn.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{legacy}"'))
+    # 主键/索引名在 schema 内全局唯一，先让出给新表
+    for (index_name,) in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :t"
+    ), {"t": legacy}).fetchall():
+        conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+
+    Base.metadata.tables[table_name].create(conn)  # after_create 监听器创建年度分区
+    old_cols = set(_columns(conn, legacy))
+    cols = ", ".join(f'"{c}"' for c in _columns(conn, table_name) if c in old_cols)
+    moved = conn.execute(text(f'INSERT INTO "{table_name}" ({cols}) SELECT {cols} FROM "{legacy}"')).rowcount
+    conn.execute(text(f'DROP TABLE "{legacy}"'))
+    return moved
+
+
+def _unpartitioned_tables(bind) -> list:
+    """尚未转换为分区表的行情表 (新库由 create_all 直接按分区建表，为空)"""
+    with bind.connect() as conn:
+        return [t for t in PARTITIONED_TABLES if _table_exists(conn, t) and not is_partitioned(conn, t)]
+
+
+def _unrefined_market_rows(conn) -> int:
+    """dws_market_indicators 中仍为旧口径的行数 (只有迁移 1 保留的 close_qfq，尚未重算出 close_hfq)"""
+    if "close_qfq" not in _columns(conn, "dws_market_indicators"):
+        return 0
+    return conn.execute(text(
+        "SELECT count(*) FROM dws_market_indicators WHERE close_hfq IS NULL AND close_qfq IS NOT NULL"
+    )).scalar()
+
+
+@offline_migration(5, "行情表转换为按交易年份分区", needed=_unpartitioned_tables)
+def _partition_market_tables(bind):
+    converted = []
+    for table_name in PARTITIONED_TABLES:
+        with bind.begin() as conn:
+            if not _table_exists(conn, table_name) or is_partitioned(conn, table_name):
+                continue
+            # 按模型重建会丢弃 close_qfq，旧口径行重算完成前不转换 (已转换的表保留，重跑时跳过)
+            unrefined = _unrefined_market_rows(conn) if table_name == "dws_market_indicators" else 0
+            if unrefined:
+                raise RuntimeError(f"dws_market_indicators 尚有 {unrefined} 行旧口径数据未重算，"
+                                   f"请先运行一次行情炼制 (DWS 重算) 后再执行离线迁移")
+            moved = convert_to_partitioned(conn, table_name)
+        converted.append(f"{table_name} ({moved} 行)")
+    return "已转换: " + ", ".join(converted) if converted else None
+
+
+# --- 执行入口 ---
+
+def applied_versions(bind=None) -> set:
+    bind = bind or default_engine
+    with bind.connect() as conn:
+        if not _table_exists(conn, SchemaVersion.__tablename__):
+            return set()
+        return {r[0] for r in conn.execute(text("SELECT version FROM schema_version"))}
+
+
+def pending_migrations(bind=None) -> list:
+    done = applied_versions(bind)
+    return [m for m in sorted(MIGRATIONS) if m[0] not in done]
+
+
+def run_migrations(bind=None, offline: bool = False):
+    """
+    按版本顺序执行未应用的迁移 (生成器，逐步返回进度)
+    以会话级咨询锁串行化，避免多个进程同时迁移
+    offline=False (init_db 自动执行) 时遇到有待处理对象的离线迁移即停止，其后的迁移留待离线执行
+    版本化迁移之后每次都校正热点字段列 (sync_hot_columns)
+    """
+    bind = bind or default_engine
+    SchemaVersion.__table__.create(bind, checkfirst=True)
+    # 锁连接使用 AUTOCOMMIT: 不持有事务，避免 CREATE INDEX CONCURRENTLY 等待自身
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATE_LOCK})
+        try:
+            pending = pending_migrations(bind)  # 拿到锁后再读，其他进程可能刚完成迁移
+            applied = 0
+            for version, description, fn in pending:
+                needed = OFFLINE_MIGRATIONS.get(version)
+                todo = needed(bind) if needed and not offline else None
+                if todo:
+                    yield (f"⏸️ 迁移 #{version}: {description} 需离线执行 (待处理: {', '.join(todo)})，"
+                           f"请停止同步任务后运行 python tools/migrate_db.py --offline")
+                    break
+                yield f"🔧 迁移 #{version}: {description} ..."
+                start = time.perf_counter()
+                note = fn(bind)
+                elapsed = time.perf_counter() - start
+                with bind.begin() as conn:
+                    conn.execute(SchemaVersion.__table__.insert().values(
+                        version=version, description=description, duration=elapsed))
+                yield f"   ✔ 完成 ({elapsed:.1f}s){'，' + note if note else ''}"
+                applied += 1
+            note = sync_hot_columns(bind)
+            if note:
+                yield f"🔧 热点字段列已对齐 HOT_FINANCE_FIELDS: {note}"
+            if applied:
+                yield f"✅ 已应用 {applied} 个迁移。"
+            elif not pending and not note:
+                yield "✅ 数据库结构已是最新版本。"
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATE_LOCK})
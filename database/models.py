@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, Float, Boolean, DateTime, Integer, Text, PrimaryKeyConstraint, func
+from sqlalchemy import Column, String, Float, Boolean, DateTime, Integer, Text, PrimaryKeyConstraint, Index, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from sqlalchemy import create_engine
 from datetime import datetime
 from core.config import settings
+from core.mapping import HOT_FINANCE_FIELDS
+from database.partitions import partition_by_year
 
 # 1. 数据库连接引擎
 engine = create_engine(settings.DB_URL)
@@ -14,6 +16,9 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 class Base(DeclarativeBase):
     pass
 
+# 行情类大表按交易年份 RANGE 分区 (database/partitions.py 负责创建年度分区)
+YEAR_PARTITIONED = {"postgresql_partition_by": "RANGE (trade_date)"}
+
 # --- Meta Data Layer (基础信息) ---
 
 class StockBasic(Base):
@@ -66,6 +71,8 @@ class ODSMarketDaily(Base):
     vol = Column(Float, comment="成交量(手)")
     amount = Column(Float, comment="成交额(千元)")
 
+    __table_args__ = YEAR_PARTITIONED
+
 class ODSAdjFactor(Base):
     """
     复权因子 (PRD 2.1)
@@ -76,6 +83,8 @@ class ODSAdjFactor(Base):
     trade_date = Column(String(8), primary_key=True)
     adj_factor = Column(Float)
 
+    __table_args__ = YEAR_PARTITIONED
+
 class ODSDailyBasic(Base):
     """ODS: 每日指标原始表 (PE/PB/换手率/总市值)"""
     __tablename__ = 'ods_daily_basic'
@@ -88,6 +97,8 @@ class ODSDailyBasic(Base):
     total_mv = Column(Float) # 总市值
     update_flag = Column(DateTime, default=func.now())
 
+    __table_args__ = YEAR_PARTITIONED
+
 class ODSFinanceReport(Base):
     """
     通用财务报表存储 (PRD 4.2)
@@ -106,13 +117,26 @@ class ODSFinanceReport(Base):
     
     # 核心字段
     data = Column(JSONB, comment="原始财务数据JSON")
+    payload_hash = Column(String(32), comment="data 内容哈希 (变更检测，未变的行跳过写入)")
+
+    __table_args__ = (
+        # 炼制 / 审计 / 研究查询的主访问路径: 某只股票的合并报表按报告期扫描
+        Index("ix_ods_finance_code_type_end", "ts_code", "report_type", "end_date"),
+    )
+
+# 热点字段物理列 (HOT_FINANCE_FIELDS)，由写入通道填充，与 data 中的同名键一致
+# 已有库的列由 init_db 对齐 (database/migrate.sync_hot_columns)，列注释兼作回填完成标记，勿手工清除
+for _field in HOT_FINANCE_FIELDS:
+    setattr(ODSFinanceReport, _field, Column(_field, Float, comment=f"热点字段 (data->>'{_field}')"))
 
 # --- DWS Layer (标准服务层 - Strict Logic) ---
 
 class DWSMarketIndicators(Base):
     """
     市场衍生指标表 (PRD 2.2)
-    包含: 复权后均线, PE/PB/市值
+    包含: 后复权价与均线, PE/PB/市值
+    说明: 价格与均线均为后复权 (HFQ) 口径，写入后不随除权除息改写；
+          前复权 = HFQ / 该股最新复权因子，由读取方换算
     """
     __tablename__ = "dws_market_indicators"
 
@@ -125,14 +149,20 @@ class DWSMarketIndicators(Base):
     total_mv = Column(Float, comment="总市值")
     turnover_rate = Column(Float, comment="换手率")
     
-    # 计算指标 (基于 QFQ)
-    close_qfq = Column(Float, comment="前复权收盘价")
-    ma_20 = Column(Float, comment="20日均线")
-    ma_50 = Column(Float, comment="50日均线")
-    ma_120 = Column(Float, comment="120日均线")
-    ma_250 = Column(Float, comment="250日均线 (年线)")
+    # 计算指标 (基于 HFQ)
+    adj_factor = Column(Float, comment="当日复权因子 (前向填充)")
+    close_hfq = Column(Float, comment="后复权收盘价")
+    ma_20 = Column(Float, comment="20日均线 (后复权)")
+    ma_50 = Column(Float, comment="50日均线 (后复权)")
+    ma_120 = Column(Float, comment="120日均线 (后复权)")
+    ma_250 = Column(Float, comment="250日均线 (年线, 后复权)")
     # PRD 3.1 容错: 行数<850时，ma_850为NULL
-    ma_850 = Column(Float, comment="850日均线 (三年线)")
+    ma_850 = Column(Float, comment="850日均线 (三年线, 后复权)")
+
+    __table_args__ = YEAR_PARTITIONED
+
+for _model in (ODSMarketDaily, ODSAdjFactor, ODSDailyBasic, DWSMarketIndicators):
+    partition_by_year(_model.__table__)
 
 class DWSFinanceStd(Base):
     """
@@ -173,7 +203,111 @@ class DWSFinanceStd(Base):
     total_assets = Column(Float, comment="资产总计")
     total_hldr_eqy_exc_min_int = Column(Float, comment="归母净资产")
 
+# --- ADS Layer (应用快照层) ---
+
+class RadarSnapshot(Base):
+    """
+    选股雷达快照 (PRD 3.2)
+    每只股票一行: 最新交易日行情 + 最近报告期财务 + 审计因子预先关联
+    由日更/回溯炼制结束时整体刷新，雷达筛选只扫描本表
+    """
+    __tablename__ = "radar_snapshot"
+
+    ts_code = Column(String(20), primary_key=True)
+    name = Column(String(50), comment="股票名称")
+    industry = Column(String(50), comment="所属行业")
+    is_csi800 = Column(Boolean, default=False, comment="是否中证800")
+
+    # 行情 (最新交易日，价格已换算为前复权)
+    trade_date = Column(String(8), comment="行情日期")
+    pe_ttm = Column(Float, comment="PE(TTM)")
+    pb = Column(Float, comment="市净率")
+    total_mv = Column(Float, comment="总市值")
+    close_qfq = Column(Float, comment="前复权收盘价")
+    ma_20 = Column(Float, comment="20日均线 (前复权)")
+    pct_chg = Column(Float, comment="涨跌幅")
+
+    # 财务与审计因子 (最近报告期)
+    last_report = Column(String(8), comment="最近报告期")
+    roe = Column(Float, comment="ROE")
+    debt_to_assets = Column(Float, comment="资产负债率")
+    ocf_to_net_profit = Column(Float, comment="净现比")
+    toxic_asset_ratio = Column(Float, comment="垃圾资产占比")
+    goodwill_net_asset_ratio = Column(Float, comment="商誉/归母净资产")
+
+    refreshed_at = Column(DateTime, default=datetime.now, comment="快照刷新时间")
+
+# --- Ops Layer (运行状态) ---
+
+class SyncState(Base):
+    """
+    同步进度日志 (断点续跑)
+    粒度: 标的 × 阶段 × 数据集；ts_code='*' 表示按日期推进的全市场水平任务
+    """
+    __tablename__ = "sync_state"
+
+    ts_code = Column(String(20), primary_key=True, comment="TS代码 ('*' = 全市场)")
+    stage = Column(String(20), primary_key=True, comment="阶段: ods / market_dws / finance_dws")
+    dataset = Column(String(30), primary_key=True, comment="数据集: daily / income / dws_finance_std ...")
+    start_date = Column(String(8), comment="本轮同步起点")
+    high_water = Column(String(8), comment="已完成的最新日期 (高水位)")
+    status = Column(String(10), index=True, comment="running / done / failed")
+    message = Column(Text, comment="失败原因")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class FinanceDirty(Base):
+    """
+    财务脏集 (变更日志)
+    ODS 财报写入时登记受影响的 (ts_code, end_date)，财务 DWS 只炼制这些报告期并在完成后清除
+    """
+    __tablename__ = "finance_dirty"
+
+    ts_code = Column(String(20), primary_key=True)
+    end_date = Column(String(8), primary_key=True, comment="报告期")
+    marked_at = Column(DateTime, default=datetime.now, comment="最近一次登记时间")
+
+class Job(Base):
+    """
+    后台任务队列 (控制台提交的同步/炼制任务)
+    状态: queued -> running -> done / failed / cancelled
+    """
+    __tablename__ = "job_queue"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_type = Column(String(50), index=True, comment="DataUpdater 任务方法名")
+    params = Column(JSONB, default=dict, comment="任务参数")
+    priority = Column(Integer, default=0, comment="优先级 (越大越先执行)")
+    exclusive_group = Column(String(30), comment="互斥组: 同组任务同一时刻只运行一个")
+    status = Column(String(12), index=True, default="queued")
+    cancel_requested = Column(Boolean, default=False, comment="协作式取消标记")
+    message = Column(Text, comment="最近一条进度 / 失败原因")
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    heartbeat_at = Column(DateTime, comment="运行中心跳 (用于识别进程退出遗留的任务)")
+    duration = Column(Float, comment="运行耗时 (秒)")
+
+class SchemaVersion(Base):
+    """
+    结构迁移记录 (database/migrate.py)
+    每个已应用的迁移版本一行；init_db 据此只执行未应用的迁移
+    """
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200))
+    applied_at = Column(DateTime, default=datetime.now)
+    duration = Column(Float, comment="执行耗时 (秒)")
+
 # --- 工具函数 ---
-def init_db():
-    """初始化数据库表结构"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def init_db(offline: bool = False):
+    """
+    初始化数据库表结构
+    create_all 只创建缺失的表，已有表的结构变更 (列/索引/分区) 由版本化迁移完成
+    offline=True 时同时执行锁表的离线迁移 (仅 tools/migrate_db.py --offline 使用)
+    """
+    Base.metadata.create_all(bind=engine)
+
+    from database.migrate import run_migrations
+    for message in run_migrations(engine, offline=offline):
+        print(message)
\ No newline at end of file
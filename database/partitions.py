@@ -0,0 +1,97 @@
+# FILE PATH: database/partitions.py
+from datetime import datetime
+from sqlalchemy import event, text
+
+# 按交易年份分区: 每年一个分区 + default 兜底分区
+PARTITION_START_YEAR = 2015
+PARTITION_KEY = "trade_date"
+
+# 已注册的分区表名 (partition_by_year)
+PARTITIONED_TABLES = []
+
+
+def partition_name(table_name: str, year: int) -> str:
+    return f"{table_name}_y{year}"
+
+
+def default_partition_name(table_name: str) -> str:
+    return f"{table_name}_default"
+
+
+def _exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def is_partitioned(conn, name: str) -> bool:
+    return bool(conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)"
+    ), {"name": name}).scalar())
+
+
+def ensure_year_partition(conn, table_name: str, year: int) -> bool:
+    """
+    创建某年的分区 (已存在则跳过)，返回是否新建
+    若 default 分区中已有该年的数据，先建独立表并迁入，再 ATTACH (直接建分区会与 default 冲突)
+    """
+    name = partition_name(table_name, year)
+    if _exists(conn, name):
+        return False
+    lo, hi = f"{year}0101", f"{year + 1}0101"
+    default = default_partition_name(table_name)
+    spill = _exists(conn, default) and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {PARTITION_KEY} >= :lo AND {PARTITION_KEY} < :hi)"
+    ), {"lo": lo, "hi": hi}).scalar()
+
+    if not spill:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table_name} FOR VALUES FROM ('{lo}') TO ('{hi}')"
+        ))
+        return True
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table_name} INCLUDING DEFAULTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE {PARTITION_KEY} >= :lo AND {PARTITION_KEY} < :hi RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"lo": lo, "hi": hi})
+    conn.execute(text(f"ALTER TABLE {table_name} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    return True
+
+
+def ensure_partitions(conn, table_name: str, until_year: int = None, start_year: int = PARTITION_START_YEAR) -> list:
+    """补齐 start_year..until_year (默认明年) 的年度分区及 default 分区，返回新建的分区名"""
+    until_year = until_year or datetime.now().year + 1
+    created = [partition_name(table_name, y) for y in range(start_year, until_year + 1)
+               if ensure_year_partition(conn, table_name, y)]
+    default = default_partition_name(table_name)
+    if not _exists(conn, default):
+        conn.execute(text(f"CREATE TABLE {default} PARTITION OF {table_name} DEFAULT"))
+        created.append(default)
+    return created
+
+
+def partition_by_year(table):
+    """
+    注册按年分区的表: 建表 (create_all) 后自动创建年度分区
+    表本身需在 __table_args__ 中声明 postgresql_partition_by="RANGE (trade_date)"
+    """
+    PARTITIONED_TABLES.append(table.name)
+
+    @event.listens_for(table, "after_create")
+    def _create_partitions(target, connection, **kw):
+        ensure_partitions(connection, target.name)
+
+    return table
+
+
+def ensure_future_partitions(db, years_ahead: int = 1) -> list:
+    """日更入口调用: 为所有分区表预建到 今年+years_ahead 的分区 (跨年前自动就绪)"""
+    until_year = datetime.now().year + years_ahead
+    created = []
+    conn = db.connection()
+    for table_name in PARTITIONED_TABLES:
+        if is_partitioned(conn, table_name):  # 旧库中尚未转换的普通表跳过 (由迁移负责)
+            created += ensure_partitions(conn, table_name, until_year=until_year)
+    db.commit()
+    return created
@@ -0,0 +1,27 @@
+# FILE PATH: engine/adjust.py
+import pandas as pd
+
+# DWS 均线窗口 (最长窗口决定增量炼制需要回看的 K 线数量)
+MA_WINDOWS = [20, 50, 120, 250, 850]
+
+# DWS 中以后复权 (HFQ) 口径存储的价格列
+HFQ_PRICE_COLS = ['close_hfq'] + [f'ma_{ma}' for ma in MA_WINDOWS]
+
+
+def hfq_to_qfq(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    读时换算: 后复权 -> 前复权
+    每只股票只需一个缩放因子 = 该股最新交易日的复权因子
+    close_qfq = close_hfq / latest_factor，均线同理 (最新一天即等于原始收盘价)
+    """
+    if df.empty:
+        return df.assign(close_qfq=pd.Series(dtype=float))
+
+    out = df.copy()
+    latest = out.sort_values('trade_date').groupby('ts_code')['adj_factor'].last()
+    scale = out['ts_code'].map(latest)
+    out['close_qfq'] = out['close_hfq'] / scale
+    for col in HFQ_PRICE_COLS[1:]:
+        if col in out.columns:
+            out[col] = out[col] / scale
+    return out
@@ -0,0 +1,211 @@
+# FILE PATH: engine/dws_mirror.py
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from core.config import settings
+
+# DWS 列式镜像: Postgres DWS 表 -> 按年分目录的 Parquet 数据集 (研究/报表直接读文件，不经数据库)
+# 目录结构: root/<表名>/year=<YYYY>/part-*.parquet，root/_manifest.json 记录各年文件列表与高水位
+# 表名 -> 分年所依据的日期列
+MIRROR_TABLES = {
+    "dws_market_indicators": "trade_date",
+    "dws_finance_std": "end_date",
+}
+
+# 单个年份追加的碎片文件超过该数量时合并为一个文件
+COMPACT_FRAGMENTS = 16
+
+MANIFEST = "_manifest.json"
+
+
+def _year_bounds(year: int):
+    return f"{year}0101", f"{year + 1}0101"
+
+
+class DWSMirror:
+    """
+    镜像写入端 (炼制完成后由 DataUpdater 调用)
+    - append: 只导出高水位之后的新行 (HFQ 口径下历史行不变，日更只需追加)；
+              因子修订导致整只重算的标的，追加后重导其被改写的年份
+    - rebuild: 整年重导 (回溯补入历史 / 财务报告期修订)，同时合并该年碎片
+    文件先写后发布: 新文件落盘 -> 原子替换 manifest -> 删除被替换的旧文件
+    """
+
+    def __init__(self, db, root: str = None):
+        self.db = db
+        self.root = root or settings.DWS_MIRROR_DIR
+
+    # --- manifest ---
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST)
+
+    def load_manifest(self) -> dict:
+        return read_manifest(self.root)
+
+    def _save_manifest(self, manifest: dict):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._manifest_path()
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    # --- 读取与落盘 ---
+
+    def _query(self, table: str, where: str, params: dict) -> pd.DataFrame:
+        key = MIRROR_TABLES[table]
+        sql = text(f"SELECT * FROM {table} WHERE {where} ORDER BY ts_code, {key}")
+        return pd.read_sql(sql, self.db.connection(), params=params)
+
+    def _write(self, table: str, year: int, df: pd.DataFrame, tag: str) -> str:
+        """写入一个文件 (按 ts_code, 日期 排序，行组统计可用于按代码过滤)，返回相对 root 的路径"""
+        rel = os.path.join(table, f"year={year}", f"part-{tag}-{uuid.uuid4().hex[:8]}.parquet")
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, row_group_size=64 * 1024)
+        os.replace(tmp, path)
+        return rel
+
+    def _remove(self, files):
+        for rel in files:
+            try:
+                os.remove(os.path.join(self.root, rel))
+            except FileNotFoundError:
+                pass
+
+    # --- 写入入口 ---
+
+    def rebuild(self, table: str, years=None) -> int:
+        """整年重导 (years 为空时重导库中全部年份)，返回导出行数"""
+        key = MIRROR_TABLES[table]
+        manifest = self.load_manifest()
+        entry = manifest.setdefault(table, {"key": key, "high_water": None, "years": {}})
+        replaced, total = [], 0
+        if years is None:
+            years = [int(r[0]) for r in self.db.execute(text(
+                f"SELECT DISTINCT substr({key}, 1, 4) FROM {table} WHERE {key} IS NOT NULL ORDER BY 1"
+            ))]
+            # 全量重导: 库中已不存在的年份一并移除，高水位重新计算
+            replaced = [f for y, files in entry["years"].items() if int(y) not in years for f in files]
+            entry["years"] = {y: f for y, f in entry["years"].items() if int(y) in years}
+            entry["high_water"] = None
+        for year in sorted(set(years)):
+            lo, hi = _year_bounds(year)
+            df = self._query(table, f"{key} >= :lo AND {key} < :hi", {"lo": lo, "hi": hi})
+            replaced += entry["years"].get(str(year), [])
+            if df.empty:
+                entry["years"].pop(str(year), None)
+                continue
+            entry["years"][str(year)] = [self._write(table, year, df, "full")]
+            entry["high_water"] = max(filter(None, [entry["high_water"], df[key].max()]))
+            total += len(df)
+        entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._save_manifest(manifest)
+        self._remove(replaced)
+        return total
+
+    def append(self, table: str, since: str = None) -> int:
+        """
+        导出高水位之后的新行 (首次导出时整表重导)，返回导出行数
+        since: 该日期及之后的行在炼制时可能被改写 (整只重算的标的)，
+               追加后重导 since 所在年份至原高水位所在年份
+        """
+        key = MIRROR_TABLES[table]
+        manifest = self.load_manifest()
+        entry = manifest.get(table)
+        if not entry or not entry.get("high_water"):
+            return self.rebuild(table)
+
+        high_water = entry["high_water"]
+        rewritten = set(range(int(since[:4]), int(high_water[:4]) + 1)) if since and since <= high_water else set()
+        df = self._query(table, f"{key} > :hw", {"hw": high_water})
+        if df.empty and not rewritten:
+            return 0
+        compact = set()
+        if not df.empty:
+            for year, part in df.groupby(df[key].str[:4]):
+                files = entry["years"].setdefault(year, [])
+                files.append(self._write(table, int(year), part, df[key].max()))
+                if len(files) > COMPACT_FRAGMENTS:
+                    compact.add(int(year))
+            entry["high_water"] = df[key].max()
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save_manifest(manifest)
+        rebuild = sorted(compact | rewritten)
+        return len(df) + (self.rebuild(table, rebuild) if rebuild else 0)
+
+
+# --- 读取端 (不依赖数据库) ---
+
+def read_manifest(root: str = None) -> dict:
+    path = os.path.join(root or settings.DWS_MIRROR_DIR, MANIFEST)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_dws(table: str, columns=None, codes=None, start: str = None, end: str = None,
+             root: str = None) -> pd.DataFrame:
+    """
+    从镜像读取 DWS 面板 (内存映射读取 Parquet)
+    - 按 manifest 只打开 [start, end] 覆盖的年份文件
+    - codes / 日期过滤下推到 Parquet 行组统计，跳过无关数据
+    镜像不存在时返回空 DataFrame (调用方可退回数据库查询)
+    """
+    root = root or settings.DWS_MIRROR_DIR
+    key = MIRROR_TABLES[table]
+    entry = read_manifest(root).get(table)
+    if not entry:
+        return pd.DataFrame(columns=columns)
+
+    files = [
+        os.path.join(root, rel)
+        for year, rels in sorted(entry["years"].items())
+        if (start is None or year >= start[:4]) and (end is None or year <= end[:4])
+        for rel in rels
+    ]
+    filters = []
+    if codes is not None:
+        filters.append(("ts_code", "in", list(codes)))
+    if start:
+        filters.append((key, ">=", start))
+    if end:
+        filters.append((key, "<=", end))
+    read_cols = None if columns is None else list(dict.fromkeys(["ts_code", key, *columns]))
+
+    tables = [pq.read_table(f, columns=read_cols, filters=filters or None, memory_map=True) for f in files]
+    if not tables:
+        return pd.DataFrame(columns=read_cols)
+    return pa.concat_tables(tables).to_pandas()
+
+
+_mirror_lock = threading.Lock()
+
+
+def sync_mirror(db, table: str, rebuild: bool = False, years=None, since: str = None) -> str:
+    """
+    炼制后的镜像同步入口: 默认追加高水位之后的新行 (since 见 DWSMirror.append)；
+    rebuild=True 时重导 years (为空则全部年份)
+    镜像是派生数据，失败不影响主流程，返回进度文字
+    """
+    if not settings.DWS_MIRROR_ENABLED:
+        return None
+    start = time.perf_counter()
+    try:
+        with _mirror_lock:  # 同一进程内的多个任务不同时改写 manifest
+            mirror = DWSMirror(db)
+            rows = mirror.rebuild(table, years) if rebuild else mirror.append(table, since)
+        return f"  🗂️ 列式镜像 {table}: 导出 {rows} 行，耗时 {time.perf_counter() - start:.2f}s"
+    except Exception as e:
+        return f"  ⚠️ 列式镜像 {table} 同步失败 (不影响数据库): {e}"
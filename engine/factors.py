@@ -0,0 +1,93 @@
+# FILE PATH: engine/factors.py
+import numpy as np
+import pandas as pd
+
+# 审计因子库 (PRD V7.4 排雷指标)
+# 财务炼制 / 雷达快照 / 研报导出共用同一套定义，均为列级向量运算
+# 约定: 缺失的会计科目按 0 处理，分母为 0 或缺失时因子取 0
+
+
+def safe_div(num, den, default: float = 0.0) -> np.ndarray:
+    """安全除法: 分母为 0 / 缺失 / 非有限值时返回 default"""
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    valid = np.isfinite(den) & (den != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, num / den, default)
+
+
+def _item(df: pd.DataFrame, col: str) -> np.ndarray:
+    """取会计科目 (缺列或缺值按 0)"""
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return df[col].astype(float).fillna(0).to_numpy()
+
+
+# 因子注册表: 名称 -> (说明, 计算函数 df -> ndarray)
+FACTORS = {}
+
+
+def factor(name: str, description: str):
+    def register(fn):
+        FACTORS[name] = (description, fn)
+        return fn
+    return register
+
+
+@factor("ocf_to_net_profit", "净现比 = 经营现金流 / 归母净利润")
+def ocf_to_net_profit(df):
+    return safe_div(_item(df, 'n_cashflow_act'), _item(df, 'n_income_attr_p'))
+
+
+@factor("toxic_asset_ratio", "垃圾资产占比 = (其他应收 + 预付) / 总资产")
+def toxic_asset_ratio(df):
+    return safe_div(_item(df, 'oth_receiv') + _item(df, 'prepayment'), _item(df, 'total_assets'))
+
+
+@factor("goodwill_net_asset_ratio", "商誉占比 = 商誉 / 归母净资产")
+def goodwill_net_asset_ratio(df):
+    return safe_div(_item(df, 'goodwill'), _item(df, 'total_hldr_eqy_exc_min_int'))
+
+
+@factor("goodwill_to_assets", "商誉占总资产比 = 商誉 / 总资产")
+def goodwill_to_assets(df):
+    return safe_div(_item(df, 'goodwill'), _item(df, 'total_assets'))
+
+
+# DWS 财务宽表 / 雷达快照中存储的审计因子
+AUDIT_FACTORS = ['ocf_to_net_profit', 'toxic_asset_ratio', 'goodwill_net_asset_ratio']
+
+
+def evaluate(df: pd.DataFrame, name: str) -> np.ndarray:
+    """计算单个因子 (不修改 df)"""
+    return FACTORS[name][1](df)
+
+
+def compute_factors(df: pd.DataFrame, names=None, decimals: int = None) -> pd.DataFrame:
+    """按注册表计算因子并写入同名列 (原地修改并返回 df)；decimals 指定时四舍五入"""
+    for name in names or FACTORS:
+        values = evaluate(df, name)
+        df[name] = np.round(values, decimals) if decimals is not None else values
+    return df
+
+
+# 选股理由规则 (按顺序拼接): 标签 -> 命中条件
+REASON_RULES = [
+    # 亮点挖掘
+    ("高ROE(>20%)", lambda df: df['roe'] >= 20),
+    ("现金含量极高", lambda df: df['ocf_to_net_profit'] >= 1.2),
+    # 风险提示
+    ("⚠商誉偏高", lambda df: df['goodwill_net_asset_ratio'] > 0.2),
+    ("⚠资产成色一般", lambda df: df['toxic_asset_ratio'] > 0.04),
+]
+
+
+def selection_reason(df: pd.DataFrame) -> pd.Series:
+    """V7.4 动态理由 (向量化): 逐条规则生成布尔掩码并拼接标签，无命中时为"多因子均衡" """
+    reason = np.full(len(df), "", dtype=object)
+    for label, rule in REASON_RULES:
+        hit = np.asarray(rule(df), dtype=bool)
+        empty = reason == ""
+        reason = np.where(hit & empty, label, np.where(hit, reason + " | " + label, reason))
+    reason = np.where(reason == "", "多因子均衡", reason)
+    return pd.Series(reason, index=df.index, dtype=object)
@@ -0,0 +1,102 @@
+# FILE PATH: engine/finance_sql.py
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from database.models import DWSFinanceStd
+from database.bulk_writer import bulk_upsert
+from core.mapping import HOT_FINANCE_FIELDS
+from engine.factors import AUDIT_FACTORS, compute_factors, safe_div
+
+# 炼制所需的 ODS 财务字段 (跨 income / balancesheet / cashflow / fina_indicator)
+FINANCE_FIELDS = [
+    'revenue', 'n_income_attr_p', 'n_cashflow_act', 'grossprofit_margin',
+    'oth_receiv', 'prepayment', 'goodwill', 'total_assets', 'total_hldr_eqy_exc_min_int',
+    'debt_to_assets', 'roe', 'roe_dt', 'total_liab'
+]
+
+
+def _build_load_sql() -> str:
+    """
+    库内透视: 按 (ts_code, end_date) 跨报表类别合并所需字段
+    热点字段直接读取物理列 (不解析 JSONB)；其余字段经 jsonb_to_record 只解析所需键
+    同一字段多条来源时取最新修订 (update_flag 大者优先)；公告日取该期最早披露日
+    """
+    cold = [f for f in FINANCE_FIELDS if f not in HOT_FINANCE_FIELDS]
+    source = {f: (f"x.{f}" if f in cold else f"r.{f}") for f in FINANCE_FIELDS}
+    pivots = ",\n               ".join(
+        f"(array_agg({src} ORDER BY r.update_flag DESC) FILTER (WHERE {src} IS NOT NULL))[1] AS {f}"
+        for f, src in source.items()
+    )
+    lateral = ""
+    if cold:
+        record_def = ", ".join(f"{f} float8" for f in cold)
+        lateral = f"CROSS JOIN LATERAL jsonb_to_record(r.data) AS x({record_def})"
+    return f"""
+        SELECT r.ts_code, r.end_date, MIN(r.ann_date) AS ann_date,
+               {pivots}
+        FROM ods_finance_report r
+        {lateral}
+        WHERE r.report_type = '1'
+          AND r.ts_code = ANY(:codes)
+          AND (NOT :by_pair OR (r.ts_code, r.end_date) IN (
+                SELECT * FROM unnest(CAST(:pair_codes AS VARCHAR[]), CAST(:pair_dates AS VARCHAR[]))))
+        GROUP BY r.ts_code, r.end_date
+    """
+
+
+class FinanceStdEngine:
+    """
+    DWS 财务宽表炼制引擎
+    字段提取与跨类别合并在 PostgreSQL 内完成 (不再加载整份 JSONB 到 Python)，
+    审计比率在结果帧上向量化计算；可一次处理整个 Universe
+    """
+
+    LOAD_SQL = text(_build_load_sql())
+
+    def __init__(self, db):
+        self.db = db
+
+    def load(self, codes, end_dates: dict = None) -> pd.DataFrame:
+        """end_dates: ts_code -> [报告期]，指定时仅读取这些 (ts_code, end_date)"""
+        pairs = [(c, d) for c, dates in (end_dates or {}).items() for d in dates]
+        params = {
+            "codes": list(codes),
+            "by_pair": bool(end_dates),
+            "pair_codes": [c for c, _ in pairs],
+            "pair_dates": [d for _, d in pairs],
+        }
+        return pd.read_sql(self.LOAD_SQL, self.db.connection(), params=params)
+
+    @staticmethod
+    def compute(df: pd.DataFrame) -> pd.DataFrame:
+        """审计指标 (向量化): 净现比 / 垃圾资产占比 / 商誉占比 / 负债率兜底 / ROE 优先扣非"""
+        # 必须有公告日期才能进行后续的 merge_asof [cite: 847]
+        df = df[df['ann_date'].notna()].copy()
+        if df.empty:
+            return df
+
+        f = {col: df[col].astype(float) for col in FINANCE_FIELDS}
+        zero = {col: s.fillna(0) for col, s in f.items()}
+
+        # 净现比 / 垃圾资产占比 / 商誉占比 (engine/factors.py 统一定义)
+        compute_factors(df, AUDIT_FACTORS, decimals=4)
+
+        # 负债率多路径提取: 缺失时以 负债/资产 兜底
+        fallback = pd.Series(
+            np.where((zero['total_liab'] != 0) & (zero['total_assets'] != 0),
+                     safe_div(zero['total_liab'], zero['total_assets']) * 100, np.nan),
+            index=df.index)
+        df['debt_to_assets'] = f['debt_to_assets'].fillna(fallback)
+
+        # ROE 优先级: 扣非 ROE > ROE
+        df['roe'] = f['roe_dt'].fillna(f['roe'])
+        return df
+
+    def refine(self, codes, end_dates: dict = None) -> pd.DataFrame:
+        """读取 -> 计算 -> 批量写入 (不提交，由调用方与进度日志一起提交)，返回写入的结果帧"""
+        start = time.perf_counter()
+        df = self.compute(self.load(codes, end_dates))
+        bulk_upsert(self.db, DWSFinanceStd, df)
+        df.attrs["seconds"] = time.perf_counter() - start
+        return df
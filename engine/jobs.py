@@ -0,0 +1,253 @@
+# FILE PATH: engine/jobs.py
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import text
+from database.models import SessionLocal, Job
+from engine.task_runner import BackgroundTask
+from core.config import settings
+
+# 任务类型注册表: DataUpdater 方法名 -> 展示名 / 优先级 (越大越先) / 互斥组
+# 所有写 ODS/DWS 的任务同属 writer 组，避免多个写入者同时改同一批表
+JOB_TYPES = {
+    "run_daily_routine": {"label": "一键日更", "priority": 100, "group": "writer"},
+    "sync_stock_list": {"label": "同步 CSI800", "priority": 80, "group": "writer"},
+    "run_watchlist_backfill": {"label": "自选池深度同步", "priority": 50, "group": "writer"},
+    "run_full_backfill": {"label": "核心池全回溯", "priority": 10, "group": "writer"},
+}
+
+ACTIVE_STATES = ("queued", "running")
+
+# 心跳超过该秒数的 running 任务视为进程退出遗留，标记为失败
+STALE_SECONDS = 120
+# 调度器巡检遗留任务的间隔 (秒): 开发模式热重载时旧进程的任务可能在启动后才超时
+RECOVER_SECONDS = 30
+
+
+class JobQueue:
+    """
+    基于 Postgres 的任务队列
+    - 认领时以事务级咨询锁串行化，保证互斥组判断无竞态；FOR UPDATE SKIP LOCKED 避免多调度器重复认领
+    - 同类型同参数的任务已在排队/运行时，重复提交直接返回原任务
+    """
+
+    CLAIM_LOCK = 7_310_001  # pg_advisory_xact_lock 键
+
+    def __init__(self, db=None):
+        self.db = db or SessionLocal()
+
+    def close(self):
+        self.db.close()
+
+    def submit(self, job_type: str, **params):
+        """提交任务，返回 (job_id, 是否新建)"""
+        spec = JOB_TYPES.get(job_type)
+        if spec is None:
+            raise ValueError(f"未知的任务类型: {job_type}")
+        self.db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": self.CLAIM_LOCK})
+        existing = self.db.query(Job).filter(
+            Job.job_type == job_type, Job.status.in_(ACTIVE_STATES), Job.params == params
+        ).first()
+        if existing is not None:
+            self.db.commit()
+            return existing.id, False
+
+        job = Job(job_type=job_type, params=params, priority=spec["priority"],
+                  exclusive_group=spec["group"], status="queued")
+        self.db.add(job)
+        self.db.commit()
+        return job.id, True
+
+    def claim(self):
+        """认领一个可运行的任务 (优先级高者优先，同组已有任务运行时跳过)，无任务返回 None"""
+        self.db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": self.CLAIM_LOCK})
+        row = self.db.execute(text("""
+            WITH cand AS (
+                SELECT id FROM job_queue q
+                WHERE status = 'queued'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM job_queue r
+                      WHERE r.status = 'running' AND r.exclusive_group = q.exclusive_group
+                  )
+                ORDER BY priority DESC, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE job_queue j SET status = 'running', started_at = now(), heartbeat_at = now()
+            FROM cand WHERE j.id = cand.id
+            RETURNING j.id, j.job_type, j.params
+        """)).fetchone()
+        self.db.commit()
+        return row
+
+    def heartbeat(self, job_id: int, message: str = None):
+        self.db.execute(text("""
+            UPDATE job_queue SET heartbeat_at = now(), message = COALESCE(:message, message)
+            WHERE id = :id
+        """), {"id": job_id, "message": message})
+        self.db.commit()
+
+    def finish(self, job_id: int, status: str, message: str = None):
+        self.db.execute(text("""
+            UPDATE job_queue
+            SET status = :status, message = COALESCE(:message, message), finished_at = now(),
+                duration = EXTRACT(EPOCH FROM (now() - started_at))
+            WHERE id = :id
+        """), {"id": job_id, "status": status, "message": message})
+        self.db.commit()
+
+    def request_cancel(self, job_id: int) -> bool:
+        """排队中的任务直接取消；运行中的任务打上取消标记，由调度器在两次进度之间关闭"""
+        row = self.db.execute(text("""
+            UPDATE job_queue
+            SET cancel_requested = TRUE,
+                status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                finished_at = CASE WHEN status = 'queued' THEN now() ELSE finished_at END
+            WHERE id = :id AND status IN ('queued', 'running')
+            RETURNING id
+        """), {"id": job_id}).fetchone()
+        self.db.commit()
+        return row is not None
+
+    def cancel_requested(self, job_ids) -> set:
+        if not job_ids:
+            return set()
+        rows = self.db.execute(text("""
+            SELECT id FROM job_queue WHERE id = ANY(:ids) AND cancel_requested
+        """), {"ids": list(job_ids)}).fetchall()
+        return {r.id for r in rows}
+
+    def recover_stale(self) -> int:
+        """将心跳超时的 running 任务标记为失败 (进程崩溃或重启遗留)"""
+        result = self.db.execute(text("""
+            UPDATE job_queue
+            SET status = 'failed', message = '进程退出，任务中断 (可重新提交，断点续跑)',
+                finished_at = now(), duration = EXTRACT(EPOCH FROM (heartbeat_at - started_at))
+            WHERE status = 'running' AND heartbeat_at < now() - make_interval(secs => :secs)
+        """), {"secs": STALE_SECONDS})
+        self.db.commit()
+        return result.rowcount
+
+    def history(self, limit: int = 20) -> list:
+        """最近任务 (含耗时)，供控制台展示"""
+        jobs = self.db.query(Job).order_by(Job.id.desc()).limit(limit).all()
+        self.db.commit()  # 结束只读事务，下次查询可见其他会话的更新
+        return jobs
+
+
+class JobWorker:
+    """
+    任务调度器 (后台线程)
+    轮询认领任务 -> 以 BackgroundTask 在独立线程执行 -> 转发进度、维护心跳、处理取消与收尾
+    进度消息同时写入内存环形缓冲，供控制台页面按序号增量读取
+    """
+
+    HEARTBEAT_SECONDS = 5
+
+    def __init__(self, concurrency: int = None, poll_seconds: float = None):
+        self.concurrency = concurrency or settings.JOB_CONCURRENCY
+        self.poll_seconds = poll_seconds or settings.JOB_POLL_SECONDS
+        self.running = {}  # job_id -> BackgroundTask
+        self.last_message = {}
+        self.logs = deque(maxlen=2000)  # (seq, job_id, 时间, 消息)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="job-worker", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def log(self, job_id: int, message: str):
+        with self.lock:
+            self.seq += 1
+            self.logs.append((self.seq, job_id, datetime.now(), message))
+        self.last_message[job_id] = message
+
+    def logs_since(self, seq: int) -> list:
+        with self.lock:
+            return [entry for entry in self.logs if entry[0] > seq]
+
+    def _loop(self):
+        jobs = JobQueue()
+        try:
+            last_beat = last_recover = 0.0
+            while not self.stop.is_set():
+                beat = time.monotonic() - last_beat >= self.HEARTBEAT_SECONDS
+                if beat:
+                    last_beat = time.monotonic()
+                recover = time.monotonic() - last_recover >= RECOVER_SECONDS
+                if recover:
+                    last_recover = time.monotonic()
+                try:
+                    self._tick(jobs, beat, recover)
+                except Exception as e:
+                    jobs.db.rollback()
+                    print(f"❌ JobWorker 调度异常: {e}")
+                self.stop.wait(self.poll_seconds)
+        finally:
+            jobs.close()
+
+    def _tick(self, jobs: JobQueue, beat: bool, recover: bool = False):
+        # 0. 巡检遗留任务 (周期执行而非只在启动时: 热重载后旧进程任务的心跳可能尚未超时，
+        #    只查一次会让它永远停在 running，同组任务再也无法被认领)
+        if recover:
+            recovered = jobs.recover_stale()
+            if recovered:
+                print(f"⚠️ JobWorker: {recovered} 个遗留任务已标记为失败")
+
+        # 1. 转发进度
+        for job_id, task in self.running.items():
+            for message in task.drain():
+                self.log(job_id, message)
+
+        # 2. 收尾已结束的任务
+        for job_id, task in list(self.running.items()):
+            if task.running:
+                continue
+            for message in task.drain():
+                self.log(job_id, message)
+            if task.cancelled:
+                status = "cancelled"
+            elif task.error is not None:
+                status = "failed"
+            else:
+                status = "done"
+            jobs.finish(job_id, status, str(task.error) if task.error else self.last_message.get(job_id))
+            self.log(job_id, f"⏱️ 任务结束 [{status}]，耗时 {(task.finished_at - task.started_at).total_seconds():.0f}s")
+            del self.running[job_id]
+            self.last_message.pop(job_id, None)
+
+        # 3. 取消请求与心跳
+        if self.running:
+            for job_id in jobs.cancel_requested(self.running):
+                if not self.running[job_id].cancel_event.is_set():
+                    self.log(job_id, "🛑 收到取消请求，将在当前步骤完成后停止...")
+                    self.running[job_id].cancel()
+            if beat:
+                for job_id in self.running:
+                    jobs.heartbeat(job_id, self.last_message.get(job_id))
+
+        # 4. 认领新任务 (受并发上限约束)
+        while len(self.running) < self.concurrency:
+            job = jobs.claim()
+            if job is None:
+                break
+            label = JOB_TYPES.get(job.job_type, {}).get("label", job.job_type)
+            self.log(job.id, f"🚀 启动任务 #{job.id}: {label}")
+            self.running[job.id] = BackgroundTask(job.job_type, **(job.params or {})).start()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_job_worker() -> JobWorker:
+    """进程内单例调度器 (首次调用时启动)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = JobWorker().start()
+        return _worker
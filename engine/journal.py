@@ -0,0 +1,141 @@
+# FILE PATH: engine/journal.py
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import text
+from database.models import SyncState, FinanceDirty
+from database.bulk_writer import bulk_upsert
+
+# 阶段
+STAGE_ODS = "ods"
+STAGE_MARKET_DWS = "market_dws"
+STAGE_FINANCE_DWS = "finance_dws"
+
+# 垂直同步 (sync_stock_history) 覆盖的 ODS 数据集
+ODS_DATASETS = ["daily", "adj_factor", "daily_basic", "income", "balancesheet", "cashflow", "fina_indicator"]
+
+# 全市场水平任务使用的占位代码
+MARKET_WIDE = "*"
+
+
+class SyncJournal:
+    """
+    sync_state 读写封装
+    写入与业务数据共用同一会话，随业务数据一起提交，保证"数据落地 ⇔ 进度记录"一致
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def mark_many(self, rows: list):
+        """
+        批量记录进度: rows = [{ts_code, stage, dataset, status, high_water?, start_date?, message?}]
+        与已有记录合并: 高水位只前进不后退；已完成记录的起点取更早者 (短窗口增量不覆盖长窗口回溯)
+        """
+        if not rows:
+            return
+        df = pd.DataFrame(rows)
+        for col in ("start_date", "high_water", "message"):
+            if col not in df.columns:
+                df[col] = None
+        df = df.astype(object).where(pd.notnull(df), None)
+
+        existing = self.db.execute(text("""
+            SELECT ts_code, stage, dataset, start_date, high_water, status
+            FROM sync_state
+            WHERE ts_code = ANY(:codes) AND stage = ANY(:stages)
+        """), {"codes": df["ts_code"].unique().tolist(), "stages": df["stage"].unique().tolist()}).fetchall()
+        prev = {(r.ts_code, r.stage, r.dataset): r for r in existing}
+
+        merged = []
+        for row in df.to_dict("records"):
+            old = prev.get((row["ts_code"], row["stage"], row["dataset"]))
+            if old is not None:
+                if row["high_water"] is None or (old.high_water and old.high_water > row["high_water"]):
+                    row["high_water"] = old.high_water
+                if row["start_date"] is None or (
+                        old.status == "done" and old.start_date and old.start_date < row["start_date"]):
+                    row["start_date"] = old.start_date
+            merged.append(row)
+
+        df = pd.DataFrame(merged)
+        df["updated_at"] = datetime.now()
+        bulk_upsert(self.db, SyncState, df, label="sync_state", quiet=True)
+
+    def mark(self, ts_code, stage, dataset, status, high_water=None, start_date=None, message=None):
+        self.mark_many([{
+            "ts_code": ts_code, "stage": stage, "dataset": dataset, "status": status,
+            "high_water": high_water, "start_date": start_date, "message": message,
+        }])
+
+    def high_water(self, ts_code, stage, dataset):
+        """读取某个进度的高水位 (仅统计 done 状态)"""
+        return self.db.execute(text("""
+            SELECT high_water FROM sync_state
+            WHERE ts_code = :ts_code AND stage = :stage AND dataset = :dataset AND status = 'done'
+        """), {"ts_code": ts_code, "stage": stage, "dataset": dataset}).scalar()
+
+    def completed(self, stage, datasets, start_date=None) -> set:
+        """
+        返回在指定阶段"全部数据集均已完成"的标的集合
+        start_date: 仅认可起点不晚于该日期的完成记录 (更早起点的回溯覆盖了更晚起点)
+        """
+        rows = self.db.execute(text("""
+            SELECT ts_code
+            FROM sync_state
+            WHERE stage = :stage AND dataset = ANY(:datasets) AND status = 'done'
+              AND (CAST(:start_date AS VARCHAR) IS NULL OR start_date IS NULL OR start_date <= :start_date)
+            GROUP BY ts_code
+            HAVING COUNT(DISTINCT dataset) = :n
+        """), {"stage": stage, "datasets": list(datasets), "start_date": start_date, "n": len(datasets)}).fetchall()
+        return {r.ts_code for r in rows}
+
+    # --- 财务脏集 ---
+
+    def mark_finance_dirty(self, pairs: pd.DataFrame):
+        """登记受影响的 (ts_code, end_date)，随 ODS 写入同一事务提交"""
+        if pairs is None or pairs.empty:
+            return
+        df = pairs[["ts_code", "end_date"]].dropna().drop_duplicates()
+        df = df.assign(marked_at=datetime.now())
+        bulk_upsert(self.db, FinanceDirty, df, label="finance_dirty", quiet=True)
+
+    def finance_dirty(self, codes=None) -> dict:
+        """读取脏集: ts_code -> [end_date, ...]"""
+        rows = self.db.execute(text("""
+            SELECT ts_code, end_date FROM finance_dirty
+            WHERE CAST(:codes AS VARCHAR[]) IS NULL OR ts_code = ANY(:codes)
+            ORDER BY ts_code, end_date
+        """), {"codes": list(codes) if codes is not None else None}).fetchall()
+        dirty = {}
+        for r in rows:
+            dirty.setdefault(r.ts_code, []).append(r.end_date)
+        return dirty
+
+    def clear_finance_dirty(self, codes, end_dates: dict = None, before=None):
+        """
+        清除已炼制的脏记录 (只清除 before 之前登记的，炼制期间新登记的保留到下一轮)
+        end_dates: ts_code -> [报告期]，为空时清除 codes 的全部脏记录
+        """
+        pairs = [(c, d) for c, dates in (end_dates or {}).items() for d in dates]
+        self.db.execute(text("""
+            DELETE FROM finance_dirty
+            WHERE ts_code = ANY(:codes)
+              AND (NOT :by_pair OR (ts_code, end_date) IN (
+                    SELECT * FROM unnest(CAST(:pair_codes AS VARCHAR[]), CAST(:pair_dates AS VARCHAR[]))))
+              AND (CAST(:before AS TIMESTAMP) IS NULL OR marked_at <= :before)
+        """), {"codes": list(codes), "by_pair": bool(end_dates),
+               "pair_codes": [c for c, _ in pairs], "pair_dates": [d for _, d in pairs], "before": before})
+
+    def prune_finance_dirty(self, codes, before=None) -> int:
+        """
+        清除永远不会被炼制的脏记录，返回清除条数 (同样只清除 before 之前登记的):
+        1. 已移出 Universe 的标的 (日更只读取 Universe 内的脏集)
+        2. 没有合并报表 (report_type='1') 的报告期 (财务 DWS 只炼制合并报表)
+        """
+        return self.db.execute(text("""
+            DELETE FROM finance_dirty d
+            WHERE (CAST(:before AS TIMESTAMP) IS NULL OR d.marked_at <= :before)
+              AND (d.ts_code <> ALL(:codes) OR NOT EXISTS (
+                    SELECT 1 FROM ods_finance_report r
+                    WHERE r.ts_code = d.ts_code AND r.end_date = d.end_date AND r.report_type = '1'))
+        """), {"codes": list(codes), "before": before}).rowcount
@@ -0,0 +1,162 @@
+# FILE PATH: engine/market_panel.py
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from database.models import DWSMarketIndicators
+from database.bulk_writer import bulk_upsert
+from engine.adjust import MA_WINDOWS
+
+# 增量炼制范围 (两个行情炼制引擎共用，见 engine/market_sql.py)，参数 :codes / :incremental / :tail
+#   hw:    每只股票的 DWS 高水位、存储的复权因子、是否有新 K 线，以及尾部窗口起点
+#          (高水位及之前第 :tail 根 K 线的日期，历史不足时为空)
+#   span:  每只股票的 ODS 读取起点 ('' = 整段历史: 全量模式 / 首次炼制 / 因子修订)；
+#          增量模式下无新 K 线的标的不读
+#   base:  ODS 行情 + 每日指标 + 原始复权因子 (raw_factor)，只读 span 起点之后的行；
+#          全体起点的最小值另作常量下界，供分区裁剪与索引范围扫描
+#   scope: 需要参与计算的行 (新 K 线 + 其前 :tail 根)
+SCOPE_CTE = """
+        hw AS (
+            SELECT h.ts_code, h.last_date, h.factor_stored,
+                   -- 高水位当日的 ODS 因子与 DWS 存储值不符 => 因子历史被修订，整只重算
+                   COALESCE(a.adj_factor IS NOT NULL AND a.adj_factor IS DISTINCT FROM h.factor_stored,
+                            FALSE) AS stale,
+                   EXISTS (SELECT 1 FROM ods_market_daily o
+                           WHERE o.ts_code = h.ts_code AND o.trade_date > h.last_date) AS has_new,
+                   t.trade_date AS tail_start
+            FROM (
+                SELECT DISTINCT ON (ts_code) ts_code, trade_date AS last_date, adj_factor AS factor_stored
+                FROM dws_market_indicators
+                WHERE ts_code = ANY(:codes)
+                ORDER BY ts_code, trade_date DESC
+            ) h
+            LEFT JOIN ods_adj_factor a ON a.ts_code = h.ts_code AND a.trade_date = h.last_date
+            LEFT JOIN LATERAL (
+                SELECT o.trade_date FROM ods_market_daily o
+                WHERE o.ts_code = h.ts_code AND o.trade_date <= h.last_date
+                ORDER BY o.trade_date DESC
+                OFFSET (:tail - 1) LIMIT 1
+            ) t ON TRUE
+        ),
+        span AS (
+            SELECT c.ts_code, hw.last_date, COALESCE(hw.stale, FALSE) AS stale,
+                   CASE WHEN NOT :incremental OR hw.last_date IS NULL OR hw.stale THEN ''
+                        ELSE COALESCE(hw.tail_start, '') END AS read_from
+            FROM unnest(CAST(:codes AS varchar[])) AS c(ts_code)
+            LEFT JOIN hw ON hw.ts_code = c.ts_code
+            WHERE NOT :incremental OR hw.last_date IS NULL OR hw.stale OR hw.has_new
+        ),
+        base AS (
+            SELECT m.ts_code, m.trade_date, m.close,
+                   b.pe_ttm, b.pb, b.total_mv, b.turnover_rate, a.adj_factor AS raw_factor,
+                   s.last_date, s.stale,
+                   ROW_NUMBER() OVER w_desc AS rn,
+                   COUNT(*) FILTER (WHERE m.trade_date > s.last_date) OVER w_all AS n_new
+            FROM span s
+            JOIN ods_market_daily m ON m.ts_code = s.ts_code AND m.trade_date >= s.read_from
+            LEFT JOIN ods_daily_basic b ON m.ts_code = b.ts_code AND m.trade_date = b.trade_date
+                 AND b.trade_date >= (SELECT min(read_from) FROM span)
+            LEFT JOIN ods_adj_factor a ON m.ts_code = a.ts_code AND m.trade_date = a.trade_date
+                 AND a.trade_date >= (SELECT min(read_from) FROM span)
+            WHERE m.trade_date >= (SELECT min(read_from) FROM span)
+            WINDOW w_all AS (PARTITION BY m.ts_code),
+                   w_desc AS (PARTITION BY m.ts_code ORDER BY m.trade_date DESC)
+        ),
+        scope AS (
+            SELECT * FROM base
+            WHERE NOT :incremental OR last_date IS NULL OR stale OR (n_new > 0 AND rn <= n_new + :tail)
+        )"""
+
+
+class MarketPanelEngine:
+    """
+    全市场面板炼制引擎 (DWS 行情指标)
+    一次查询载入整个 Universe 的 ODS 行情/复权因子/每日指标，
+    用分组 NumPy 累加和计算 HFQ 均线，最后一次性批量写入
+    """
+
+    # 增量模式: DWS 高水位 + 最近 850 根 K 线的尾部窗口，仅在有新 K 线或需重算时返回
+    LOAD_SQL = text(f"""
+        WITH {SCOPE_CTE}
+        SELECT ts_code, trade_date, close, pe_ttm, pb, total_mv, turnover_rate,
+               raw_factor AS adj_factor, last_date, stale
+        FROM scope
+        ORDER BY ts_code, trade_date
+    """)
+
+    def __init__(self, db):
+        self.db = db
+
+    def load(self, codes, incremental: bool = True) -> pd.DataFrame:
+        """单次往返载入面板 (按 ts_code, trade_date 排序)"""
+        params = {"codes": list(codes), "incremental": incremental, "tail": MA_WINDOWS[-1] - 1}
+        return pd.read_sql(self.LOAD_SQL, self.db.bind, params=params)
+
+    @staticmethod
+    def compute(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        分组向量化计算: 因子组内前向填充 -> HFQ -> 各窗口均线
+        均线用扁平累加和之差实现，窗口跨越股票边界或含缺失值时为 NaN
+        (与 rolling(window=n, min_periods=n) 口径一致)
+        """
+        if df.empty:
+            return df
+
+        df = df.copy()
+        df['adj_factor'] = df.groupby('ts_code', sort=False)['adj_factor'].ffill()
+        df['close_hfq'] = df['close'] * df['adj_factor']
+
+        codes = df['ts_code'].to_numpy()
+        n = len(df)
+        group_start = np.r_[True, codes[1:] != codes[:-1]]
+        starts = np.flatnonzero(group_start)
+        pos = np.arange(n) - starts[np.cumsum(group_start) - 1]  # 组内序号
+
+        values = df['close_hfq'].to_numpy(dtype=float)
+        missing = np.isnan(values)
+        csum = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+        cmiss = np.concatenate(([0], np.cumsum(missing)))
+
+        idx = np.arange(n)
+        for ma in MA_WINDOWS:
+            full = pos >= ma - 1
+            lo = np.where(full, idx - ma + 1, 0)
+            window_sum = csum[idx + 1] - csum[lo]
+            window_miss = cmiss[idx + 1] - cmiss[lo]
+            df[f'ma_{ma}'] = np.where(full & (window_miss == 0), window_sum / ma, np.nan)
+        return df
+
+    @staticmethod
+    def recomputed(df: pd.DataFrame) -> dict:
+        """
+        写入范围覆盖了原高水位 (因子修订整只重算) 或首次炼制的标的: ts_code -> 最早写入日期
+        这些标的的历史行被改写，下游 (列式镜像) 需重导对应年份
+        """
+        if df.empty:
+            return {}
+        per_code = df.groupby('ts_code', sort=False).agg(first=('trade_date', 'min'), last_date=('last_date', 'first'))
+        hit = per_code['last_date'].isna() | (per_code['first'] <= per_code['last_date'].fillna(''))
+        return per_code.loc[hit, 'first'].to_dict()
+
+    def refine(self, codes, incremental: bool = True) -> dict:
+        """载入 -> 计算 -> 单次批量写入；返回统计信息 (recomputed 见 recomputed())"""
+        start = time.perf_counter()
+        codes = list(codes)
+        stats = {"stocks": 0, "rows": 0, "recomputed": {}, "seconds": 0.0}
+        if not codes:
+            return stats
+
+        df = self.compute(self.load(codes, incremental=incremental))
+        if not df.empty and incremental:
+            keep = df['last_date'].isna() | df['stale'] | (df['trade_date'] > df['last_date'])
+            df = df[keep]
+
+        if not df.empty:
+            bulk_upsert(self.db, DWSMarketIndicators, df)
+            self.db.commit()
+
+        stats["stocks"] = len(codes)
+        stats["rows"] = len(df)
+        stats["recomputed"] = self.recomputed(df)
+        stats["seconds"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,89 @@
+# FILE PATH: engine/market_sql.py
+import time
+from sqlalchemy import text
+from database.models import DWSMarketIndicators
+from engine.adjust import MA_WINDOWS
+from engine.market_panel import SCOPE_CTE
+
+
+def _build_refine_sql() -> str:
+    """按 MA_WINDOWS 生成窗口函数炼制语句 (INSERT ... SELECT ... ON CONFLICT，返回逐只写入汇总)"""
+    table = DWSMarketIndicators.__table__
+    pk_cols = [c.name for c in table.primary_key.columns]
+    out_cols = [c.name for c in table.columns]
+    update_cols = [c for c in out_cols if c not in pk_cols]
+
+    ma_exprs = ",\n                ".join(
+        f"CASE WHEN COUNT(close_hfq) OVER w{ma} = {ma} THEN AVG(close_hfq) OVER w{ma} END AS ma_{ma}"
+        for ma in MA_WINDOWS
+    )
+    ma_windows = ",\n                   ".join(
+        f"w{ma} AS (PARTITION BY ts_code ORDER BY trade_date ROWS BETWEEN {ma - 1} PRECEDING AND CURRENT ROW)"
+        for ma in MA_WINDOWS
+    )
+
+    return f"""
+        WITH {SCOPE_CTE},
+        grp AS (
+            -- 复权因子前向填充: 以"截至当前的非空因子个数"分组，组内取唯一非空值
+            SELECT *, COUNT(raw_factor) OVER (PARTITION BY ts_code ORDER BY trade_date) AS factor_grp
+            FROM scope
+        ),
+        hfq AS (
+            SELECT *, close * adj_factor AS close_hfq
+            FROM (
+                SELECT *, MAX(raw_factor) OVER (PARTITION BY ts_code, factor_grp) AS adj_factor
+                FROM grp
+            ) f
+        ),
+        calc AS (
+            SELECT ts_code, trade_date, pe_ttm, pb, total_mv, turnover_rate, adj_factor, close_hfq,
+                last_date, stale,
+                {ma_exprs}
+            FROM hfq
+            WINDOW {ma_windows}
+        ),
+        ins AS (
+            INSERT INTO dws_market_indicators ({", ".join(out_cols)})
+            SELECT {", ".join(out_cols)}
+            FROM calc
+            WHERE NOT :incremental OR last_date IS NULL OR stale OR trade_date > last_date
+            ON CONFLICT ({", ".join(pk_cols)}) DO UPDATE SET
+                {", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)}
+            RETURNING ts_code, trade_date
+        )
+        -- 逐只汇总写入行数与最早写入日期 (hw 为写入前的快照，用于识别整只重算的标的)
+        SELECT ins.ts_code, count(*) AS n, min(ins.trade_date) AS first_date, hw.last_date
+        FROM ins LEFT JOIN hw ON ins.ts_code = hw.ts_code
+        GROUP BY ins.ts_code, hw.last_date
+    """
+
+
+class MarketSqlEngine:
+    """
+    库内窗口函数炼制引擎 (DWS 行情指标)
+    因子前向填充、HFQ 与各窗口均线全部在 PostgreSQL 内完成，数据不出库；
+    增量范围与 MarketPanelEngine 共用 SCOPE_CTE，二者可通过 settings.DWS_ENGINE 互换
+    """
+
+    REFINE_SQL = text(_build_refine_sql())
+
+    def __init__(self, db):
+        self.db = db
+
+    def refine(self, codes, incremental: bool = True) -> dict:
+        start = time.perf_counter()
+        codes = list(codes)
+        stats = {"stocks": len(codes), "rows": 0, "recomputed": {}, "seconds": 0.0}
+        if not codes:
+            return stats
+
+        params = {"codes": codes, "incremental": incremental, "tail": MA_WINDOWS[-1] - 1}
+        written = self.db.execute(self.REFINE_SQL, params).fetchall()
+        self.db.commit()
+
+        stats["rows"] = sum(r.n for r in written)
+        stats["recomputed"] = {r.ts_code: r.first_date for r in written
+                               if r.last_date is None or r.first_date <= r.last_date}
+        stats["seconds"] = time.perf_counter() - start
+        return stats
@@ -0,0 +1,128 @@
+# FILE PATH: engine/parallel.py
+import multiprocessing as mp
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database.models import engine
+
+# 每个进程处理多个小分片，先完成的进程继续领取，避免慢分片拖尾
+CHUNKS_PER_WORKER = 4
+
+
+def _init_worker():
+    """子进程初始化: 丢弃从父进程继承的连接池 (不关闭父进程的连接)，改用各自的新连接"""
+    engine.dispose(close=False)
+
+
+def _refine_codes(updater, task: str, codes: list, incremental: bool, end_dates: dict):
+    """炼制一组标的，返回 (写入行数, 整只重算的标的 -> 最早写入日期)"""
+    if task == "market":
+        result = updater._market_engine().refine(codes, incremental=incremental)
+        updater._mark_market_dws(codes)
+        return result["rows"], result["recomputed"]
+    return updater.refine_finance(codes, end_dates or None), {}
+
+
+def _refine_chunk(task: str, codes: list, incremental: bool, end_dates: dict, progress):
+    """
+    子进程任务: 使用独立的 DataUpdater (独立会话) 炼制一个分片
+    task: market (行情面板) / finance (财务宽表，end_dates 指定时仅炼制对应报告期)
+    整片炼制失败时回滚并逐只重试: 出错的标的逐条上报 ("error")，其余标的照常写入
+    进度消息: (类型, 进程号, 完成只数, 说明)
+    """
+    from engine.updater import DataUpdater
+
+    worker = os.getpid()
+    updater = DataUpdater()
+    start = time.perf_counter()
+    stats = {"stocks": len(codes), "rows": 0, "errors": 0, "recomputed": {}}
+    try:
+        try:
+            stats["rows"], stats["recomputed"] = _refine_codes(updater, task, codes, incremental, end_dates)
+            progress.put(("done", worker, len(codes), None))
+        except Exception:
+            updater.db.rollback()
+            for code in codes:
+                try:
+                    rows, recomputed = _refine_codes(updater, task, [code], incremental,
+                                                     {code: end_dates[code]} if code in end_dates else {})
+                    stats["rows"] += rows
+                    stats["recomputed"].update(recomputed)
+                    progress.put(("done", worker, 1, None))
+                except Exception as e:
+                    updater.db.rollback()
+                    stats["errors"] += 1
+                    progress.put(("error", worker, 1, f"{code} 炼制失败: {e}"))
+    finally:
+        updater.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _chunks(codes: list, n: int) -> list:
+    size = max(1, -(-len(codes) // n))
+    return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+
+def parallel_refine(task: str, codes, workers: int, incremental: bool = True, end_dates: dict = None,
+                    report_every: int = 100):
+    """
+    多进程 DWS 炼制驱动 (生成器)
+    将 Universe 切分给 workers 个进程，各进程独立连接数据库；
+    进度经共享队列汇总后以 yield 消息返回给控制台，最后一条消息之后返回汇总统计
+    """
+    codes = sorted(codes)
+    end_dates = end_dates or {}
+    total = len(codes)
+    chunks = _chunks(codes, workers * CHUNKS_PER_WORKER)
+    summary = {"stocks": total, "rows": 0, "errors": 0, "recomputed": {}, "seconds": 0.0}
+    if not codes:
+        return summary
+
+    start = time.perf_counter()
+    # 不用 spawn/forkserver: 子进程会以 __mp_main__ 重新导入 main.py，触发其中的 ui.run
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context("spawn")
+    with mp.Manager() as manager:
+        progress = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_refine_chunk, task, chunk, incremental,
+                            {c: end_dates[c] for c in chunk if c in end_dates}, progress)
+                for chunk in chunks
+            ]
+
+            done, last_report = 0, 0
+            per_worker = {}  # 进程号 -> 已完成只数 (按首次上报顺序编号)
+            while True:
+                finished = all(f.done() for f in futures)
+                try:
+                    while True:
+                        kind, worker, n, msg = progress.get(timeout=0.2)
+                        if kind == "error":
+                            yield f"  ❌ {msg}"
+                        per_worker[worker] = per_worker.get(worker, 0) + n
+                        done += n
+                except queue.Empty:
+                    pass
+                if done - last_report >= report_every or (done == total and last_report != total):
+                    last_report = done
+                    detail = ", ".join(f"#{i} {n}" for i, n in enumerate(per_worker.values(), 1))
+                    yield f"  > 炼制进度 [{workers} 进程]: {done}/{total} ({detail})"
+                if finished:
+                    break
+
+            for f in futures:
+                try:
+                    stats = f.result()
+                    summary["rows"] += stats["rows"]
+                    summary["errors"] += stats["errors"]
+                    summary["recomputed"].update(stats["recomputed"])
+                except Exception as e:
+                    summary["errors"] += 1
+                    yield f"  ❌ 分片炼制失败: {e}"
+
+    summary["seconds"] = time.perf_counter() - start
+    if summary["errors"]:
+        yield f"  ⚠️ 炼制失败 {summary['errors']} 项 (见上方错误)，下次炼制时重试"
+    return summary
@@ -0,0 +1,78 @@
+# FILE PATH: engine/prefetch.py
+import queue
+import threading
+from interface.tushare_client import ts_client
+
+# 有界队列深度: 写入第 N 天时最多预取到第 N+2 天，长区间补全内存恒定
+PREFETCH_DEPTH = 2
+
+
+def fetch_trade_day(trade_date: str) -> dict:
+    """拉取单个交易日的全市场水平数据 (行情、复权因子、每日指标、财报披露名单)"""
+    return ts_client.fetch_many({
+        "daily": (ts_client.fetch_daily, {"trade_date": trade_date}),
+        "adj_factor": (ts_client.fetch_adj_factor, {"trade_date": trade_date}),
+        "daily_basic": (ts_client.fetch_daily_basic, {"trade_date": trade_date}),
+        "disclosure_date": (ts_client.fetch_disclosure_date, {"actual_date": trade_date}),
+    })
+
+
+class DayPrefetcher:
+    """
+    日更补全流水线 (生产者/消费者)
+    后台线程按顺序预取各交易日数据放入有界队列，主线程写库的同时网络侧继续拉取下一日；
+    所有请求仍经过 ts_client 的令牌桶，不会突破频次配额
+
+    用法:
+        with DayPrefetcher(trade_days) as days:
+            for date_str, frames in days: ...
+    frames 为 {接口: DataFrame}；某日抓取失败时 frames 为该异常对象
+    """
+
+    _DONE = object()
+
+    def __init__(self, trade_days, fetch=fetch_trade_day, depth: int = PREFETCH_DEPTH):
+        self.trade_days = list(trade_days)
+        self.fetch = fetch
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._produce, name="day-prefetch", daemon=True)
+
+    def _put(self, item) -> bool:
+        # 带超时的阻塞写入，便于消费者提前退出时生产者及时停止
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        for date_str in self.trade_days:
+            if self.stop.is_set():
+                return
+            try:
+                frames = self.fetch(date_str)
+            except Exception as e:
+                self._put((date_str, e))
+                break  # 后续日期依赖当日先落地，出错即停止预取
+            if not self._put((date_str, frames)):
+                return
+        self._put(self._DONE)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is self._DONE:
+                return
+            yield item
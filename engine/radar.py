@@ -1,12 +1,170 @@
 # FILE PATH: engine/radar.py
+import threading
+import time
+import numpy as np
 import pandas as pd
-from sqlalchemy import text, func
-from database.models import SessionLocal, StockBasic, DWSMarketIndicators, DWSFinanceStd
+from datetime import datetime
+from sqlalchemy import text
+from database.models import SessionLocal, RadarSnapshot
+from database.bulk_writer import bulk_upsert
+from engine.factors import AUDIT_FACTORS, compute_factors, selection_reason
+
+# 雷达快照构建: Basic(B) -> Indicators(I, 最新交易日) -> ODS 涨跌幅(M) -> Finance(F, 最近报告期)
+# 审计因子不在 SQL 中计算，读取原始科目后由 engine/factors.py 统一计算
+RADAR_SOURCE_SQL = text("""
+    SELECT
+        b.ts_code, b.name, b.industry, b.is_csi800,
+        i.trade_date, i.pe_ttm, i.pb, i.total_mv,
+        -- DWS 存后复权，最新交易日按该日复权因子换算回前复权
+        i.close_hfq / NULLIF(i.adj_factor, 0) as close_qfq,
+        i.ma_20 / NULLIF(i.adj_factor, 0) as ma_20,
+        m.pct_chg,
+        f.end_date as last_report,
+        COALESCE(f.roe, 0) as roe,
+        f.debt_to_assets,
+        -- 审计因子所需的原始科目
+        f.n_cashflow_act, f.n_income_attr_p, f.oth_receiv, f.prepayment,
+        f.total_assets, f.goodwill, f.total_hldr_eqy_exc_min_int
+    FROM stock_basic b
+    JOIN dws_market_indicators i ON b.ts_code = i.ts_code
+    -- 联接 ODS 获取原始涨跌幅
+    JOIN ods_market_daily m ON i.ts_code = m.ts_code AND i.trade_date = m.trade_date
+    LEFT JOIN (
+        SELECT DISTINCT ON (ts_code) *
+        FROM dws_finance_std
+        ORDER BY ts_code, end_date DESC
+    ) f ON b.ts_code = f.ts_code
+    WHERE i.trade_date = (SELECT max(trade_date) FROM dws_market_indicators)
+""")
+
+
+def refresh_radar_snapshot(db) -> int:
+    """
+    重建雷达快照 (不提交，由调用方提交)
+    DELETE + 写入在同一事务内完成，读取方始终看到完整的旧快照或新快照
+    """
+    df = pd.read_sql(RADAR_SOURCE_SQL, db.connection())
+    compute_factors(df, AUDIT_FACTORS)
+    df['refreshed_at'] = datetime.now()
+    db.execute(text("DELETE FROM radar_snapshot"))
+    bulk_upsert(db, RadarSnapshot, df)
+    return len(df)
+
+
+# 快照中参与筛选的数值因子 (加载时填充空值并转为连续的 float64 数组)
+FACTOR_FILLS = {
+    # 将 ROE 缺失填充为 0，负债率缺失填充为 0 (代表风险未知但不拦截)
+    'roe': 0, 'debt_to_assets': 0,
+    'pe_ttm': 999,  # PE 缺失则设为极大值拦截
+    'ocf_to_net_profit': 0, 'toxic_asset_ratio': 0, 'goodwill_net_asset_ratio': 0,
+    'pb': None, 'total_mv': None, 'close_qfq': None, 'ma_20': None,
+}
+
+RADAR_LOAD_SQL = text("""
+    SELECT ts_code, name, industry, trade_date, pe_ttm, pb, total_mv,
+           close_qfq, ma_20, pct_chg, last_report, roe, debt_to_assets,
+           ocf_to_net_profit, toxic_asset_ratio, goodwill_net_asset_ratio,
+           is_csi800, ts_code IN (SELECT ts_code FROM watchlist) AS in_watchlist
+    FROM radar_snapshot
+""")
+
+# 数据版本: 快照刷新时间 + 自选池变化 (自选池决定 Watchlist 范围)
+RADAR_VERSION_SQL = text("""
+    SELECT (SELECT max(refreshed_at) FROM radar_snapshot),
+           (SELECT count(*) FROM radar_snapshot),
+           (SELECT count(*) FROM watchlist),
+           (SELECT max(add_time) FROM watchlist)
+""")
+
+# 版本检查的最小间隔 (秒): 拖动滑块期间不再访问数据库
+VERSION_CHECK_SECONDS = 5.0
+
+
+class RadarFrame:
+    """
+    雷达因子表的内存副本 (只读，所有页面共享)
+    加载时一次性完成: 空值填充 / 理由生成 (向量化) / 格式化 / 按 ROE 降序排列
+    筛选只在连续的 NumPy 数组上做布尔掩码，结果天然有序，无需再排序
+    """
+
+    def __init__(self, df: pd.DataFrame, version):
+        self.version = version
+        df = df.astype({col: float for col in FACTOR_FILLS})  # 空快照时 read_sql 返回 object 列
+        for col, fill in FACTOR_FILLS.items():
+            if fill is not None:
+                df[col] = df[col].fillna(fill)
+
+        display = df.drop(columns=['is_csi800', 'in_watchlist'])
+        display['selection_reason'] = selection_reason(display)
+        # 格式化输出
+        display['total_mv_unit'] = (display['total_mv'] / 10000).round(2)  # 转回亿元显示
+        # 统一保留两位小数
+        numeric_cols = display.select_dtypes(include=['number']).columns
+        display[numeric_cols] = display[numeric_cols].round(2)
+
+        order = np.argsort(-display['roe'].to_numpy(dtype=float), kind='stable')
+        self.display = display.iloc[order].reset_index(drop=True)
+        self.factors = {col: np.ascontiguousarray(df[col].to_numpy(dtype=float)[order]) for col in FACTOR_FILLS}
+        self.pools = {
+            'CSI800': df['is_csi800'].fillna(False).to_numpy(dtype=bool)[order],
+            'Watchlist': df['in_watchlist'].fillna(False).to_numpy(dtype=bool)[order],
+        }
+
+    def __len__(self):
+        return len(self.display)
+
+    def mask(self, min_roe, max_pe, max_pb, min_mv, max_debt, trend_up, pool) -> np.ndarray:
+        f = self.factors
+        with np.errstate(invalid='ignore'):  # NaN 比较结果为 False，即拦截
+            m = (
+                (f['pe_ttm'] > 0) & (f['pe_ttm'] < max_pe) &
+                (f['pb'] < max_pb) &
+                (f['total_mv'] >= min_mv * 10000) &  # 亿元转万元
+                (f['roe'] >= min_roe) &
+                (f['debt_to_assets'] <= max_debt) &
+                (f['ocf_to_net_profit'] >= 0.8) &
+                (f['toxic_asset_ratio'] < 0.05) &
+                (f['goodwill_net_asset_ratio'] < 0.25)
+            )
+            if trend_up:
+                m &= f['close_qfq'] > f['ma_20']
+        if pool != 'All':
+            m &= self.pools.get(pool, np.zeros_like(m))
+        return m
+
+
+# 进程内共享缓存: 多个页面 / 用户复用同一份 RadarFrame，仅在数据版本变化时重建
+_cache = {"frame": None, "checked_at": 0.0}
+_cache_lock = threading.Lock()
+
+
+def invalidate_radar_cache():
+    """下一次查询立即检查数据版本 (如自选池变化后)"""
+    _cache["checked_at"] = 0.0
+
 
 class RadarEngine:
     def __init__(self):
         self.db = SessionLocal()
 
+    def _frame(self) -> RadarFrame:
+        """取共享的因子表；距上次版本检查超过 VERSION_CHECK_SECONDS 时核对版本，变化则重新加载"""
+        frame = _cache["frame"]
+        if frame is not None and time.monotonic() - _cache["checked_at"] < VERSION_CHECK_SECONDS:
+            return frame
+        with _cache_lock:
+            frame = _cache["frame"]
+            if frame is not None and time.monotonic() - _cache["checked_at"] < VERSION_CHECK_SECONDS:
+                return frame  # 等锁期间其他线程已完成检查
+            # 只读路径: 快照为空 (新库 / 尚未炼制) 时返回空表，快照由同步与炼制任务 (refresh_radar) 重建
+            version = tuple(self.db.execute(RADAR_VERSION_SQL).fetchone())
+            if frame is None or frame.version != version:
+                frame = RadarFrame(pd.read_sql(RADAR_LOAD_SQL, self.db.connection()), version)
+                _cache["frame"] = frame
+            self.db.commit()  # 结束只读事务，下次检查可见新的快照
+            _cache["checked_at"] = time.monotonic()
+            return frame
+
     def query(self, 
               min_roe=8.0,           # 核心：ROE 扣非
               max_pe=30.0,           # 估值：PE(TTM)
@@ -18,97 +176,13 @@ class RadarEngine:
               ):
         """
         [PRD 3.2] 选股雷达核心筛选逻辑
+        因子表常驻内存 (RadarFrame)，滑块变化只重新计算布尔掩码
         """
-        # 1. 获取数据库最新行情日期 (T-1 后视镜)
-        latest_date = self.db.query(func.max(DWSMarketIndicators.trade_date)).scalar()
-        if not latest_date:
+        frame = self._frame()
+        if not len(frame):
             return pd.DataFrame()
-
-        # 2. 构建三表关联查询 (SQL 模式以提升性能)
-        # 关联: Basic(B) -> Indicators(I) -> Finance(F)
-        # 注意: Finance 取最近一个报告期 (end_date)
-        # --- 架构级修复：联接 ODS 获取原始涨跌幅 ---
-        sql = text("""
-            SELECT 
-                b.ts_code, b.name, b.industry,
-                i.trade_date, i.close_qfq, i.pe_ttm, i.pb, i.total_mv, i.ma_20,
-                m.pct_chg,
-                f.end_date as last_report, 
-                COALESCE(f.roe, 0) as roe, -- 这里暂时取 f.roe，我们将修改 process_finance_dws 来填充它
-                f.debt_to_assets,
-                -- V7.4 侦探指标计算 
-                COALESCE(f.n_cashflow_act / NULLIF(f.n_income_attr_p, 0), 0) as ocf_to_net_profit,
-                -- 垃圾资产比: (其他应收+预付) / 总资产
-                COALESCE((f.oth_receiv + f.prepayment) / NULLIF(f.total_assets, 0), 0) as toxic_asset_ratio,
-                -- 商誉占比: 商誉 / 归母净资产
-                COALESCE(f.goodwill / NULLIF(f.total_hldr_eqy_exc_min_int, 0), 0) as goodwill_net_asset_ratio
-            FROM stock_basic b
-            JOIN dws_market_indicators i ON b.ts_code = i.ts_code
-            JOIN ods_market_daily m ON i.ts_code = m.ts_code AND i.trade_date = m.trade_date
-            LEFT JOIN (
-                SELECT DISTINCT ON (ts_code) *
-                FROM dws_finance_std
-                ORDER BY ts_code, end_date DESC
-            ) f ON b.ts_code = f.ts_code
-            WHERE i.trade_date = :t_date
-            AND (:pool = 'All' OR 
-                (:pool = 'CSI800' AND b.is_csi800 = True) OR
-                (:pool = 'Watchlist' AND b.ts_code IN (SELECT ts_code FROM watchlist))
-            )
-        """)
-
-        df = pd.read_sql(sql, self.db.bind, params={"t_date": latest_date, "pool": pool})
-        if df.empty: return df
-
-        # --- 架构级修复：处理空值防止误杀 ---
-        # 将 ROE 缺失填充为 0，负债率缺失填充为 0 (代表风险未知但不拦截)
-        df['roe'] = df['roe'].fillna(0)
-        df['debt_to_assets'] = df['debt_to_assets'].fillna(0)
-        df['pe_ttm'] = df['pe_ttm'].fillna(999) # PE 缺失则设为极大值拦截
-        df['ocf_to_net_profit'] = df['ocf_to_net_profit'].fillna(0)
-        df['toxic_asset_ratio'] = df['toxic_asset_ratio'].fillna(0)
-        df['goodwill_net_asset_ratio'] = df['goodwill_net_asset_ratio'].fillna(0)
-
-        # 3. 执行多因子过滤
-        mask = (
-            (df['pe_ttm'] > 0) & (df['pe_ttm'] < max_pe) &
-            (df['pb'] < max_pb) &
-            (df['total_mv'] >= min_mv * 10000) & # 亿元转万元
-            (df['roe'] >= min_roe) &
-            (df['debt_to_assets'] <= max_debt) &
-            (df['ocf_to_net_profit'] >= 0.8) & 
-            (df['toxic_asset_ratio'] < 0.05) & 
-            (df['goodwill_net_asset_ratio'] < 0.25)
-        )
-        
-        if trend_up:
-            mask = mask & (df['close_qfq'] > df['ma_20'])
-
-        result = df[mask].copy()
-
-        # --- V7.4 动态理由生成 ---
-        def generate_reason(row):
-            reasons = []
-            # 亮点挖掘
-            if row['roe'] >= 20: reasons.append("高ROE(>20%)")
-            if row['ocf_to_net_profit'] >= 1.2: reasons.append("现金含量极高")
-            
-            # 风险提示
-            if row['goodwill_net_asset_ratio'] > 0.2: reasons.append("⚠商誉偏高")
-            if row['toxic_asset_ratio'] > 0.04: reasons.append("⚠资产成色一般")
-            
-            return " | ".join(reasons) if reasons else "多因子均衡"
-
-        result['selection_reason'] = result.apply(generate_reason, axis=1)
-        
-        # 格式化输出
-        result['total_mv_unit'] = (result['total_mv'] / 10000).round(2) # 转回亿元显示
-        
-        # 统一保留两位小数
-        numeric_cols = result.select_dtypes(include=['number']).columns
-        result[numeric_cols] = result[numeric_cols].round(2)
-
-        return result.sort_values('roe', ascending=False)
+        mask = frame.mask(min_roe, max_pe, max_pb, min_mv, max_debt, trend_up, pool)
+        return frame.display[mask]
 
     def close(self):
-        self.db.close()
\ No newline at end of file
+        self.db.close()
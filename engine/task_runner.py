@@ -0,0 +1,67 @@
+# FILE PATH: engine/task_runner.py
+import queue
+import threading
+from datetime import datetime
+
+
+class BackgroundTask:
+    """
+    后台任务: 在独立线程中运行 DataUpdater 的生成器任务，进度消息写入线程安全队列
+    - 工作线程内自建 DataUpdater (会话不跨线程共享)
+    - UI 侧只做非阻塞的消息读取，事件循环不再被 Tushare 请求与数据库写入阻塞
+    - cancel() 为协作式取消: 在生成器两次 yield 之间 (即两只股票/两个交易日之间) 关闭生成器
+    """
+
+    def __init__(self, task_name: str, **kwargs):
+        self.task_name = task_name  # DataUpdater 上的生成器方法名，如 run_daily_routine
+        self.kwargs = kwargs
+        self.messages = queue.Queue()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, name=f"task-{task_name}", daemon=True)
+
+    def start(self):
+        self.started_at = datetime.now()
+        self.thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self.thread.is_alive()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _run(self):
+        from engine.updater import DataUpdater
+
+        updater = DataUpdater()
+        try:
+            gen = getattr(updater, self.task_name)(**self.kwargs)
+            for message in gen:
+                self.messages.put(message)
+                if self.cancel_event.is_set():
+                    gen.close()  # 在当前 yield 处抛出 GeneratorExit，已提交的数据保留
+                    updater.db.rollback()
+                    self.cancelled = True
+                    self.messages.put("🛑 任务已取消。")
+                    break
+        except Exception as e:
+            self.error = e
+            self.messages.put(f"❌ 运行异常: {str(e)}")
+        finally:
+            updater.close()
+            self.finished_at = datetime.now()
+
+    def drain(self, limit: int = 500) -> list:
+        """非阻塞读取已产生的消息 (单次最多 limit 条，避免一次推送过多日志)"""
+        out = []
+        while len(out) < limit:
+            try:
+                out.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return out
@@ -0,0 +1,60 @@
+# FILE PATH: engine/universe.py
+import pandas as pd
+from sqlalchemy import text
+
+# 版本指纹: 成分股与自选股成员列表的哈希 (库内聚合，不拉取明细)
+# 不能只用数量: 指数调样是等量换股，自选池同时删一只加一只数量也不变
+VERSION_SQL = text("""
+    SELECT (SELECT md5(coalesce(string_agg(ts_code, ',' ORDER BY ts_code), ''))
+            FROM stock_basic WHERE is_csi800) AS csi800,
+           (SELECT md5(coalesce(string_agg(ts_code, ',' ORDER BY ts_code), ''))
+            FROM watchlist) AS watchlist
+""")
+
+POOL_SQL = text("""
+    SELECT ts_code FROM stock_basic WHERE is_csi800
+    UNION
+    SELECT ts_code FROM watchlist
+""")
+
+
+class UniverseSnapshot:
+    """
+    [PRD 1.2] 核心池快照 (中证800 + 自选股)
+    一次运行内只构建一次；漏斗过滤使用预建的 pd.Index 做向量化匹配
+    """
+
+    def __init__(self, codes, version=None):
+        self.codes = frozenset(codes)
+        self.index = pd.Index(sorted(self.codes))
+        self.version = version
+
+    def __contains__(self, ts_code):
+        return ts_code in self.codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def mask(self, values):
+        """布尔掩码: values 中哪些代码属于核心池 (复用 Index 的哈希表，无需每次重建集合)"""
+        return self.index.get_indexer(values) >= 0
+
+    def filter(self, df: pd.DataFrame, col: str = "ts_code") -> pd.DataFrame:
+        """漏斗过滤: 仅保留核心池内的行"""
+        if df is None or df.empty or not len(self.codes):
+            return df.iloc[0:0] if df is not None else df
+        return df[self.mask(df[col])]
+
+
+def universe_version(db) -> tuple:
+    row = db.execute(VERSION_SQL).fetchone()
+    return tuple(row)
+
+
+def load_universe(db) -> UniverseSnapshot:
+    version = universe_version(db)
+    codes = [r.ts_code for r in db.execute(POOL_SQL).fetchall()]
+    return UniverseSnapshot(codes, version)
@@ -1,31 +1,66 @@
 import pandas as pd
-import time
 from datetime import datetime, timedelta
 from sqlalchemy import text
 from interface.tushare_client import ts_client
 from database.models import (
     SessionLocal, StockBasic, Watchlist, 
-    ODSMarketDaily, ODSAdjFactor, ODSFinanceReport, 
-    DWSMarketIndicators, DWSFinanceStd, ODSDailyBasic
+    ODSMarketDaily, ODSAdjFactor, ODSFinanceReport, ODSDailyBasic
 )
-from core.mapping import SOURCE_TABLE_MAP
+from database.bulk_writer import bulk_upsert, content_hash
+from database.partitions import ensure_future_partitions
+from core.mapping import HOT_FINANCE_FIELDS
+from engine.market_panel import MarketPanelEngine
+from engine.market_sql import MarketSqlEngine
+from engine.finance_sql import FinanceStdEngine
+from engine.parallel import parallel_refine
+from engine.universe import load_universe, universe_version
+from engine.prefetch import DayPrefetcher
+from engine.dws_mirror import sync_mirror
+from engine.radar import refresh_radar_snapshot
+from engine.journal import (
+    SyncJournal, STAGE_ODS, STAGE_MARKET_DWS, STAGE_FINANCE_DWS, ODS_DATASETS, MARKET_WIDE
+)
+from core.config import settings
+
+# DWS 行情炼制引擎注册表 (settings.DWS_ENGINE 选择)
+MARKET_ENGINES = {
+    "pandas": MarketPanelEngine,
+    "sql": MarketSqlEngine,
+}
 
 class DataUpdater:
     def __init__(self):
         self.db = SessionLocal()
+        self.journal = SyncJournal(self.db)
+        self._universe = None  # UniverseSnapshot，一次运行内复用
+        self.finance_stats = {"inserted": 0, "updated": 0, "skipped": 0}  # 本轮财报写入统计
 
     def close(self):
         self.db.close()
 
-    def _get_universe_pool(self) -> set:
+    def _get_universe_pool(self) -> frozenset:
         """[PRD 1.2] 获取中证800+自选股的并集"""
-        csi800 = self.db.query(StockBasic.ts_code).filter(StockBasic.is_csi800 == True).all()
-        watchlist = self.db.query(Watchlist.ts_code).all()
-        pool = {row.ts_code for row in csi800} | {row.ts_code for row in watchlist}
-        return pool
+        return self.universe().codes
+
+    def universe(self, refresh: bool = False):
+        """
+        核心池快照: 首次调用时构建，之后复用
+        refresh=True (每次顶层任务开始时) 仅比对版本指纹，成分股或自选股变化时才重建
+        """
+        if self._universe is None:
+            self._universe = load_universe(self.db)
+        elif refresh and universe_version(self.db) != self._universe.version:
+            self._universe = load_universe(self.db)
+        return self._universe
 
-    def sync_stock_list(self):
-        """[PRD 3.1] 全量同步股票列表并标记中证800 (UI 适配版)"""
+    def invalidate_universe(self):
+        self._universe = None
+
+    def sync_stock_list(self, refresh_radar: bool = True):
+        """
+        [PRD 3.1] 全量同步股票列表并标记中证800 (UI 适配版)
+        refresh_radar=False: 调用方随后还会炼制并刷新雷达快照 (如全量回溯)，此处不重复刷新
+        """
         yield "🔄 正在从 Tushare 获取全市场基础列表..."
         df_basics = ts_client.fetch_stock_basic()
         if df_basics.empty: 
@@ -35,7 +70,7 @@ class DataUpdater:
         yield "💎 正在获取中证800最新成分股名单..."
         try:
             now_str = datetime.now().strftime("%Y%m%d")
-            df_csi800 = ts_client.pro.index_weight(index_code='000906.SH', start_date='20240101', end_date=now_str)
+            df_csi800 = ts_client.fetch_index_weight(index_code='000906.SH', start_date='20240101', end_date=now_str)
             if not df_csi800.empty:
                 latest_date = df_csi800['trade_date'].max()
                 csi800_set = set(df_csi800[df_csi800['trade_date'] == latest_date]['con_code'].tolist())
@@ -46,16 +81,13 @@ class DataUpdater:
             csi800_set = set()
 
         yield f"📥 正在写入数据库 (共 {len(df_basics)} 条记录)..."
-        for _, row in df_basics.iterrows():
-            is_in_index = row['ts_code'] in csi800_set
-            stock = StockBasic(
-                ts_code=row['ts_code'], symbol=row['symbol'], name=row['name'],
-                area=row['area'], industry=row['industry'], market=row['market'],
-                list_date=row['list_date'], is_csi800=is_in_index
-            )
-            self.db.merge(stock)
-        
+        df_basics = df_basics.assign(is_csi800=df_basics['ts_code'].isin(csi800_set))
+        stats = bulk_upsert(self.db, StockBasic, df_basics)
         self.db.commit()
+        self.invalidate_universe()  # 成分股可能变化
+        yield f"  ⚡ 写入耗时 {stats['seconds']:.2f}s ({stats['rps']:.0f} rows/s)"
+        if refresh_radar:
+            yield from self.refresh_radar()  # 名称/行业/成分股标记随列表更新
         yield f"✅ 股票列表同步完成！已识别中证800成分股: {len(csi800_set)} 只。"
 
     # --- 场景 S1/S2/S5: 垂直历史回溯 (按代码同步) ---
@@ -65,6 +97,7 @@ class DataUpdater:
         [PRD S1/S2] 自选股行情与财报深度修补
         逻辑：针对 Watchlist 中的标的，从 20150101 起执行垂直同步 
         """
+        self._reset_finance_stats()
         watchlist = self.db.query(Watchlist.ts_code).all()
         targets = [r.ts_code for r in watchlist]
         
@@ -84,53 +117,86 @@ class DataUpdater:
                 # 2. 执行 DWS 层数据炼制 (计算均线与标准化财报)
                 self.process_market_dws(ts_code)
                 self.process_finance_dws(ts_code)
-                
-                # 3. 2000 积分频次保护：每次同步后休眠 0.3s-0.5s [cite: 1635]
-                time.sleep(0.3)
             except Exception as e:
                 yield f"❌ {ts_code} 同步失败: {str(e)}"
                 continue
-        
+
+        yield from self.sync_dws_mirror(market_rebuild=True, finance_years=())
+        yield from self.refresh_radar()
+        yield self._finance_stats_message()
         yield "✅ 自选池历史数据修复完成。"
 
+    def _finance_statements(self) -> dict:
+        """四大财报接口 (category -> fetch 函数)"""
+        return {
+            "income": ts_client.fetch_income,
+            "balancesheet": ts_client.fetch_balancesheet,
+            "cashflow": ts_client.fetch_cashflow,
+            "fina_indicator": ts_client.fetch_fina_indicator
+        }
+
     def sync_stock_history(self, ts_code: str, start_date="20150101"):
         """补全单只股票的所有历史数据 (ODS 层)"""
+        # 七个互相独立的请求并发抓取 (令牌桶保证不超过每接口频次配额)
+        statements = self._finance_statements()
+        jobs = {
+            "daily": (ts_client.fetch_daily, {"ts_code": ts_code, "start_date": start_date}),
+            "adj_factor": (ts_client.fetch_adj_factor, {"ts_code": ts_code, "start_date": start_date}),
+            "daily_basic": (ts_client.fetch_daily_basic, {"ts_code": ts_code, "start_date": start_date}),
+        }
+        for category, api_func in statements.items():
+            jobs[category] = (api_func, {"ts_code": ts_code, "start_date": start_date})
+        results = ts_client.fetch_many(jobs)
+
+        # 进度日志: 各数据集的高水位 (行情取最新交易日，财报取最新报告期)
+        marks = []
+        for dataset in ODS_DATASETS:
+            df = results[dataset]
+            date_col = "trade_date" if dataset in ("daily", "adj_factor", "daily_basic") else "end_date"
+            high_water = df[date_col].max() if df is not None and not df.empty and date_col in df.columns else None
+            marks.append({"ts_code": ts_code, "stage": STAGE_ODS, "dataset": dataset, "status": "done",
+                          "start_date": start_date, "high_water": high_water})
+
         # A. 行情数据同步
-        df_daily = ts_client.fetch_daily(ts_code=ts_code, start_date=start_date)
-        if not df_daily.empty:
-            for _, row in df_daily.iterrows():
-                self.db.merge(ODSMarketDaily(
-                    ts_code=row['ts_code'], trade_date=row['trade_date'],
-                    open=row['open'], high=row['high'], low=row['low'], close=row['close'],
-                    pre_close=row['pre_close'], change=row['change'], pct_chg=row['pct_chg'],
-                    vol=row['vol'], amount=row['amount']
-                ))
+        bulk_upsert(self.db, ODSMarketDaily, results["daily"])
 
         # B. 复权因子同步 [cite: 1760]
-        df_adj = ts_client.fetch_adj_factor(ts_code=ts_code, start_date=start_date)
-        if not df_adj.empty:
-            for _, row in df_adj.iterrows():
-                self.db.merge(ODSAdjFactor(ts_code=row['ts_code'], trade_date=row['trade_date'], adj_factor=row['adj_factor']))
+        bulk_upsert(self.db, ODSAdjFactor, results["adj_factor"])
 
         # C. 每日指标同步 (PE/PB/市值) [cite: 1766]
-        df_basic = ts_client.pro.daily_basic(ts_code=ts_code, start_date=start_date)
-        if not df_basic.empty:
-            for _, row in df_basic.iterrows():
-                self.db.merge(ODSDailyBasic(
-                    ts_code=row['ts_code'], trade_date=row['trade_date'],
-                    pe_ttm=row.get('pe_ttm'), pb=row.get('pb'), 
-                    turnover_rate=row.get('turnover_rate'), total_mv=row.get('total_mv')
-                ))
+        bulk_upsert(self.db, ODSDailyBasic, results["daily_basic"])
 
         # D. 四大财报同步 (JSONB 存储) [cite: 1761]
-        tasks = {
-            "income": ts_client.fetch_income,
-            "balancesheet": ts_client.fetch_balancesheet,
-            "cashflow": ts_client.fetch_cashflow,
-            "fina_indicator": ts_client.fetch_fina_indicator
-        }
-        for category, api_func in tasks.items():
-            df = api_func(ts_code=ts_code, start_date=start_date)
+        self._save_finance_reports(results)
+
+        # 全部数据集落地后再记录进度，与最后一批数据同一事务提交
+        self.journal.mark_many(marks)
+        self.db.commit()
+
+    def sync_stock_finance(self, ts_code: str, period: str = None, start_date: str = None):
+        """
+        [财务专用模式] 仅同步单只股票的四大财报 (不触碰行情接口)
+        period: 指定报告期 (如 20240930)，只拉取该期；否则按 start_date 拉取区间
+        """
+        params = {"ts_code": ts_code, "period": period, "start_date": None if period else start_date}
+        jobs = {category: (api_func, params) for category, api_func in self._finance_statements().items()}
+        self._save_finance_reports(ts_client.fetch_many(jobs))
+        self.db.commit()
+
+    def _reset_finance_stats(self):
+        self.finance_stats = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    def _finance_stats_message(self) -> str:
+        st = self.finance_stats
+        return f"📊 财报写入: 新增 {st['inserted']} / 更新 {st['updated']} / 内容未变跳过 {st['skipped']}"
+
+    def _save_finance_reports(self, results: dict):
+        """
+        四大财报写入 ODS (JSONB 存储)；results: category -> DataFrame
+        以载荷哈希做变更检测: 未变的行不写入，仅新增/变更的报告期登记到财务脏集
+        """
+        for category in self._finance_statements():
+            df = results.get(category)
             if df is not None and not df.empty:
                 # --- 架构级修复：动态检测主键 --- 
                 # 理想的主键候选，但需兼容不同接口的字段差异
@@ -143,99 +209,114 @@ class DataUpdater:
                 # 处理 NaN 并在字典转换时填充 None，防止 JSONB 写入报错 
                 df = df.astype(object).where(pd.notnull(df), None)
                 
+                rows = []
                 for record in df.to_dict('records'):
                     # 写入 ODS 时使用 .get() 兜底可选字段 [cite: 864-865]
-                    self.db.merge(ODSFinanceReport(
-                        ts_code=record['ts_code'], 
-                        end_date=record['end_date'],
+                    rows.append({
+                        "ts_code": record['ts_code'],
+                        "end_date": record['end_date'],
                         # 默认合并报表(1)和初始数据(0)以对齐数据库模型要求 [cite: 769, 864]
-                        report_type=str(record.get('report_type', '1')), 
-                        update_flag=str(record.get('update_flag', '0')), 
-                        category=category, 
-                        data=record, 
-                        ann_date=record.get('ann_date')
-                    ))
+                        "report_type": str(record.get('report_type', '1')),
+                        "update_flag": str(record.get('update_flag', '0')),
+                        "category": category,
+                        "data": record,
+                        "payload_hash": content_hash(record),
+                        "ann_date": record.get('ann_date'),
+                        # 热点字段同步落入物理列
+                        **{f: record.get(f) for f in HOT_FINANCE_FIELDS}
+                    })
+                stats = bulk_upsert(self.db, ODSFinanceReport, pd.DataFrame(rows),
+                                    label=f"ods_finance_report[{category}]", change_column="payload_hash")
+                for key in self.finance_stats:
+                    self.finance_stats[key] += stats[key]
+                # 财务 DWS 只炼制合并报表 (report_type='1')，其他口径的变更无需登记脏集
+                changed = pd.DataFrame(stats["changed"], columns=["ts_code", "end_date", "report_type"])
+                self.journal.mark_finance_dirty(changed[changed["report_type"] == "1"])
                 self.db.commit() # 每一类报表提交一次，缩小冲突范围 [cite: 865]
 
     # --- 场景 S3: 水平每日行情 (按日期同步) ---
 
-    def sync_daily_market(self, trade_date: str):
-        """[PRD S3] 每日增量行情同步 (水平模式)"""
-        universe = self._get_universe_pool()
-        if not universe: return
+    def sync_daily_market(self, trade_date: str, df_daily=None, df_adj=None):
+        """
+        [PRD S3] 每日增量行情同步 (水平模式)，返回是否成功落地
+        df_daily / df_adj: 流水线预取的全市场数据，为空时现场拉取
+        """
+        universe = self.universe()
+        if not universe: return False
 
         try:
             # 1. Fetch Full Market
-            df_daily = ts_client.fetch_daily(trade_date=trade_date)
-            df_adj = ts_client.fetch_adj_factor(trade_date=trade_date)
+            if df_daily is None:
+                df_daily = ts_client.fetch_daily(trade_date=trade_date)
+            if df_adj is None:
+                df_adj = ts_client.fetch_adj_factor(trade_date=trade_date)
             
-            if df_daily.empty: return
+            if df_daily.empty: return False
 
             # 2. Funnel Filter
-            df_daily_filtered = df_daily[df_daily['ts_code'].isin(universe)]
+            df_daily_filtered = universe.filter(df_daily)
             
             # 3. Save ODS
-            for _, row in df_daily_filtered.iterrows():
-                self.db.merge(ODSMarketDaily(
-                    ts_code=row['ts_code'], trade_date=row['trade_date'],
-                    open=row['open'], high=row['high'], low=row['low'], close=row['close'],
-                    pre_close=row['pre_close'], change=row['change'], pct_chg=row['pct_chg'],
-                    vol=row['vol'], amount=row['amount']
-                ))
+            bulk_upsert(self.db, ODSMarketDaily, df_daily_filtered)
 
             if not df_adj.empty:
-                df_adj_filtered = df_adj[df_adj['ts_code'].isin(universe)]
-                for _, row in df_adj_filtered.iterrows():
-                    self.db.merge(ODSAdjFactor(
-                        ts_code=row['ts_code'], trade_date=row['trade_date'],
-                        adj_factor=row['adj_factor']
-                    ))
+                df_adj_filtered = universe.filter(df_adj)
+                bulk_upsert(self.db, ODSAdjFactor, df_adj_filtered)
 
             self.db.commit()
             print(f"  ✅ Market Snapshot {trade_date}: Saved {len(df_daily_filtered)} records.")
+            return True
 
         except Exception as e:
             self.db.rollback()
             print(f"  ❌ Market Snapshot Failed: {e}")
+            return False
 
     # --- 场景 S4: 水平每日财报 (按公告日同步) ---
 
-    def sync_financial_daily(self, ann_date: str):
+    def sync_financial_daily(self, ann_date: str, df_ann=None):
         """
         [PRD S4 修正版] 每日增量财报同步
         针对 2000 积分优化：通过披露计划反查个股，避免全市场拉取报错
+        df_ann: 流水线预取的当日披露名单，为空时现场拉取
         """
-        universe = self._get_universe_pool()
+        universe = self.universe()
         if not universe:
             return
 
         try:
             # 1. 获取当日实际披露财报的名单 (actual_date)
             # Ref: Tushare PDF 
-            df_ann = ts_client.pro.disclosure_date(actual_date=ann_date)
+            if df_ann is None:
+                df_ann = ts_client.fetch_disclosure_date(actual_date=ann_date)
             if df_ann.empty:
                 yield f"  ☕ {ann_date} 无财报披露。"
                 return
 
             # 2. 筛选出属于我们 Universe 的标的
-            targets = df_ann[df_ann['ts_code'].isin(universe)]['ts_code'].unique().tolist()
+            df_target = universe.filter(df_ann)
+            if 'end_date' not in df_target.columns:
+                df_target = df_target.assign(end_date=None)
+            df_target = df_target.drop_duplicates(subset=['ts_code', 'end_date'])
             
-            if not targets:
+            if df_target.empty:
                 yield f"  ☕ {ann_date} 披露的 {len(df_ann)} 家公司均不在核心池中。"
                 return
 
-            yield f"  📢 发现 {len(targets)} 只核心标的披露财报，开始精准同步..."
-
-            # 3. 逐个同步个股财报 (复用 S1/S2 的垂直同步逻辑)
-            for i, ts_code in enumerate(targets):
-                yield f"    > [{i+1}/{len(targets)}] 同步财报: {ts_code}"
-                # 此处仅同步公告日前后的数据即可，为保险起见同步最近一年
-                # start_date 设为公告日前一年
-                sync_start = (datetime.strptime(ann_date, "%Y%m%d") - timedelta(days=365)).strftime("%Y%m%d")
-                self.sync_stock_history(ts_code, start_date=sync_start)
-                
-                # 频次保护
-                time.sleep(0.2)
+            yield f"  📢 发现 {df_target['ts_code'].nunique()} 只核心标的披露财报，开始精准同步..."
+
+            # 3. 按报告期分组，仅拉取四大财报的对应期次 (行情已由 S3 水平同步覆盖)
+            # 注: 2000 积分无法按报告期拉全市场 (需 VIP 接口)，故在期次内逐只请求
+            sync_start = (datetime.strptime(ann_date, "%Y%m%d") - timedelta(days=365)).strftime("%Y%m%d")
+            for period, group in df_target.groupby(df_target['end_date'].fillna(''), sort=True):
+                codes = group['ts_code'].tolist()
+                yield f"    📑 报告期 {period or '未知 (回溯一年)'}: {len(codes)} 只"
+                for i, ts_code in enumerate(codes):
+                    yield f"    > [{i+1}/{len(codes)}] 同步财报: {ts_code}"
+                    if period:
+                        self.sync_stock_finance(ts_code, period=period)
+                    else:
+                        self.sync_stock_finance(ts_code, start_date=sync_start)
 
             self.db.commit()
             yield f"  ✅ {ann_date} 财报增量同步完成。"
@@ -246,144 +327,194 @@ class DataUpdater:
 
     # --- DWS 计算逻辑 ---
 
-    def process_market_dws(self, ts_code: str):
-        """DWS: 计算均线、QFQ 并补全基本面指标"""
-        # 1. 联合查询 ODS 行情和每日指标 (daily_basic)
-        query = text("""
-            SELECT m.*, b.pe_ttm, b.pb, b.total_mv, b.turnover_rate, a.adj_factor
-            FROM ods_market_daily m
-            LEFT JOIN ods_daily_basic b ON m.ts_code = b.ts_code AND m.trade_date = b.trade_date
-            LEFT JOIN ods_adj_factor a ON m.ts_code = a.ts_code AND m.trade_date = a.trade_date
-            WHERE m.ts_code = :ts_code
-            ORDER BY m.trade_date
-        """)
-        
-        df = pd.read_sql(query, self.db.bind, params={"ts_code": ts_code})
-        if df.empty: return
-
-        # 2. 计算前复权
-        df['adj_factor'] = df['adj_factor'].ffill()
-        latest_factor = df['adj_factor'].iloc[-1] if not df['adj_factor'].isnull().all() else 1.0
-        df['close_qfq'] = df['close'] * (df['adj_factor'] / latest_factor)
-
-        # 3. 计算均线 [cite: 843]
-        for ma in [20, 50, 120, 250, 850]:
-            df[f'ma_{ma}'] = df['close_qfq'].rolling(window=ma, min_periods=ma).mean()
-
-        # 4. Upsert 写入 DWS
-        for _, row in df.iterrows():
-            self.db.merge(DWSMarketIndicators(
-                ts_code=row['ts_code'],
-                trade_date=row['trade_date'],
-                pe_ttm=row.get('pe_ttm'),
-                pb=row.get('pb'),
-                total_mv=row.get('total_mv'),
-                turnover_rate=row.get('turnover_rate'),
-                close_qfq=row['close_qfq'],
-                ma_20=row['ma_20'] if pd.notna(row['ma_20']) else None,
-                ma_50=row['ma_50'] if pd.notna(row['ma_50']) else None,
-                ma_120=row['ma_120'] if pd.notna(row['ma_120']) else None,
-                ma_250=row['ma_250'] if pd.notna(row['ma_250']) else None,
-                ma_850=row['ma_850'] if pd.notna(row['ma_850']) else None,
-            ))
+    def process_market_dws(self, ts_code: str, incremental: bool = False):
+        """
+        DWS: 计算后复权 (HFQ) 价格与均线，并补全基本面指标 (单只股票)
+        HFQ 历史只追加不改写；前复权由读取方 (雷达/导出) 通过 engine.adjust.hfq_to_qfq 换算
+        incremental=True 时只读取最近 850 根 K 线 + 新增 K 线，并只写入新增的 DWS 行
+        """
+        rows = self._market_engine().refine([ts_code], incremental=incremental)["rows"]
+        self._mark_market_dws([ts_code])
+        return rows
+
+    def _market_engine(self):
+        """按配置选择 DWS 行情炼制引擎 (pandas / sql)"""
+        engine_cls = MARKET_ENGINES.get(settings.DWS_ENGINE)
+        if engine_cls is None:
+            raise ValueError(f"未知的 DWS_ENGINE: {settings.DWS_ENGINE} (可选: {', '.join(MARKET_ENGINES)})")
+        return engine_cls(self.db)
+
+    def refine_market_panel(self, codes=None, incremental: bool = True):
+        """
+        [面板模式] 全 Universe 炼制 DWS 行情指标 (DWS_WORKERS > 1 时按进程分片并行)
+        返回炼制统计，其中 recomputed 为整只重算的标的 -> 最早写入日期 (供镜像重导被改写的年份)
+        """
+        codes = list(codes) if codes is not None else list(self._get_universe_pool())
+        yield f"  > 面板炼制行情指标 [{settings.DWS_ENGINE}]: {len(codes)} 只 ({'增量' if incremental else '全量'})..."
+        if settings.DWS_WORKERS > 1 and len(codes) > 1:
+            stats = yield from parallel_refine("market", codes, settings.DWS_WORKERS, incremental=incremental)
+        else:
+            stats = self._market_engine().refine(codes, incremental=incremental)
+        self._mark_market_dws(codes)
+        yield f"  ✅ 行情指标写入 {stats['rows']} 行 / 覆盖 {stats['stocks']} 只，耗时 {stats['seconds']:.2f}s"
+        if incremental and stats["recomputed"]:
+            yield f"  🔁 复权因子修订或首次炼制，整只重算: {len(stats['recomputed'])} 只"
+        return stats
+
+    def refine_finance_panel(self, codes=None, end_dates: dict = None):
+        """
+        全 Universe 炼制 DWS 财务指标 (DWS_WORKERS > 1 时按进程分片并行)
+        end_dates: ts_code -> [报告期]，指定时每只仅炼制这些报告期 (脏集模式)
+        """
+        codes = list(codes) if codes is not None else list(self._get_universe_pool())
+        end_dates = end_dates or {}
+        if settings.DWS_WORKERS > 1 and len(codes) > 1:
+            stats = yield from parallel_refine("finance", codes, settings.DWS_WORKERS, end_dates=end_dates)
+            yield f"  ✅ 财务指标炼制 {stats['stocks']} 只，耗时 {stats['seconds']:.2f}s"
+            return
+        start = datetime.now()
+        rows = self.refine_finance(codes, end_dates or None)
+        yield f"  ✅ 财务指标写入 {rows} 行 / 覆盖 {len(codes)} 只，耗时 {(datetime.now() - start).total_seconds():.2f}s"
+
+    def _mark_market_dws(self, codes):
+        """记录行情 DWS 逐只进度 (高水位 = 该标的 DWS 最新交易日)"""
+        if not codes:
+            return
+        rows = self.db.execute(text("""
+            SELECT ts_code, max(trade_date) AS high_water
+            FROM dws_market_indicators WHERE ts_code = ANY(:codes)
+            GROUP BY ts_code
+        """), {"codes": list(codes)}).fetchall()
+        self.journal.mark_many([{"ts_code": r.ts_code, "stage": STAGE_MARKET_DWS, "dataset": "dws_market_indicators",
+                                 "status": "done", "high_water": r.high_water} for r in rows])
         self.db.commit()
 
-    def process_finance_dws(self, ts_code: str):
-        """[核心修复] 炼制时自动合并 roe 与 roe_dt，并计算审计指标"""
-        reports = self.db.query(ODSFinanceReport).filter(
-            ODSFinanceReport.ts_code == ts_code,
-            ODSFinanceReport.report_type == '1'
-        ).all()
-        
-        merged = {}
-        for r in reports:
-            end_date = r.end_date
-            if end_date not in merged:
-                merged[end_date] = {"ann_date": r.ann_date}
-            
-            data = r.data
-            # 提取基础字段
-            fields = [
-                'revenue', 'n_income_attr_p', 'n_cashflow_act', 'grossprofit_margin',
-                'oth_receiv', 'prepayment', 'goodwill', 'total_assets', 'total_hldr_eqy_exc_min_int',
-                'debt_to_assets', 'roe', 'roe_dt', 'total_liab'
-            ]
-            for k in fields:
-                if k in data and data[k] is not None:
-                    merged[end_date][k] = data[k]
-        
-        for end_date, m in merged.items():
-            # 必须有公告日期才能进行后续的 merge_asof [cite: 847]
-            if not m.get('ann_date'): continue 
-            
-            # 1. 准备计算数据 (利用 .get 容错)
-            net_profit = m.get('n_income_attr_p', 0) or 0
-            ocf = m.get('n_cashflow_act', 0) or 0
-            oth_receiv = m.get('oth_receiv', 0) or 0
-            prepay = m.get('prepayment', 0) or 0
-            assets = m.get('total_assets', 0) or 0
-            goodwill = m.get('goodwill', 0) or 0
-            equity = m.get('total_hldr_eqy_exc_min_int', 0) or 0
-            
-            # 2. 计算审计指标
-            # 净现比
-            ocf_ratio = ocf / net_profit if net_profit and net_profit != 0 else 0
-            # 垃圾资产占比
-            toxic_ratio = (oth_receiv + prepay) / assets if assets and assets != 0 else 0
-            # 商誉占比
-            gw_ratio = goodwill / equity if equity and equity != 0 else 0
-            
-            # 3. 负债率多路径提取
-            debt_ratio = m.get('debt_to_assets')
-            if debt_ratio is None:
-                liab = m.get('total_liab')
-                if liab and assets and assets != 0:
-                    debt_ratio = (liab / assets) * 100
-            
-            # 4. ROE 优先级
-            roe_final = m.get('roe_dt') if m.get('roe_dt') is not None else m.get('roe')
-
-            self.db.merge(DWSFinanceStd(
-                ts_code=ts_code, end_date=end_date, ann_date=m.get('ann_date'),
-                revenue=m.get('revenue'),
-                n_income_attr_p=m.get('n_income_attr_p'),
-                n_cashflow_act=m.get('n_cashflow_act'),
-                debt_to_assets=debt_ratio,
-                roe=roe_final,
-                grossprofit_margin=m.get('grossprofit_margin'),
-                oth_receiv=m.get('oth_receiv'),
-                prepayment=m.get('prepayment'),
-                goodwill=m.get('goodwill'),
-                total_assets=m.get('total_assets'),
-                total_hldr_eqy_exc_min_int=m.get('total_hldr_eqy_exc_min_int'),
-                # 存入物理字段
-                ocf_to_net_profit=round(ocf_ratio, 4),
-                toxic_asset_ratio=round(toxic_ratio, 4),
-                goodwill_net_asset_ratio=round(gw_ratio, 4)
-            ))
+    def _market_refine_target(self):
+        """全 Universe 行情炼制的目标日期: 炼制开始前 ODS 行情的最新交易日"""
+        return self.db.execute(text("SELECT max(trade_date) FROM ods_market_daily")).scalar()
+
+    def _mark_market_refined(self, target, stats_list):
+        """
+        记录全市场行情 DWS 高水位 = 本轮炼制目标日期 (日更据此判断炼制是否落后于 ODS)
+        仅在整个 Universe 炼制完成且无失败标的时记录；单只/自选池炼制不推进全市场高水位
+        """
+        if not target or any(s.get("errors") for s in stats_list):
+            return
+        self.journal.mark(MARKET_WIDE, STAGE_MARKET_DWS, "dws_market_indicators", "done", high_water=target)
+        self.db.commit()
+
+    def process_finance_dws(self, ts_code: str, end_dates=None):
+        """
+        [核心修复] 炼制时自动合并 roe 与 roe_dt，并计算审计指标 (单只股票)
+        end_dates: 仅炼制指定报告期 (脏集模式)；为空时炼制全部报告期
+        """
+        return self.refine_finance(codes=[ts_code], end_dates={ts_code: list(end_dates)} if end_dates else None)
+
+    def refine_finance(self, codes, end_dates: dict = None) -> int:
+        """
+        批量炼制 DWS 财务宽表: 库内提取并合并字段，比率向量化计算，一条语句覆盖全部标的
+        end_dates: ts_code -> [报告期]，指定时仅炼制这些报告期
+        """
+        codes = list(codes)
+        if not codes:
+            return 0
+        started = datetime.now()
+        df = FinanceStdEngine(self.db).refine(codes, end_dates)
+
+        high_water = df.groupby('ts_code')['end_date'].max().to_dict() if not df.empty else {}
+        self.journal.mark_many([
+            {"ts_code": c, "stage": STAGE_FINANCE_DWS, "dataset": "dws_finance_std", "status": "done",
+             "high_water": high_water.get(c)}
+            for c in codes
+        ])
+        self.journal.clear_finance_dirty(codes, end_dates, before=started)
+        self.db.commit()
+        return len(df)
+
+    def sync_dws_mirror(self, market_rebuild: bool = False, finance_years=None, market_recomputed: dict = None):
+        """
+        炼制完成后同步 DWS 列式镜像 (engine/dws_mirror.py)
+        行情: 默认仅追加新交易日，回溯补入历史时整体重导；
+              market_recomputed (整只重算的标的 -> 最早写入日期) 非空时追加后重导被改写的年份
+        财务: finance_years 为 None 时仅追加新报告期，为空集合时全部重导，否则重导这些年份 (报告期修订)
+        """
+        since = min(market_recomputed.values()) if market_recomputed else None
+        messages = [
+            sync_mirror(self.db, "dws_market_indicators", rebuild=market_rebuild, since=since),
+            sync_mirror(self.db, "dws_finance_std", rebuild=finance_years is not None,
+                        years=sorted(int(y) for y in finance_years) if finance_years else None),
+        ]
+        for message in messages:
+            if message:
+                yield message
+
+    def refresh_radar(self):
+        """炼制结束后重建雷达快照 (radar_snapshot)，雷达筛选只扫描快照表"""
+        start = datetime.now()
+        rows = refresh_radar_snapshot(self.db)
         self.db.commit()
+        yield f"  📡 雷达快照已刷新: {rows} 只，耗时 {(datetime.now() - start).total_seconds():.2f}s"
 
     # --- 调度器 (支持进度返回) ---
 
-    def run_full_backfill(self, start_date="20150101"):
-        """[PRD S5] 核心池财务与行情全量初始化"""
-        yield "🚀 开始全量回溯 (Full Backfill)..."
-        yield from self.sync_stock_list()
+    def run_full_backfill(self, start_date="20150101", resume: bool = True):
+        """
+        [PRD S5] 核心池财务与行情全量初始化
+        resume=False 时忽略 sync_state 中的完成记录，全部标的重新回溯并全量炼制
+        """
+        yield "🚀 开始全量回溯 (Full Backfill)..." if resume else "🚀 开始全量回溯 (Full Backfill，忽略断点重新回溯)..."
+        self._reset_finance_stats()
+        yield from self.sync_stock_list(refresh_radar=False)  # 雷达快照在炼制完成后统一刷新
         
-        universe = list(self._get_universe_pool())
+        # 固定顺序遍历，配合 sync_state 断点续跑
+        universe = sorted(self._get_universe_pool())
         total = len(universe)
-        
+
+        # 断点: 起点不晚于本次要求的 ODS 回溯已完成 / 财务 DWS 已炼制的标的直接跳过
+        ods_done = self.journal.completed(STAGE_ODS, ODS_DATASETS, start_date=start_date) if resume else set()
+        fin_done = self.journal.completed(STAGE_FINANCE_DWS, ["dws_finance_std"]) if resume else set()
+        skipped = sum(1 for c in universe if c in ods_done and c in fin_done)
+        if skipped:
+            yield f"⏩ 断点续跑: {skipped}/{total} 只已完成，跳过。"
+
+        fresh = []  # 本轮新拉取 ODS 的标的 (行情 DWS 需全量重算)
         for i, ts_code in enumerate(universe):
+            if ts_code in ods_done and ts_code in fin_done:
+                continue
             # 使用 yield 让前端 NiceGUI 可以实时更新进度条 [cite: 107-108]
             yield f"正在补全第 {i+1}/{total} 只: {ts_code}"
             try:
-                self.sync_stock_history(ts_code, start_date)
-                # DWS Calculation
-                self.process_market_dws(ts_code)
+                if ts_code not in ods_done:
+                    self.sync_stock_history(ts_code, start_date)
+                    fresh.append(ts_code)
+                # 财务 DWS 逐只炼制；行情 DWS 在循环结束后以面板模式统一炼制
                 self.process_finance_dws(ts_code)
-                time.sleep(0.1) # 频次保护
             except Exception as e:
+                self.db.rollback()
+                self.journal.mark_many([
+                    {"ts_code": ts_code, "stage": STAGE_ODS, "dataset": d, "status": "failed", "message": str(e)}
+                    for d in ODS_DATASETS
+                ])
+                self.db.commit()
                 yield f"⚠️ {ts_code} 同步失败: {str(e)}"
+
+        # DWS Calculation: 新回溯的标的可能补入更早的历史，全量重算；其余仅增量补齐
+        market_done = self.journal.completed(STAGE_MARKET_DWS, ["dws_market_indicators"]) if resume else set()
+        full = [c for c in universe if c in fresh or c not in market_done]
+        rest = [c for c in universe if c not in full]
+        yield "🔄 正在以面板模式炼制行情指标..."
+        target = self._market_refine_target()
+        recomputed = {}
+        market = []
+        if full:
+            market.append((yield from self.refine_market_panel(full, incremental=False)))
+        if rest:
+            market.append((yield from self.refine_market_panel(rest, incremental=True)))
+            recomputed = market[-1]["recomputed"]
+        self._mark_market_refined(target, market)
+        yield from self.sync_dws_mirror(market_rebuild=bool(full), finance_years=(), market_recomputed=recomputed)
+        yield from self.refresh_radar()
+        yield self._finance_stats_message()
         yield "✅ 全量回溯任务完成"
 
     def run_daily_routine(self):
@@ -391,65 +522,95 @@ class DataUpdater:
         [PRD S3/S4 进化版] 自动区间补全日更
         逻辑：自动计算断档期并循环补全，确保隔周/隔月更新不漏数据
         """
+        self.universe(refresh=True)  # 本轮运行内复用同一核心池快照
+        self._reset_finance_stats()
+        created = ensure_future_partitions(self.db)  # 跨年前预建下一年的行情分区
+        if created:
+            yield f"🧱 已创建行情分区: {', '.join(created)}"
+
         # 1. 确定补全区间
-        # 查找本地最新行情日期作为起点
-        res = self.db.execute(text("SELECT max(trade_date) FROM ods_market_daily")).fetchone()
-        last_date_str = res[0] if res and res[0] else "20241201" # 默认回溯起点
+        # 优先使用日更进度日志的高水位；无记录时退回本地最新行情日期
+        last_date_str = self.journal.high_water(MARKET_WIDE, STAGE_ODS, "daily_routine")
+        if not last_date_str:
+            res = self.db.execute(text("SELECT max(trade_date) FROM ods_market_daily")).fetchone()
+            last_date_str = res[0] if res and res[0] else "20241201" # 默认回溯起点
         
         start_date = (datetime.strptime(last_date_str, "%Y%m%d") + timedelta(days=1))
         end_date = datetime.now()
         
         # 获取期间所有交易日 (避免非交易日报错)
         # 注意：这里调用 tushare 交易日历接口
-        cal = ts_client.pro.trade_cal(exchange='', start_date=start_date.strftime('%Y%m%d'), 
-                                     end_date=end_date.strftime('%Y%m%d'), is_open='1')
-        trade_days = cal['cal_date'].tolist()
+        cal = ts_client.fetch_trade_cal(start_date=start_date.strftime('%Y%m%d'),
+                                        end_date=end_date.strftime('%Y%m%d'))
+        # Tushare 交易日历按日期倒序返回；流水线逐日落地并推进高水位，必须升序处理
+        trade_days = sorted(cal['cal_date'].tolist())
 
         if not trade_days:
-            yield "☕ 数据已是最新，无需更新。"
-            return
-
-        yield f"🚀 发现 {len(trade_days)} 个交易日待补全: {trade_days[0]} -> {trade_days[-1]}"
-
-        # 2. 核心同步循环
-        for date_str in trade_days:
-            yield f"📅 正在处理: {date_str} ..."
-            
-            # A. 同步全市场行情 (S3) 
-            self.sync_daily_market(date_str)
-            
-            # B. 同步每日指标 (PE/PB/市值) - 修正：需手动添加 horizontal 模式
-            yield f"  > 拉取每日指标 (PE/PB)..."
-            df_basic = ts_client.pro.daily_basic(trade_date=date_str)
-            if not df_basic.empty:
-                # 仅存 universe 内的
-                universe = self._get_universe_pool()
-                df_target = df_basic[df_basic['ts_code'].isin(universe)]
-                for _, row in df_target.iterrows():
-                    self.db.merge(ODSDailyBasic(
-                        ts_code=row['ts_code'], trade_date=row['trade_date'],
-                        pe_ttm=row.get('pe_ttm'), pb=row.get('pb'),
-                        total_mv=row.get('total_mv'), turnover_rate=row.get('turnover_rate')
-                    ))
-            
-            # C. 检查并同步当日披露的财报 (S4 修正版)
-            # 这里调用上一张指令卡修复后的 sync_financial_daily
-            # 由于 sync_financial_daily 是生成器，需要遍历它
-            for msg in self.sync_financial_daily(date_str):
-                yield f"    {msg}"
-            
-            self.db.commit()
-            time.sleep(0.5) # 2000积分频次保护 [cite: 345]
+            # ODS 已是最新，但上次运行可能在炼制阶段中断 (行情高水位落后或财务脏集未清空)
+            dws_hw = self.journal.high_water(MARKET_WIDE, STAGE_MARKET_DWS, "dws_market_indicators")
+            if dws_hw and dws_hw >= last_date_str and not self.journal.finance_dirty(self.universe().codes):
+                yield "☕ 数据已是最新，无需更新。"
+                return
+            yield "⏩ ODS 已是最新，但仍有待炼制的 DWS 数据，继续炼制..."
+        else:
+            yield f"🚀 发现 {len(trade_days)} 个交易日待补全: {trade_days[0]} -> {trade_days[-1]}"
+
+        # 2. 核心同步循环 (流水线: 后台线程预取下一交易日，主线程写入当日)
+        with DayPrefetcher(trade_days) as days:
+            for date_str, frames in days:
+                yield f"📅 正在处理: {date_str} ..."
+                if isinstance(frames, Exception):
+                    yield f"  ❌ {date_str} 数据拉取失败: {frames}，下次从此日续跑。"
+                    break
+
+                # A. 同步全市场行情 (S3)
+                if not self.sync_daily_market(date_str, frames["daily"], frames["adj_factor"]):
+                    # 行情未就绪或写入失败: 停止推进高水位，下次从该交易日续跑
+                    yield f"  ⚠️ {date_str} 行情未落地，暂停推进，下次从此日续跑。"
+                    break
+
+                # B. 同步每日指标 (PE/PB/市值) - 修正：需手动添加 horizontal 模式
+                df_basic = frames["daily_basic"]
+                if not df_basic.empty:
+                    # 仅存 universe 内的
+                    df_target = self.universe().filter(df_basic)
+                    stats = bulk_upsert(self.db, ODSDailyBasic, df_target)
+                    yield f"  ⚡ 每日指标写入 {stats['rows']} 行 ({stats['rps']:.0f} rows/s)"
+
+                # C. 检查并同步当日披露的财报 (S4 修正版)
+                # 由于 sync_financial_daily 是生成器，需要遍历它
+                for msg in self.sync_financial_daily(date_str, frames["disclosure_date"]):
+                    yield f"    {msg}"
+
+                # 当日数据与高水位同一事务提交
+                self.journal.mark(MARKET_WIDE, STAGE_ODS, "daily_routine", "done", high_water=date_str)
+                self.db.commit()
 
         # 3. 统一触发 DWS 重炼 [cite: 140]
         yield "🔄 正在重新炼制 DWS 衍生指标..."
         universe = list(self._get_universe_pool())
-        for i, ts_code in enumerate(universe):
-            self.process_market_dws(ts_code)
-            self.process_finance_dws(ts_code)
-            if i % 100 == 0:
-                yield f"  > 炼制进度: {i}/{len(universe)}"
-        
+        # 行情指标: 面板增量模式 (HFQ 口径下除权除息同样只需追加)
+        target = self._market_refine_target()
+        market = yield from self.refine_market_panel(universe, incremental=True)
+        self._mark_market_refined(target, [market])
+        # 财务指标: 仅炼制脏集中的 (ts_code, 报告期)
+        started = datetime.now()
+        dirty = self.journal.finance_dirty(universe)
+        if dirty:
+            yield f"  > 财务脏集: {len(dirty)} 只 / {sum(len(v) for v in dirty.values())} 个报告期"
+            yield from self.refine_finance_panel(list(dirty), end_dates=dirty)
+        else:
+            yield "  ☕ 无新增财报，跳过财务指标炼制。"
+        # 与已炼制脏记录同一截止时间: 清除 Universe 外标的及无合并报表报告期的脏记录，避免无限堆积
+        pruned = self.journal.prune_finance_dirty(universe, before=started)
+        self.db.commit()
+        if pruned:
+            yield f"  🧹 清除无需炼制的财务脏记录 {pruned} 条"
+
+        finance_years = {d[:4] for dates in dirty.values() for d in dates} if dirty else None
+        yield from self.sync_dws_mirror(finance_years=finance_years, market_recomputed=market["recomputed"])
+        yield from self.refresh_radar()
+        yield self._finance_stats_message()
         yield "✅ 全区间数据补全并炼制完成！"
 
 if __name__ == "__main__":
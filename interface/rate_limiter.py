@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器
+    约束: 任意 60 秒滑动窗口内的调用次数不超过 calls_per_min
+    做法: 桶容量为 burst，补充速率取 (calls_per_min - burst) / 60，
+          这样"初始突发 + 一分钟内的补充"之和恰好等于配额上限
+    """
+
+    def __init__(self, calls_per_min: int, burst: int = 1):
+        if calls_per_min < 2:
+            raise ValueError("calls_per_min 至少为 2")
+        self.capacity = max(1, min(burst, calls_per_min // 2))
+        self.rate = (calls_per_min - self.capacity) / 60.0  # 每秒补充的令牌数
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """阻塞直到拿到一个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EndpointLimiter:
+    """按接口名 (daily / income / ...) 分桶的限流器集合，每个接口独享 calls_per_min 配额"""
+
+    def __init__(self, calls_per_min: int, burst: int = 1):
+        self.calls_per_min = calls_per_min
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, endpoint: str):
+        with self.lock:
+            bucket = self.buckets.get(endpoint)
+            if bucket is None:
+                bucket = self.buckets[endpoint] = TokenBucket(self.calls_per_min, self.burst)
+        bucket.acquire()
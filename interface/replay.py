@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+import pandas as pd
+from interface.response_cache import make_cache_key, normalize_params
+
+
+class FixtureStore:
+    """
+    录制样本仓库: root/<接口>/<key>.parquet (+ 同名 .json 记录原始参数，便于人工核对)
+    key 与响应缓存一致 (接口名 + 规范化参数)
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, endpoint: str, params: dict) -> str:
+        return os.path.join(self.root, endpoint, make_cache_key(endpoint, params))
+
+    def save(self, endpoint: str, params: dict, df: pd.DataFrame):
+        base = self._path(endpoint, params)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        tmp = f"{base}.{uuid.uuid4().hex[:8]}.tmp"
+        df.to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp, f"{base}.parquet")
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump({"endpoint": endpoint, "params": normalize_params(params)}, f, ensure_ascii=False)
+
+    def load(self, endpoint: str, params: dict):
+        path = f"{self._path(endpoint, params)}.parquet"
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+
+class RecordingPro:
+    """录制模式: 透传真实 pro 接口，同时把每个响应写入 FixtureStore"""
+
+    def __init__(self, pro, store: FixtureStore):
+        self._pro = pro
+        self._store = store
+
+    def __getattr__(self, api_name):
+        real = getattr(self._pro, api_name)
+
+        def call(**params):
+            df = real(**params)
+            if df is not None:
+                self._store.save(api_name, params, df)
+            return df
+        return call
+
+
+class ReplayPro:
+    """
+    回放模式: 离线的 Tushare pro 替身
+    - 从 FixtureStore 读取录制样本，未录制的请求返回空表 (与接口无数据时一致)
+    - latency_ms 模拟网络往返
+    - calls_per_min 模拟服务端频次限制 (超限时抛出与 Tushare 一致的错误提示)
+    """
+
+    def __init__(self, store: FixtureStore, latency_ms: int = 0, calls_per_min: int = 0):
+        self._store = store
+        self._latency = latency_ms / 1000.0
+        self._limit = calls_per_min
+        self._history = {}
+        self._lock = threading.Lock()
+        self.misses = []
+
+    def _check_quota(self, api_name: str):
+        if not self._limit:
+            return
+        now = time.monotonic()
+        with self._lock:
+            window = self._history.setdefault(api_name, deque())
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self._limit:
+                raise Exception(f"抱歉，您每分钟最多访问该接口{self._limit}次 ({api_name})")
+            window.append(now)
+
+    def __getattr__(self, api_name):
+        if api_name.startswith("_"):
+            raise AttributeError(api_name)
+
+        def call(**params):
+            self._check_quota(api_name)
+            if self._latency:
+                time.sleep(self._latency)
+            df = self._store.load(api_name, params)
+            if df is None:
+                self.misses.append((api_name, normalize_params(params)))
+                print(f"⚠️ Replay miss: {api_name} {normalize_params(params)}")
+                return pd.DataFrame()
+            return df
+        return call
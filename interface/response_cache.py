@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import pandas as pd
+
+# 接口 -> (数据类别, 未定型数据的 TTL 秒数)
+# 类别决定"何时视为历史定型数据" (永久缓存)，TTL 作用于当日/未收官的数据
+ENDPOINT_RULES = {
+    "daily": ("market", 3600),
+    "adj_factor": ("market", 3600),
+    "daily_basic": ("market", 3600),
+    "income": ("finance", 12 * 3600),
+    "balancesheet": ("finance", 12 * 3600),
+    "cashflow": ("finance", 12 * 3600),
+    "fina_indicator": ("finance", 12 * 3600),
+    "disclosure_date": ("market", 3600),
+    "trade_cal": ("market", 12 * 3600),
+    "stock_basic": ("meta", 24 * 3600),
+    "index_weight": ("meta", 12 * 3600),
+}
+
+# 上界日期之后多少天抓取的数据视为"已定型" (永久缓存)
+# 行情: 次日仍可能有补录/修正，隔日之后抓取才定型；财务: 年报最晚 4 月底披露，留足修订窗口
+MARKET_SETTLE_DAYS = 1
+FINANCE_SETTLE_DAYS = 180
+SETTLE_DAYS = {"market": MARKET_SETTLE_DAYS, "finance": FINANCE_SETTLE_DAYS}
+
+# 缓存文件中记录抓取日期与 TTL 决策的 Parquet 元数据键
+META_KEY = b"ts_cache"
+
+# 查询区间的上界日期参数 (按优先级)
+UPPER_DATE_PARAMS = ("trade_date", "period", "actual_date", "ann_date", "end_date")
+
+
+def normalize_params(params: dict) -> dict:
+    """去掉 None 值并统一为字符串，保证同一请求得到同一 key"""
+    return {k: str(v) for k, v in sorted(params.items()) if v is not None and v != ""}
+
+
+def make_cache_key(endpoint: str, params: dict) -> str:
+    """内容寻址 key: sha1(接口名 + 规范化参数)"""
+    payload = json.dumps([endpoint, normalize_params(params)], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def cache_ttl(endpoint: str, params: dict, fetched: datetime = None):
+    """
+    TTL 规则 (在写入时以抓取日期决定，随条目一起保存，读取时不再重新推算)
+    返回: None = 永久 (已定型的历史数据)，正数 = 有效秒数，0 = 不缓存
+    - 行情/财务类: 抓取日期晚于 上界日期 + 定型天数 => 永久；否则短 TTL
+    - 开放区间 (只有 start_date) 与元数据类: 始终 TTL
+    """
+    rule = ENDPOINT_RULES.get(endpoint)
+    if rule is None:
+        return 0
+    kind, ttl = rule
+    if kind == "meta":
+        return ttl
+
+    norm = normalize_params(params)
+    upper = next((norm[p] for p in UPPER_DATE_PARAMS if p in norm), None)
+    if upper is None:
+        return ttl  # 只有 start_date 的开放区间，随时可能有新数据
+
+    fetched = fetched or datetime.now()
+    try:
+        settled = datetime.strptime(upper, "%Y%m%d") + timedelta(days=SETTLE_DAYS[kind])
+    except ValueError:
+        return ttl
+    return None if fetched.date() > settled.date() else ttl
+
+
+class ResponseCache:
+    """
+    Tushare 响应的本地持久化缓存 (压缩 Parquet)
+    目录结构: root/<接口>/<key 前两位>/<key>.parquet
+    文件元数据记录抓取日期、写入时间与写入时决定的 TTL，atime 记录最近读取时间 (用于 LRU 淘汰)
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.size = None  # 惰性统计
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, endpoint: str, key: str) -> str:
+        return os.path.join(self.root, endpoint, key[:2], f"{key}.parquet")
+
+    def get(self, endpoint: str, params: dict):
+        if not self.enabled or endpoint not in ENDPOINT_RULES:
+            return None
+
+        path = self._path(endpoint, make_cache_key(endpoint, params))
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        try:
+            import pyarrow.parquet as pq
+            table = pq.read_table(path)
+            meta = json.loads((table.schema.metadata or {})[META_KEY])
+        except Exception:
+            # 无写入元数据 (旧版本缓存) 或文件损坏: 视为未命中，重新抓取后覆盖
+            self.misses += 1
+            return None
+        # 使用写入时保存的 TTL 决策: 当时未定型的条目不会因日期推移变成永久
+        ttl = meta.get("ttl")
+        if ttl is not None and time.time() - meta["written_at"] > ttl:
+            self.misses += 1
+            return None
+
+        os.utime(path, (time.time(), stat.st_mtime))  # 刷新 LRU，保留写入时间
+        self.hits += 1
+        return table.to_pandas()
+
+    def put(self, endpoint: str, params: dict, df: pd.DataFrame):
+        # 空结果不缓存: 可能是数据尚未发布，缓存后会在定型后被当作永久结果
+        if not self.enabled or df is None or df.empty:
+            return
+        fetched = datetime.now()
+        ttl = cache_ttl(endpoint, params, fetched)
+        if ttl == 0:
+            return
+        path = self._path(endpoint, make_cache_key(endpoint, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            meta = json.dumps({"fetched": fetched.strftime("%Y%m%d"), "written_at": time.time(), "ttl": ttl})
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: meta.encode()})
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, path)
+        except ImportError as e:
+            # 缺少 pyarrow 时整体停用缓存，不影响正常抓取
+            print(f"⚠️ Cache disabled: {e}")
+            self.enabled = False
+            return
+        except Exception as e:
+            print(f"⚠️ Cache skip {endpoint}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self.lock:
+            if self.size is None:
+                self.size = self._scan_size()
+            else:
+                self.size += os.path.getsize(path)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for root, _, files in os.walk(self.root):
+            for f in files:
+                if f.endswith(".parquet"):
+                    path = os.path.join(root, f)
+                    try:
+                        yield path, os.stat(path)
+                    except FileNotFoundError:
+                        continue
+
+    def _scan_size(self) -> int:
+        return sum(st.st_size for _, st in self._files())
+
+    def _evict(self):
+        """按最近读取时间淘汰，直到回落到上限的 90%"""
+        entries = sorted(self._files(), key=lambda x: x[1].st_atime)
+        total = sum(st.st_size for _, st in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, st in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= st.st_size
+            except FileNotFoundError:
+                continue
+        self.size = total
@@ -1,17 +1,70 @@
 import tushare as ts
 import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor
 from core.config import settings
 from functools import wraps
+from interface.rate_limiter import EndpointLimiter
+from interface.response_cache import ResponseCache
+from interface.replay import FixtureStore, RecordingPro, ReplayPro
 
 class TushareClient:
     def __init__(self):
-        if not settings.TS_TOKEN:
+        mode = settings.TS_MODE
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown TS_MODE: {mode}")
+        if mode != "replay" and not settings.TS_TOKEN:
             raise ValueError("Tushare Token is missing in settings")
-        
-        # 初始化 Pro 接口 (PRD 1.1)
-        self.pro = ts.pro_api(settings.TS_TOKEN)
-        print(f"📡 Tushare Client Initialized. Token: {settings.TS_TOKEN[:5]}***")
+        self.mode = mode
+
+        # 初始化 Pro 接口 (PRD 1.1)；录制/回放模式下替换为对应的替身
+        if mode == "replay":
+            self.pro = ReplayPro(FixtureStore(settings.TS_FIXTURE_DIR),
+                                 latency_ms=settings.TS_REPLAY_LATENCY_MS,
+                                 calls_per_min=settings.TS_REPLAY_CALLS_PER_MIN)
+        else:
+            self.pro = ts.pro_api(settings.TS_TOKEN)
+            if mode == "record":
+                self.pro = RecordingPro(self.pro, FixtureStore(settings.TS_FIXTURE_DIR))
+
+        # 每个接口独立令牌桶，替代调用方手写的 time.sleep 频次保护
+        self.limiter = EndpointLimiter(settings.TS_CALLS_PER_MIN, burst=settings.TS_BURST)
+        self.max_workers = settings.TS_MAX_WORKERS
+        # 本地响应缓存：命中时既不走网络也不消耗频次配额
+        # (录制/回放模式下关闭，确保每个请求都真实经过录制器或回放替身)
+        self.cache = None
+        if settings.TS_CACHE_ENABLED and mode == "live":
+            self.cache = ResponseCache(settings.TS_CACHE_DIR, settings.TS_CACHE_MAX_MB * 1024 * 1024)
+
+        if mode == "replay":
+            print(f"📡 Tushare Client Initialized. Mode: replay ({settings.TS_FIXTURE_DIR})")
+        else:
+            print(f"📡 Tushare Client Initialized. Mode: {mode}, Token: {settings.TS_TOKEN[:5]}***")
+
+    def _call(self, api_name: str, **params):
+        """统一出口：先查本地缓存，未命中再取令牌访问 pro 接口"""
+        if self.cache:
+            cached = self.cache.get(api_name, params)
+            if cached is not None:
+                return cached
+
+        self.limiter.acquire(api_name)
+        df = getattr(self.pro, api_name)(**params)
+        if self.cache:
+            self.cache.put(api_name, params, df)
+        return df
+
+    def fetch_many(self, jobs: dict, max_workers: int = None) -> dict:
+        """
+        并发抓取: jobs = {名称: (fetch 方法, 参数字典)}
+        线程池有界，每个请求仍经过对应接口的令牌桶，不会突破频次配额
+        """
+        if not jobs:
+            return {}
+        workers = min(max_workers or self.max_workers, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ts-fetch") as pool:
+            futures = {name: pool.submit(func, **kwargs) for name, (func, kwargs) in jobs.items()}
+            return {name: fut.result() for name, fut in futures.items()}
 
     def retry_policy(func):
         """
@@ -36,7 +89,17 @@ class TushareClient:
     def fetch_stock_basic(self):
         """获取全市场股票列表 (PRD 2.1)"""
         fields = 'ts_code,symbol,name,area,industry,market,list_date'
-        return self.pro.stock_basic(exchange='', list_status='L', fields=fields)
+        return self._call('stock_basic', exchange='', list_status='L', fields=fields)
+
+    @retry_policy
+    def fetch_index_weight(self, index_code, start_date=None, end_date=None):
+        """指数成分及权重 (中证800 标记)"""
+        return self._call('index_weight', index_code=index_code, start_date=start_date, end_date=end_date)
+
+    @retry_policy
+    def fetch_trade_cal(self, start_date=None, end_date=None, is_open='1'):
+        """交易日历"""
+        return self._call('trade_cal', exchange='', start_date=start_date, end_date=end_date, is_open=is_open)
 
     # --- 2. 市场行情 (Column Storage) ---
 
@@ -46,39 +109,50 @@ class TushareClient:
         日线行情
         Ref: Tushare PDF Daily Interface [cite: 252]
         """
-        return self.pro.daily(ts_code=ts_code, trade_date=trade_date, 
-                              start_date=start_date, end_date=end_date)
+        return self._call('daily', ts_code=ts_code, trade_date=trade_date,
+                          start_date=start_date, end_date=end_date)
 
     @retry_policy
     def fetch_adj_factor(self, ts_code=None, trade_date=None, start_date=None, end_date=None):
         """复权因子"""
-        return self.pro.adj_factor(ts_code=ts_code, trade_date=trade_date, 
-                                   start_date=start_date, end_date=end_date)
+        return self._call('adj_factor', ts_code=ts_code, trade_date=trade_date,
+                          start_date=start_date, end_date=end_date)
+
+    @retry_policy
+    def fetch_daily_basic(self, ts_code=None, trade_date=None, start_date=None, end_date=None):
+        """每日指标 (PE/PB/换手率/总市值)"""
+        return self._call('daily_basic', ts_code=ts_code, trade_date=trade_date,
+                          start_date=start_date, end_date=end_date)
 
     # --- 3. 财务数据 (JSONB Storage) ---
     @retry_policy
     def fetch_income(self, ts_code=None, ann_date=None, start_date=None, end_date=None, period=None):
         """利润表 - 将参数设为可选，支持垂直回溯 [cite: 631-632]"""
-        return self.pro.income(ts_code=ts_code, ann_date=ann_date, 
-                               start_date=start_date, end_date=end_date, period=period)
+        return self._call('income', ts_code=ts_code, ann_date=ann_date,
+                          start_date=start_date, end_date=end_date, period=period)
 
     @retry_policy
     def fetch_balancesheet(self, ts_code=None, ann_date=None, start_date=None, end_date=None, period=None):
         """资产负债表 [cite: 654-655]"""
-        return self.pro.balancesheet(ts_code=ts_code, ann_date=ann_date, 
-                                     start_date=start_date, end_date=end_date, period=period)
+        return self._call('balancesheet', ts_code=ts_code, ann_date=ann_date,
+                          start_date=start_date, end_date=end_date, period=period)
 
     @retry_policy
     def fetch_cashflow(self, ts_code=None, ann_date=None, start_date=None, end_date=None, period=None):
         """现金流量表 [cite: 692-693]"""
-        return self.pro.cashflow(ts_code=ts_code, ann_date=ann_date, 
-                                 start_date=start_date, end_date=end_date, period=period)
+        return self._call('cashflow', ts_code=ts_code, ann_date=ann_date,
+                          start_date=start_date, end_date=end_date, period=period)
 
     @retry_policy
     def fetch_fina_indicator(self, ts_code=None, ann_date=None, start_date=None, end_date=None, period=None):
         """财务指标表 [cite: 753-754]"""
-        return self.pro.fina_indicator(ts_code=ts_code, ann_date=ann_date, 
-                                       start_date=start_date, end_date=end_date, period=period)
+        return self._call('fina_indicator', ts_code=ts_code, ann_date=ann_date,
+                          start_date=start_date, end_date=end_date, period=period)
+
+    @retry_policy
+    def fetch_disclosure_date(self, actual_date=None, end_date=None, ts_code=None):
+        """财报披露计划 (按实际披露日反查个股)"""
+        return self._call('disclosure_date', ts_code=ts_code, end_date=end_date, actual_date=actual_date)
 
 # 单例模式
 ts_client = TushareClient()
\ No newline at end of file
@@ -1,9 +1,13 @@
 # FILE PATH: main.py
-from nicegui import ui
+from nicegui import ui, app
 from ui.layout import theme_setup, shared_menu
 from ui.pages.console import ConsolePage
 from ui.pages.watchlist import WatchlistPage
 from ui.pages.radar import RadarPage
+from engine.jobs import get_job_worker
+
+# 后台任务调度器随服务启动 (排队中的任务无需打开控制台页面即可执行)
+app.on_startup(get_job_worker)
 
 # --- 注意：全局作用域严禁出现 ui.xxx 组件调用 ---
 
@@ -1,4 +1,5 @@
 # FILE PATH: test_radar.py
+# 离线运行: 先以 TS_MODE=record 在线跑一次录制样本，之后用 TS_MODE=replay 无需网络与 Token
 import sys
 import os
 
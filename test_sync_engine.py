@@ -1,4 +1,5 @@
 # FILE PATH: test_sync_engine.py
+# 离线运行: 先以 TS_MODE=record 在线跑一次录制样本，之后用 TS_MODE=replay 无需网络与 Token
 import sys
 import os
 
@@ -41,7 +42,7 @@ def run_test_sync(ts_code='600519.SH'):
         std_finance = db.query(DWSFinanceStd).filter(DWSFinanceStd.ts_code == ts_code).count()
         
         if latest_ma:
-            print(f"📈 DWS 行情检查：最新收盘价(QFQ): {latest_ma.close_qfq:.2f}, MA250: {latest_ma.ma_250 or '计算中'}")
+            print(f"📈 DWS 行情检查：最新收盘价(HFQ): {latest_ma.close_hfq:.2f}, 复权因子: {latest_ma.adj_factor}, MA250: {latest_ma.ma_250 or '计算中'}")
         print(f"💰 DWS 财务检查：已炼制标准化财报 {std_finance} 条。")
 
         if daily_count > 0 and finance_count > 0:
@@ -0,0 +1,41 @@
+import os
+import sys
+import uuid
+import pytest
+
+# 将项目根目录添加到路径 (与 tools/ 脚本一致)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pg_session():
+    """
+    独立临时 schema 中的数据库会话 (建好全部表，用后整体删除)
+    未配置 DB_URL 或无法连接 PostgreSQL 时跳过
+    """
+    try:
+        from database.models import Base, engine
+    except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+        pytest.skip(str(e))
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+
+    try:
+        conn = engine.connect()
+    except OperationalError as e:
+        pytest.skip(f"无法连接数据库: {e}")
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    conn.execute(text(f'SET search_path TO "{schema}"'))
+    Base.metadata.create_all(bind=conn)
+    conn.commit()
+    session = Session(bind=conn)
+    try:
+        yield session
+    finally:
+        session.close()
+        conn.rollback()
+        conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        conn.commit()
+        conn.close()
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from engine.adjust import hfq_to_qfq
+
+
+def _hfq_rows(ts_code, closes, factors, start=1):
+    """原始收盘价 + 复权因子 -> DWS 后复权行 (close_hfq = close * adj_factor)"""
+    return pd.DataFrame({
+        "ts_code": ts_code,
+        "trade_date": [f"202401{d:02d}" for d in range(start, start + len(closes))],
+        "adj_factor": factors,
+        "close_hfq": [c * f for c, f in zip(closes, factors)],
+    })
+
+
+def test_latest_day_equals_raw_close():
+    # 第三天除权: 原始价从 20 跌到 10，复权因子翻倍
+    df = _hfq_rows("A.SH", [20.0, 20.0, 10.0, 11.0], [1.0, 1.0, 2.0, 2.0])
+    out = hfq_to_qfq(df)
+    assert out["close_qfq"].tolist() == pytest.approx([10.0, 10.0, 10.0, 11.0])
+    # 不修改入参
+    assert "close_qfq" not in df.columns
+
+
+def test_scale_is_per_stock_and_ignores_row_order():
+    df = pd.concat([
+        _hfq_rows("A.SH", [20.0, 10.0], [1.0, 2.0]),
+        _hfq_rows("B.SZ", [5.0, 5.0], [3.0, 3.0]),
+    ]).sample(frac=1, random_state=7)
+    df["ma_20"] = df["close_hfq"] * 2
+    out = hfq_to_qfq(df).set_index(["ts_code", "trade_date"]).sort_index()
+
+    assert out["close_qfq"].tolist() == pytest.approx([10.0, 10.0, 5.0, 5.0])
+    assert out["ma_20"].tolist() == pytest.approx([20.0, 20.0, 10.0, 10.0])
+    # 缺失的均线列不会被补出
+    assert "ma_850" not in out.columns
+
+
+def test_empty_frame():
+    out = hfq_to_qfq(pd.DataFrame(columns=["ts_code", "trade_date", "adj_factor", "close_hfq"]))
+    assert out.empty and "close_qfq" in out.columns
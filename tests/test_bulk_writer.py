@@ -0,0 +1,115 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from database.bulk_writer import bulk_upsert, content_hash, to_jsonable
+
+
+def _jsonb_round_trip(payload):
+    """模拟 JSONB 读回: numeric 不保留指数形式，整数值的大数读回为整数"""
+    def restore(v):
+        if isinstance(v, dict):
+            return {k: restore(x) for k, x in v.items()}
+        if isinstance(v, float) and v.is_integer() and abs(v) >= 1e16:
+            return int(v)
+        return v
+    return restore(json.loads(json.dumps(to_jsonable(payload), default=str)))
+
+
+def test_content_hash_stable_across_jsonb_round_trip():
+    record = {"revenue": 1.5e20, "n_income": 0.1, "roe": np.float64("nan"), "ann_date": "20240330",
+              "update_flag": np.int64(1), "goodwill": np.float64(2.0), "missing": None}
+    assert content_hash(record) == content_hash(_jsonb_round_trip(record))
+
+
+def test_content_hash_treats_nan_as_null():
+    assert content_hash({"roe": float("nan")}) == content_hash({"roe": None})
+    assert content_hash({"roe": np.float64("inf")}) == content_hash({"roe": None})
+
+
+def test_content_hash_ignores_key_order_but_not_values():
+    assert content_hash({"a": 1, "b": 2.5}) == content_hash({"b": 2.5, "a": 1})
+    assert content_hash({"a": 1, "b": 2.5}) != content_hash({"a": 1, "b": 2.6})
+
+
+def test_to_jsonable_converts_numpy_scalars():
+    out = to_jsonable({"x": np.int64(3), "y": [np.float64(1.25), np.bool_(True)]})
+    assert out == {"x": 3, "y": [1.25, True]}
+    assert type(out["x"]) is int and type(out["y"][1]) is bool
+
+
+# --- bulk_upsert (需要 PostgreSQL，见 conftest.pg_session) ---
+
+def _stock_model():
+    from database.models import StockBasic
+    return StockBasic
+
+
+def _report_rows(data: dict) -> pd.DataFrame:
+    """ods_finance_report 行: 每个 (ts_code, end_date) 一行，data 为载荷"""
+    return pd.DataFrame([
+        {"ts_code": code, "end_date": end, "report_type": "1", "update_flag": "0", "category": "income",
+         "data": payload, "payload_hash": content_hash(payload)}
+        for (code, end), payload in data.items()
+    ])
+
+
+def test_bulk_upsert_inserts_and_overwrites_on_conflict(pg_session):
+    StockBasic = _stock_model()
+    rows = pd.DataFrame({"ts_code": ["A.SH", "B.SZ"], "name": ["甲", "乙"], "is_csi800": [True, False]})
+    stats = bulk_upsert(pg_session, StockBasic, rows)
+    assert stats["rows"] == 2
+
+    # 冲突行覆盖非主键列；同批次重复主键保留最后一条
+    again = pd.DataFrame({"ts_code": ["B.SZ", "C.SZ", "C.SZ"], "name": ["乙2", "丙", "丙2"],
+                          "is_csi800": [True, False, np.nan]})
+    stats = bulk_upsert(pg_session, StockBasic, again)
+    pg_session.commit()
+    assert stats["rows"] == 2
+
+    got = dict(pg_session.execute(text("SELECT ts_code, name FROM stock_basic")).fetchall())
+    assert got == {"A.SH": "甲", "B.SZ": "乙2", "C.SZ": "丙2"}
+    assert pg_session.execute(text("SELECT is_csi800 FROM stock_basic WHERE ts_code = 'C.SZ'")).scalar() is None
+
+
+def test_bulk_upsert_requires_primary_key(pg_session):
+    with pytest.raises(ValueError):
+        bulk_upsert(pg_session, _stock_model(), pd.DataFrame({"name": ["甲"]}))
+
+
+def test_bulk_upsert_change_column_counts(pg_session):
+    from database.models import ODSFinanceReport
+
+    first = {("A.SH", "20231231"): {"revenue": 1.0}, ("A.SH", "20240331"): {"revenue": 2.0}}
+    stats = bulk_upsert(pg_session, ODSFinanceReport, _report_rows(first), change_column="payload_hash")
+    pg_session.commit()
+    assert (stats["inserted"], stats["updated"], stats["skipped"]) == (2, 0, 0)
+
+    # 一行未变 / 一行修订 / 一行新增: changed 只含修订与新增的主键
+    second = {("A.SH", "20231231"): {"revenue": 1.0}, ("A.SH", "20240331"): {"revenue": 2.5},
+              ("A.SH", "20240630"): {"revenue": 3.0}}
+    stats = bulk_upsert(pg_session, ODSFinanceReport, _report_rows(second), change_column="payload_hash")
+    pg_session.commit()
+    assert (stats["inserted"], stats["updated"], stats["skipped"]) == (1, 1, 1)
+    assert sorted(c["end_date"] for c in stats["changed"]) == ["20240331", "20240630"]
+
+    # JSONB 读回后的载荷与写入时的哈希一致
+    data, stored = pg_session.execute(text(
+        "SELECT data, payload_hash FROM ods_finance_report WHERE end_date = '20240331'")).fetchone()
+    assert data == {"revenue": 2.5} and content_hash(data) == stored
+
+
+def test_bulk_upsert_empty_frame(pg_session):
+    stats = bulk_upsert(pg_session, _stock_model(), pd.DataFrame(), change_column="name")
+    assert stats["rows"] == 0 and stats["changed"] == []
+
+
+def test_bulk_upsert_keeps_empty_strings_distinct_from_null(pg_session):
+    rows = pd.DataFrame({"ts_code": ["A.SH", "B.SZ", "C.SZ"], "name": ["", None, np.nan],
+                         "industry": ["银行", "", None]})
+    bulk_upsert(pg_session, _stock_model(), rows)
+    pg_session.commit()
+    got = {r.ts_code: (r.name, r.industry) for r in pg_session.execute(
+        text("SELECT ts_code, name, industry FROM stock_basic")).fetchall()}
+    assert got == {"A.SH": ("", "银行"), "B.SZ": (None, ""), "C.SZ": (None, None)}
@@ -0,0 +1,99 @@
+import os
+import pytest
+from sqlalchemy import text
+
+# 需要 PostgreSQL，见 conftest.pg_session
+try:
+    from engine import dws_mirror
+    from engine.dws_mirror import DWSMirror, load_dws
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+TABLE = "dws_market_indicators"
+
+
+def _insert(db, rows):
+    for ts_code, trade_date, close in rows:
+        db.execute(text("""
+            INSERT INTO dws_market_indicators (ts_code, trade_date, close_hfq) VALUES (:c, :d, :v)
+            ON CONFLICT (ts_code, trade_date) DO UPDATE SET close_hfq = EXCLUDED.close_hfq
+        """), {"c": ts_code, "d": trade_date, "v": close})
+    db.commit()
+
+
+@pytest.fixture
+def mirror(pg_session, tmp_path):
+    _insert(pg_session, [("A.SH", "20231229", 1.0), ("A.SH", "20240102", 2.0), ("B.SZ", "20240102", 3.0)])
+    return DWSMirror(pg_session, root=str(tmp_path))
+
+
+def _files(mirror):
+    entry = mirror.load_manifest()[TABLE]
+    return {year: list(files) for year, files in entry["years"].items()}
+
+
+def _on_disk(mirror):
+    return {os.path.relpath(os.path.join(d, f), mirror.root)
+            for d, _, names in os.walk(os.path.join(mirror.root, TABLE)) for f in names}
+
+
+def test_first_append_rebuilds_all_years(mirror):
+    assert mirror.append(TABLE) == 3
+    entry = mirror.load_manifest()[TABLE]
+    assert entry["key"] == "trade_date" and entry["high_water"] == "20240102"
+    assert sorted(entry["years"]) == ["2023", "2024"]
+    assert _on_disk(mirror) == {f for files in _files(mirror).values() for f in files}
+
+    df = load_dws(TABLE, root=mirror.root)
+    assert sorted(zip(df.ts_code, df.trade_date)) == [("A.SH", "20231229"), ("A.SH", "20240102"), ("B.SZ", "20240102")]
+
+
+def test_append_adds_fragment_after_high_water(mirror, pg_session):
+    mirror.append(TABLE)
+    before = _files(mirror)
+    _insert(pg_session, [("A.SH", "20240103", 4.0)])
+    assert mirror.append(TABLE) == 1
+    assert mirror.append(TABLE) == 0  # 无新行: manifest 不变
+
+    after = _files(mirror)
+    assert after["2023"] == before["2023"]
+    assert after["2024"][0] == before["2024"][0] and len(after["2024"]) == 2
+    assert mirror.load_manifest()[TABLE]["high_water"] == "20240103"
+    assert len(load_dws(TABLE, codes=["A.SH"], start="20240101", root=mirror.root)) == 2
+
+
+def test_append_since_rebuilds_rewritten_years(mirror, pg_session):
+    mirror.append(TABLE)
+    _insert(pg_session, [("A.SH", "20240103", 4.0)])
+    mirror.append(TABLE)
+    stale = _files(mirror)
+
+    # 整只重算: 2023 年的历史行被改写
+    _insert(pg_session, [("A.SH", "20231229", 10.0), ("A.SH", "20240104", 5.0)])
+    assert mirror.append(TABLE, since="20231229") == 1 + (1 + 4)  # 追加 1 行 + 重导 2023 / 2024 两年
+
+    files = _files(mirror)
+    assert all(len(f) == 1 and "part-full-" in f[0] for f in files.values())
+    # 被替换的旧文件在 manifest 发布后删除
+    assert not _on_disk(mirror) & {f for fs in stale.values() for f in fs}
+    df = load_dws(TABLE, codes=["A.SH"], end="20231231", root=mirror.root)
+    assert df["close_hfq"].tolist() == [10.0]
+
+
+def test_fragments_compacted_past_threshold(mirror, pg_session, monkeypatch):
+    monkeypatch.setattr(dws_mirror, "COMPACT_FRAGMENTS", 2)
+    mirror.append(TABLE)
+    for day in ["20240103", "20240104"]:
+        _insert(pg_session, [("B.SZ", day, 1.0)])
+        mirror.append(TABLE)
+    assert len(_files(mirror)["2024"]) == 1
+    assert len(load_dws(TABLE, start="20240101", root=mirror.root)) == 4
+
+
+def test_full_rebuild_drops_years_gone_from_db(mirror, pg_session):
+    mirror.append(TABLE)
+    pg_session.execute(text("DELETE FROM dws_market_indicators WHERE trade_date < '20240101'"))
+    pg_session.commit()
+    assert mirror.rebuild(TABLE) == 2
+    assert list(_files(mirror)) == ["2024"]
+    assert not any("year=2023" in f for f in _on_disk(mirror))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from engine.factors import AUDIT_FACTORS, compute_factors, evaluate, safe_div, selection_reason
+
+
+def test_safe_div_defaults_on_bad_denominator():
+    got = safe_div([1.0, 2.0, 3.0, 4.0, np.nan, 6.0], [2.0, 0.0, np.nan, np.inf, 1.0, -3.0])
+    np.testing.assert_array_equal(got, [0.5, 0.0, 0.0, 0.0, np.nan, -2.0])
+    np.testing.assert_array_equal(safe_div([1.0], [0.0], default=np.nan), [np.nan])
+    # 接受 Series / 标量，不产生除零警告
+    with np.errstate(all='raise'):
+        assert safe_div(pd.Series([1.0]), 0).tolist() == [0.0]
+
+
+def _legacy_reason(row):
+    """原雷达 generate_reason (逐行 apply)"""
+    reasons = []
+    if row['roe'] >= 20: reasons.append("高ROE(>20%)")
+    if row['ocf_to_net_profit'] >= 1.2: reasons.append("现金含量极高")
+    if row['goodwill_net_asset_ratio'] > 0.2: reasons.append("⚠商誉偏高")
+    if row['toxic_asset_ratio'] > 0.04: reasons.append("⚠资产成色一般")
+    return " | ".join(reasons) if reasons else "多因子均衡"
+
+
+def test_selection_reason_matches_row_wise_rules():
+    rng = np.random.default_rng(5)
+    n = 500
+    df = pd.DataFrame({
+        "roe": rng.uniform(0, 30, n),
+        "ocf_to_net_profit": rng.uniform(0, 2, n),
+        "goodwill_net_asset_ratio": rng.uniform(0, 0.3, n),
+        "toxic_asset_ratio": rng.uniform(0, 0.06, n),
+    }, index=rng.permutation(n) + 1000)
+    df.iloc[::17, 0] = np.nan  # 缺失值: 比较不成立，不命中
+    got = selection_reason(df)
+    assert got.index.equals(df.index)
+    assert got.tolist() == df.apply(_legacy_reason, axis=1).tolist()
+    assert "高ROE(>20%) | 现金含量极高 | ⚠商誉偏高 | ⚠资产成色一般" in set(got)
+    assert selection_reason(df.iloc[0:0]).empty
+
+
+def test_compute_factors_treats_missing_items_as_zero():
+    df = pd.DataFrame({
+        "n_cashflow_act": [120.0, None, 50.0],
+        "n_income_attr_p": [100.0, 80.0, 0.0],
+        "oth_receiv": [3.0, None, 1.0],
+        "prepayment": [2.0, 4.0, None],
+        "total_assets": [100.0, 200.0, None],
+        # 缺 goodwill 列: 商誉占比为 0
+        "total_hldr_eqy_exc_min_int": [50.0, 60.0, 70.0],
+    })
+    out = compute_factors(df, AUDIT_FACTORS, decimals=4)
+    assert out is df
+    assert df["ocf_to_net_profit"].tolist() == [1.2, 0.0, 0.0]
+    assert df["toxic_asset_ratio"].tolist() == [0.05, 0.02, 0.0]
+    assert df["goodwill_net_asset_ratio"].tolist() == [0.0, 0.0, 0.0]
+    # evaluate 不修改入参
+    before = df.copy()
+    assert evaluate(df, "goodwill_to_assets").tolist() == [0.0, 0.0, 0.0]
+    pd.testing.assert_frame_equal(df, before)
+    with pytest.raises(KeyError):
+        evaluate(df, "no_such_factor")
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+
+# 需要 PostgreSQL，见 conftest.pg_session
+try:
+    from engine.journal import SyncJournal, STAGE_ODS, STAGE_FINANCE_DWS, ODS_DATASETS, MARKET_WIDE
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+
+@pytest.fixture
+def journal(pg_session):
+    return SyncJournal(pg_session)
+
+
+def _mark_ods(journal, ts_code, status="done", start_date="20150101", high_water="20241231", datasets=ODS_DATASETS):
+    journal.mark_many([
+        {"ts_code": ts_code, "stage": STAGE_ODS, "dataset": d, "status": status,
+         "start_date": start_date, "high_water": high_water}
+        for d in datasets
+    ])
+
+
+def test_high_water_only_moves_forward(journal, pg_session):
+    journal.mark(MARKET_WIDE, STAGE_ODS, "daily_routine", "done", high_water="20241015")
+    journal.mark(MARKET_WIDE, STAGE_ODS, "daily_routine", "done", high_water="20241010")
+    pg_session.commit()
+    assert journal.high_water(MARKET_WIDE, STAGE_ODS, "daily_routine") == "20241015"
+
+    journal.mark(MARKET_WIDE, STAGE_ODS, "daily_routine", "done", high_water="20241016")
+    assert journal.high_water(MARKET_WIDE, STAGE_ODS, "daily_routine") == "20241016"
+
+
+def test_high_water_ignores_unfinished(journal, pg_session):
+    journal.mark("600519.SH", STAGE_ODS, "daily", "failed", high_water="20241015", message="timeout")
+    assert journal.high_water("600519.SH", STAGE_ODS, "daily") is None
+
+
+def test_resume_skips_completed_codes(journal, pg_session):
+    _mark_ods(journal, "600519.SH")
+    _mark_ods(journal, "600036.SH", datasets=ODS_DATASETS[:-1])         # 缺一个数据集
+    _mark_ods(journal, "000001.SZ", status="failed")
+    _mark_ods(journal, "000002.SZ", start_date="20200101")              # 回溯起点较晚
+    pg_session.commit()
+
+    assert journal.completed(STAGE_ODS, ODS_DATASETS) == {"600519.SH", "000002.SZ"}
+    # 要求从 20150101 起回溯时，起点更晚的记录不算完成，需要重跑
+    assert journal.completed(STAGE_ODS, ODS_DATASETS, start_date="20150101") == {"600519.SH"}
+    assert journal.completed(STAGE_FINANCE_DWS, ["dws_finance_std"]) == set()
+
+
+def test_short_increment_keeps_earlier_start(journal, pg_session):
+    _mark_ods(journal, "600519.SH", start_date="20150101")
+    _mark_ods(journal, "600519.SH", start_date="20241001", high_water="20241231")
+    pg_session.commit()
+    assert journal.completed(STAGE_ODS, ODS_DATASETS, start_date="20150101") == {"600519.SH"}
+
+
+def test_finance_dirty_mark_and_clear(journal, pg_session):
+    journal.mark_finance_dirty(pd.DataFrame({
+        "ts_code": ["600519.SH", "600519.SH", "600036.SH", "600036.SH"],
+        "end_date": ["20240331", "20240630", "20240630", "20240630"],
+    }))
+    pg_session.commit()
+    assert journal.finance_dirty() == {"600519.SH": ["20240331", "20240630"], "600036.SH": ["20240630"]}
+    assert journal.finance_dirty(["600036.SH"]) == {"600036.SH": ["20240630"]}
+
+    # 按 (代码, 报告期) 清除: 只清掉已炼制的报告期
+    journal.clear_finance_dirty(["600519.SH"], {"600519.SH": ["20240331"]})
+    assert journal.finance_dirty(["600519.SH"]) == {"600519.SH": ["20240630"]}
+
+    # before 之后 (炼制期间) 登记的脏记录保留到下一轮
+    journal.clear_finance_dirty(["600519.SH", "600036.SH"], before=datetime.now() - timedelta(hours=1))
+    assert journal.finance_dirty() == {"600519.SH": ["20240630"], "600036.SH": ["20240630"]}
+
+    journal.clear_finance_dirty(["600519.SH", "600036.SH"])
+    pg_session.commit()
+    assert journal.finance_dirty() == {}
+
+
+def test_prune_finance_dirty_drops_unrefinable_pairs(journal, pg_session):
+    from sqlalchemy import text
+    pg_session.execute(text("""
+        INSERT INTO ods_finance_report (ts_code, end_date, report_type, update_flag, category, data)
+        VALUES ('600519.SH', '20240630', '1', '0', 'income', '{}'),
+               ('600519.SH', '20240331', '2', '0', 'income', '{}'),
+               ('000002.SZ', '20240630', '1', '0', 'income', '{}')
+    """))
+    journal.mark_finance_dirty(pd.DataFrame({
+        "ts_code": ["600519.SH", "600519.SH", "000002.SZ"],
+        "end_date": ["20240630", "20240331", "20240630"],
+    }))
+    pg_session.commit()
+
+    # before 之后登记的保留
+    assert journal.prune_finance_dirty(["600519.SH"], before=datetime.now() - timedelta(hours=1)) == 0
+    # 000002.SZ 已移出 Universe；20240331 只有单季报表 (report_type='2')，财务 DWS 不会炼制
+    assert journal.prune_finance_dirty(["600519.SH"]) == 2
+    pg_session.commit()
+    assert journal.finance_dirty() == {"600519.SH": ["20240630"]}
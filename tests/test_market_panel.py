@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# database.models 会触发 core.config 完整性检查 (compute / recomputed 本身不访问数据库)
+try:
+    from engine.market_panel import MarketPanelEngine
+    from engine.adjust import MA_WINDOWS
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+
+def _panel(lengths: dict, seed: int = 3) -> pd.DataFrame:
+    """随机面板 (按 ts_code, trade_date 排序)，含缺失收盘价、缺失复权因子与除权跳变"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for code, n in lengths.items():
+        dates = pd.bdate_range("2015-01-05", periods=n).strftime("%Y%m%d")
+        close = 10 + rng.standard_normal(n).cumsum() * 0.1
+        close[min(5, n - 1)] = np.nan          # 缺失收盘价: 覆盖它的窗口均线为空
+        factor = np.where(np.arange(n) < n // 2, 1.0, 1.7)
+        factor[rng.random(n) < 0.05] = np.nan  # 因子缺失: 组内前向填充
+        factor[0] = np.nan                     # 首日缺失: 无可填充值
+        frames.append(pd.DataFrame({"ts_code": code, "trade_date": dates, "close": close, "adj_factor": factor}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _rolling_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """逐只 pandas rolling 的参考实现"""
+    out = df.copy()
+    out["adj_factor"] = out.groupby("ts_code")["adj_factor"].ffill()
+    out["close_hfq"] = out["close"] * out["adj_factor"]
+    for ma in MA_WINDOWS:
+        out[f"ma_{ma}"] = out.groupby("ts_code")["close_hfq"].transform(
+            lambda s: s.rolling(window=ma, min_periods=ma).mean())
+    return out
+
+
+def test_compute_matches_grouped_rolling():
+    df = _panel({"A.SH": 900, "B.SZ": 300, "C.SZ": 30})
+    got = MarketPanelEngine.compute(df)
+    want = _rolling_reference(df)
+    for col in ["adj_factor", "close_hfq"] + [f"ma_{ma}" for ma in MA_WINDOWS]:
+        np.testing.assert_allclose(got[col].to_numpy(), want[col].to_numpy(), rtol=1e-9, equal_nan=True)
+    # 窗口不跨越股票边界: B 只有 300 根 K 线，ma_850 全部为空
+    assert got.loc[got.ts_code == "B.SZ", "ma_850"].isna().all()
+    assert got.loc[got.ts_code == "A.SH", "ma_850"].notna().any()
+
+
+def test_compute_does_not_mutate_input_and_handles_empty():
+    df = _panel({"A.SH": 40})
+    before = df.copy()
+    MarketPanelEngine.compute(df)
+    pd.testing.assert_frame_equal(df, before)
+    assert MarketPanelEngine.compute(df.iloc[:0]).empty
+
+
+def test_recomputed_reports_rewritten_history():
+    written = pd.DataFrame({
+        "ts_code": ["A.SH", "A.SH", "B.SZ", "C.SZ", "C.SZ"],
+        "trade_date": ["20240103", "20240104", "20240102", "20230105", "20240104"],
+        "last_date": ["20240102", "20240102", None, "20240103", "20240103"],
+    })
+    # A: 仅追加新 K 线；B: 首次炼制；C: 因子修订后整只重算
+    assert MarketPanelEngine.recomputed(written) == {"B.SZ": "20240102", "C.SZ": "20230105"}
@@ -0,0 +1,85 @@
+import uuid
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+# 需要 PostgreSQL: 迁移函数自行开连接，故使用 search_path 指向临时 schema 的独立引擎
+try:
+    from database.models import Base, engine
+    from database.migrate import sync_hot_columns, _partition_market_tables
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+
+@pytest.fixture
+def pg_engine():
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    except OperationalError as e:
+        pytest.skip(f"无法连接数据库: {e}")
+    bound = create_engine(engine.url, connect_args={"options": f"-csearch_path={schema}"})
+    Base.metadata.create_all(bind=bound)
+    try:
+        yield bound
+    finally:
+        bound.dispose()
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+
+
+def _scalar(bind, sql):
+    with bind.connect() as conn:
+        return conn.execute(text(sql)).scalar()
+
+
+def test_sync_hot_columns_adds_and_backfills_new_field(pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO ods_finance_report (ts_code, end_date, report_type, update_flag, category, data)
+            VALUES ('A.SH', '20231231', '1', '0', 'fina_indicator', '{"roe": 12.5}'),
+                   ('A.SH', '20240331', '1', '0', 'fina_indicator', '{"roic": 3.0}')
+        """))
+    assert sync_hot_columns(pg_engine) is None  # create_all 建的列已就绪
+
+    # 模拟 HOT_FINANCE_FIELDS 新增字段: 列缺失
+    with pg_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE ods_finance_report DROP COLUMN roe"))
+    note = sync_hot_columns(pg_engine)
+    assert "roe" in note and "已回填 1 行" in note
+    assert _scalar(pg_engine, "SELECT roe FROM ods_finance_report WHERE end_date = '20231231'") == 12.5
+    assert _scalar(pg_engine, "SELECT roe FROM ods_finance_report WHERE end_date = '20240331'") is None
+    assert sync_hot_columns(pg_engine) is None
+
+
+def test_sync_hot_columns_resumes_unfinished_backfill(pg_engine):
+    # 列已存在但没有注释: 上次回填中断
+    with pg_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO ods_finance_report (ts_code, end_date, report_type, update_flag, category, data)
+            VALUES ('A.SH', '20231231', '1', '0', 'income', '{"revenue": 100.0}')
+        """))
+        conn.execute(text("COMMENT ON COLUMN ods_finance_report.revenue IS NULL"))
+    assert "revenue" in sync_hot_columns(pg_engine)
+    assert _scalar(pg_engine, "SELECT revenue FROM ods_finance_report") == 100.0
+
+
+def test_partition_conversion_waits_for_refined_market_rows(pg_engine):
+    with pg_engine.begin() as conn:
+        conn.execute(text("DROP TABLE dws_market_indicators"))
+        conn.execute(text("""
+            CREATE TABLE dws_market_indicators (
+                ts_code VARCHAR(20), trade_date VARCHAR(8), close_qfq FLOAT, close_hfq FLOAT, adj_factor FLOAT,
+                PRIMARY KEY (ts_code, trade_date))
+        """))
+        conn.execute(text("INSERT INTO dws_market_indicators VALUES ('A.SH', '20240102', 10.0, NULL, NULL)"))
+    with pytest.raises(RuntimeError):
+        _partition_market_tables(pg_engine)
+    assert _scalar(pg_engine, "SELECT count(*) FROM dws_market_indicators WHERE close_qfq IS NOT NULL") == 1
+
+    # 重算后 (close_hfq 已写入) 才转换
+    with pg_engine.begin() as conn:
+        conn.execute(text("UPDATE dws_market_indicators SET close_hfq = 20.0, adj_factor = 2.0"))
+    assert "dws_market_indicators (1 行)" in _partition_market_tables(pg_engine)
+    assert _scalar(pg_engine, "SELECT relkind FROM pg_class WHERE oid = 'dws_market_indicators'::regclass") == "p"
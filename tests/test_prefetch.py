@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+
+# engine.prefetch 导入 ts_client (core.config 完整性检查)；测试只注入假的 fetch，不访问网络
+try:
+    from engine.prefetch import DayPrefetcher
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+DAYS = [f"202410{d:02d}" for d in range(8, 18)]
+
+
+class FakeFetch:
+    """按日期返回占位数据，记录抓取顺序；fail_on 指定的日期抛出异常"""
+
+    def __init__(self, fail_on=None, delay=0.0):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def __call__(self, date_str):
+        time.sleep(self.delay)
+        with self.lock:
+            self.fetched.append(date_str)
+        if date_str == self.fail_on:
+            raise RuntimeError(f"network down @ {date_str}")
+        return {"daily": date_str}
+
+
+def test_yields_days_in_input_order():
+    fetch = FakeFetch(delay=0.001)
+    with DayPrefetcher(DAYS, fetch=fetch) as days:
+        got = [(d, frames["daily"]) for d, frames in days]
+    assert got == [(d, d) for d in DAYS]
+    assert fetch.fetched == DAYS
+
+
+def test_stops_prefetching_after_error():
+    fetch = FakeFetch(fail_on=DAYS[3])
+    with DayPrefetcher(DAYS, fetch=fetch) as days:
+        got = list(days)
+    assert [d for d, _ in got] == DAYS[:4]
+    assert isinstance(got[-1][1], RuntimeError)
+    # 出错日之后的日期不再抓取 (后续日期依赖当日先落地)
+    assert fetch.fetched == DAYS[:4]
+
+
+def test_early_exit_bounds_prefetch_and_joins_thread():
+    fetch = FakeFetch()
+    prefetcher = DayPrefetcher(DAYS, fetch=fetch, depth=2)
+    with prefetcher as days:
+        for i, (date_str, _) in enumerate(days):
+            if i == 1:
+                time.sleep(0.05)  # 让生产者填满队列
+                break
+    assert not prefetcher.thread.is_alive()
+    # 已消费 2 天 + 队列深度 2 + 生产者手中等待入队的 1 天
+    assert len(fetch.fetched) <= 2 + 2 + 1
+
+
+def test_empty_range():
+    with DayPrefetcher([], fetch=FakeFetch()) as days:
+        assert list(days) == []
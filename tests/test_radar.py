@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# database.models 会触发 core.config 完整性检查 (RadarFrame 本身不访问数据库)
+try:
+    from engine.radar import RadarFrame
+except ValueError as e:  # core.config 完整性检查: 缺少 DB_URL / TS_TOKEN
+    pytest.skip(str(e), allow_module_level=True)
+
+
+def _snapshot(n=400, seed=11) -> pd.DataFrame:
+    """RADAR_LOAD_SQL 形状的随机快照，各因子含缺失值"""
+    rng = np.random.default_rng(seed)
+
+    def col(values, missing=0.1):
+        values = values.astype(float)
+        values[rng.random(n) < missing] = np.nan
+        return values
+
+    close = rng.uniform(5, 50, n)
+    return pd.DataFrame({
+        "ts_code": [f"{i:06d}.SZ" for i in range(n)],
+        "name": [f"股票{i}" for i in range(n)],
+        "industry": rng.choice(["银行", "白酒", "电力"], n),
+        "trade_date": "20241016",
+        "pe_ttm": col(rng.uniform(-10, 60, n)),
+        "pb": col(rng.uniform(0.3, 6, n)),
+        "total_mv": col(rng.uniform(1e5, 5e7, n)),
+        "close_qfq": col(close, 0.02),
+        "ma_20": col(close * rng.uniform(0.9, 1.1, n), 0.02),
+        "pct_chg": col(rng.uniform(-10, 10, n)),
+        "last_report": "20240630",
+        "roe": col(rng.uniform(-5, 35, n)),
+        "debt_to_assets": col(rng.uniform(5, 90, n)),
+        "ocf_to_net_profit": col(rng.uniform(0, 2, n)),
+        "toxic_asset_ratio": col(rng.uniform(0, 0.08, n)),
+        "goodwill_net_asset_ratio": col(rng.uniform(0, 0.4, n)),
+        "is_csi800": rng.random(n) < 0.6,
+        "in_watchlist": rng.random(n) < 0.1,
+    })
+
+
+def _legacy_filter(snap, min_roe, max_pe, max_pb, min_mv, max_debt, trend_up, pool) -> pd.DataFrame:
+    """原 RadarEngine.query 的 SQL 范围过滤 + pandas 多因子过滤"""
+    if pool == "CSI800":
+        df = snap[snap["is_csi800"]]
+    elif pool == "Watchlist":
+        df = snap[snap["in_watchlist"]]
+    else:
+        df = snap
+    df = df.drop(columns=["is_csi800", "in_watchlist"]).copy()
+    df["roe"] = df["roe"].fillna(0)
+    df["debt_to_assets"] = df["debt_to_assets"].fillna(0)
+    df["pe_ttm"] = df["pe_ttm"].fillna(999)
+    df["ocf_to_net_profit"] = df["ocf_to_net_profit"].fillna(0)
+    df["toxic_asset_ratio"] = df["toxic_asset_ratio"].fillna(0)
+    df["goodwill_net_asset_ratio"] = df["goodwill_net_asset_ratio"].fillna(0)
+    mask = (
+        (df["pe_ttm"] > 0) & (df["pe_ttm"] < max_pe) &
+        (df["pb"] < max_pb) &
+        (df["total_mv"] >= min_mv * 10000) &
+        (df["roe"] >= min_roe) &
+        (df["debt_to_assets"] <= max_debt) &
+        (df["ocf_to_net_profit"] >= 0.8) &
+        (df["toxic_asset_ratio"] < 0.05) &
+        (df["goodwill_net_asset_ratio"] < 0.25)
+    )
+    if trend_up:
+        mask = mask & (df["close_qfq"] > df["ma_20"])
+    return df[mask]
+
+
+@pytest.mark.parametrize("params", [
+    dict(min_roe=8.0, max_pe=30.0, max_pb=3.0, min_mv=100.0, max_debt=60.0, trend_up=True, pool="CSI800"),
+    dict(min_roe=0.0, max_pe=60.0, max_pb=6.0, min_mv=10.0, max_debt=90.0, trend_up=False, pool="All"),
+    dict(min_roe=5.0, max_pe=40.0, max_pb=5.0, min_mv=50.0, max_debt=80.0, trend_up=True, pool="Watchlist"),
+    dict(min_roe=15.0, max_pe=25.0, max_pb=2.0, min_mv=500.0, max_debt=50.0, trend_up=False, pool="CSI800"),
+])
+def test_mask_matches_legacy_sql_filter(params):
+    snap = _snapshot()
+    frame = RadarFrame(snap, version=1)
+    got = frame.display[frame.mask(**params)]
+    want = _legacy_filter(snap, **params)
+
+    assert len(got) > 0
+    assert set(got["ts_code"]) == set(want["ts_code"])
+    # 结果已按 ROE 降序
+    assert got["roe"].is_monotonic_decreasing
+
+
+def test_unknown_pool_selects_nothing_and_empty_snapshot():
+    frame = RadarFrame(_snapshot(50), version=1)
+    assert not frame.mask(0, 999, 99, 0, 100, False, "HS300").any()
+
+    empty = RadarFrame(_snapshot(0), version=1)
+    assert len(empty) == 0
+    assert empty.mask(0, 999, 99, 0, 100, False, "All").shape == (0,)
@@ -0,0 +1,73 @@
+import pytest
+from interface import rate_limiter
+from interface.rate_limiter import EndpointLimiter, TokenBucket
+
+
+class FakeClock:
+    """替换 time.monotonic / time.sleep: sleep 直接推进时钟并记录等待"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", c.sleep)
+    return c
+
+
+def test_capacity_and_refill_rate():
+    bucket = TokenBucket(200, burst=5)
+    assert bucket.capacity == 5
+    assert bucket.rate == pytest.approx((200 - 5) / 60)
+    # 突发容量不超过配额的一半
+    assert TokenBucket(10, burst=50).capacity == 5
+    with pytest.raises(ValueError):
+        TokenBucket(1)
+
+
+def test_burst_then_wait_for_refill(clock):
+    bucket = TokenBucket(65, burst=5)  # 每秒补充 1 个令牌
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+    # 空闲期间补充到容量上限为止
+    clock.now += 3600
+    bucket._refill(clock.now)
+    assert bucket.tokens == bucket.capacity
+
+
+def test_never_exceeds_quota_in_any_minute(clock):
+    calls_per_min = 130
+    bucket = TokenBucket(calls_per_min, burst=10)  # 每秒补充 2 个令牌 (二进制精确，避免浮点尾差)
+    stamps = []
+    for _ in range(400):
+        bucket.acquire()
+        stamps.append(clock.now)
+    for i, t in enumerate(stamps):
+        in_window = sum(1 for s in stamps[i:] if s < t + 60)
+        assert in_window <= calls_per_min
+
+
+def test_endpoint_limiter_uses_one_bucket_per_endpoint(clock):
+    limiter = EndpointLimiter(65, burst=2)
+    for _ in range(2):
+        limiter.acquire("daily")
+        limiter.acquire("income")
+    assert clock.sleeps == []  # 各接口的突发配额互不占用
+    limiter.acquire("daily")
+    assert len(clock.sleeps) == 1
+    assert set(limiter.buckets) == {"daily", "income"}
+    assert limiter.buckets["daily"] is not limiter.buckets["income"]
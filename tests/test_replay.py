@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from interface import replay
+from interface.replay import FixtureStore, RecordingPro, ReplayPro
+
+
+class FakeClock:
+    """替换 time.monotonic / time.sleep: sleep 直接推进时钟并记录等待"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(replay.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(replay.time, "sleep", c.sleep)
+    return c
+
+
+class RealPro:
+    """真实 pro 接口替身: 记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def daily(self, **params):
+        self.calls += 1
+        return pd.DataFrame({"ts_code": [params["ts_code"]], "trade_date": [params["trade_date"]], "close": [1500.0]})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FixtureStore(str(tmp_path))
+
+
+def test_record_then_replay_offline(store, clock):
+    real = RealPro()
+    recorded = RecordingPro(real, store).daily(ts_code="600519.SH", trade_date="20241016")
+
+    pro = ReplayPro(store)
+    # 参数顺序与空值不影响命中 (与响应缓存同一 key 规范)
+    got = pro.daily(trade_date="20241016", ts_code="600519.SH", fields=None)
+    pd.testing.assert_frame_equal(got, recorded)
+    assert real.calls == 1 and pro.misses == []
+
+
+def test_miss_returns_empty_frame_and_is_recorded(store, clock):
+    pro = ReplayPro(store)
+    got = pro.daily(ts_code="600519.SH", trade_date="20241017")
+    assert got.empty
+    assert pro.misses == [("daily", {"trade_date": "20241017", "ts_code": "600519.SH"})]
+
+
+def test_quota_per_endpoint_with_sliding_window(store, clock):
+    pro = ReplayPro(store, calls_per_min=2)
+    pro.daily(trade_date="20241016")
+    clock.now += 30
+    pro.daily(trade_date="20241017")
+    with pytest.raises(Exception, match="每分钟最多访问该接口2次"):
+        pro.daily(trade_date="20241018")
+    # 配额按接口独立计数
+    pro.adj_factor(trade_date="20241016")
+
+    # 窗口滑过第一次调用后恢复一个名额
+    clock.now += 30
+    pro.daily(trade_date="20241018")
+    with pytest.raises(Exception):
+        pro.daily(trade_date="20241019")
+
+
+def test_latency_and_private_attributes(store, clock):
+    pro = ReplayPro(store, latency_ms=250)
+    pro.daily(trade_date="20241016")
+    assert clock.sleeps == [0.25]
+    with pytest.raises(AttributeError):
+        pro._missing_attr
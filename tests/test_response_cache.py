@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+from interface import response_cache
+from interface.response_cache import ResponseCache, cache_ttl
+
+
+class Clock:
+    """可推移的时钟: 同时替换模块内的 datetime.now 与 time.time"""
+
+    def __init__(self, start: datetime):
+        self.now = start
+        clock = self
+
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.now
+
+        self.datetime = FrozenDatetime
+
+    def time(self):
+        return self.now.timestamp()
+
+    def advance(self, **delta):
+        self.now += timedelta(**delta)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock(datetime(2024, 10, 16, 18, 0))
+    monkeypatch.setattr(response_cache, "datetime", c.datetime)
+    monkeypatch.setattr(response_cache.time, "time", c.time)
+    return c
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path), 64 * 1024 * 1024)
+
+
+def _daily(trade_date):
+    return pd.DataFrame({"ts_code": ["600519.SH"], "trade_date": [trade_date], "close": [1500.0]})
+
+
+def test_empty_frame_is_never_cached(cache, clock):
+    params = {"trade_date": "20241016"}
+    cache.put("daily", params, pd.DataFrame(columns=["ts_code", "trade_date"]))
+    clock.advance(days=1)
+    assert cache.get("daily", params) is None
+
+
+def test_same_day_entry_stays_short_lived_after_date_moves_forward(cache, clock):
+    params = {"trade_date": "20241016"}
+    cache.put("daily", params, _daily("20241016"))
+    assert cache.get("daily", params) is not None
+
+    # 次日: 写入时决定的 TTL 已过期，不会因上界日期"已成历史"而变为永久
+    clock.advance(days=1)
+    assert cache.get("daily", params) is None
+
+
+def test_settled_market_entry_is_permanent(cache, clock):
+    params = {"trade_date": "20241010"}
+    cache.put("daily", params, _daily("20241010"))
+    clock.advance(days=30)
+    assert cache.get("daily", params) is not None
+
+
+def test_unsettled_finance_entry_does_not_become_permanent(cache, clock):
+    params = {"ts_code": "600519.SH", "period": "20240930"}
+    df = pd.DataFrame({"ts_code": ["600519.SH"], "end_date": ["20240930"], "revenue": [1.0]})
+    cache.put("income", params, df)
+    clock.advance(days=200)  # 已超过定型窗口，但条目是在窗口内抓取的
+    assert cache.get("income", params) is None
+
+
+def test_ttl_is_decided_by_fetch_date():
+    fetched = datetime(2024, 10, 16)
+    assert cache_ttl("daily", {"trade_date": "20241016"}, fetched) == 3600
+    assert cache_ttl("daily", {"trade_date": "20241015"}, fetched) == 3600  # 次日抓取仍未定型
+    assert cache_ttl("daily", {"trade_date": "20241014"}, fetched) is None
+    assert cache_ttl("income", {"period": "20240331"}, fetched) is None
+    assert cache_ttl("income", {"period": "20240630"}, fetched) == 12 * 3600
+    assert cache_ttl("daily", {"start_date": "20240101"}, fetched) == 3600
+    assert cache_ttl("unknown", {}, fetched) == 0
@@ -0,0 +1,67 @@
+import pandas as pd
+from sqlalchemy import text
+from engine.universe import UniverseSnapshot, load_universe, universe_version
+
+
+def _daily(codes):
+    return pd.DataFrame({"ts_code": codes, "close": range(len(codes))})
+
+
+def test_filter_keeps_only_pool_rows_in_order():
+    snap = UniverseSnapshot(["600519.SH", "000001.SZ"])
+    out = snap.filter(_daily(["000002.SZ", "600519.SH", "000001.SZ", "600519.SH"]))
+    assert out["ts_code"].tolist() == ["600519.SH", "000001.SZ", "600519.SH"]
+    assert out["close"].tolist() == [1, 2, 3]
+
+    # 自定义代码列
+    out = snap.filter(pd.DataFrame({"con_code": ["000001.SZ", "300750.SZ"]}), col="con_code")
+    assert out["con_code"].tolist() == ["000001.SZ"]
+
+
+def test_filter_empty_pool_or_frame():
+    df = _daily(["600519.SH"])
+    assert UniverseSnapshot([]).filter(df).empty
+    assert list(UniverseSnapshot([]).filter(df).columns) == ["ts_code", "close"]
+    assert UniverseSnapshot(["600519.SH"]).filter(df.iloc[0:0]).empty
+    assert UniverseSnapshot(["600519.SH"]).filter(None) is None
+
+
+def test_snapshot_container_protocol():
+    snap = UniverseSnapshot(["600519.SH", "000001.SZ", "600519.SH"])
+    assert len(snap) == 2 and "600519.SH" in snap and "000002.SZ" not in snap
+    assert list(snap) == ["000001.SZ", "600519.SH"]
+    assert snap.mask(["000002.SZ", "000001.SZ"]).tolist() == [False, True]
+
+
+# --- 版本指纹 (需要 PostgreSQL，见 conftest.pg_session) ---
+
+def _seed(db, csi800, watchlist):
+    db.execute(text("DELETE FROM stock_basic"))
+    db.execute(text("DELETE FROM watchlist"))
+    for code in ["600519.SH", "600036.SH", "000001.SZ", "000002.SZ"]:
+        db.execute(text("INSERT INTO stock_basic (ts_code, is_csi800) VALUES (:c, :m)"),
+                   {"c": code, "m": code in csi800})
+    for code in watchlist:
+        db.execute(text("INSERT INTO watchlist (ts_code) VALUES (:c)"), {"c": code})
+
+
+def test_version_changes_on_equal_size_swap(pg_session):
+    _seed(pg_session, csi800=["600519.SH", "600036.SH"], watchlist=["000001.SZ"])
+    before = universe_version(pg_session)
+    assert universe_version(pg_session) == before
+
+    # 指数调样等量换股: 数量不变，指纹必须变化
+    _seed(pg_session, csi800=["600519.SH", "000002.SZ"], watchlist=["000001.SZ"])
+    swapped = universe_version(pg_session)
+    assert swapped != before and swapped[1] == before[1]
+
+    # 自选池删一只加一只
+    _seed(pg_session, csi800=["600519.SH", "000002.SZ"], watchlist=["600036.SH"])
+    assert universe_version(pg_session)[1] != swapped[1]
+
+
+def test_load_universe_unions_csi800_and_watchlist(pg_session):
+    _seed(pg_session, csi800=["600519.SH", "600036.SH"], watchlist=["600036.SH", "000001.SZ"])
+    snap = load_universe(pg_session)
+    assert list(snap) == ["000001.SZ", "600036.SH", "600519.SH"]
+    assert snap.version == universe_version(pg_session)
@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# 路径设置
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import SessionLocal
+from engine.adjust import HFQ_PRICE_COLS
+from engine.updater import DataUpdater, MARKET_ENGINES
+
+
+def snapshot(db, codes) -> pd.DataFrame:
+    """读取指定标的的 DWS 行情结果 (用于交叉校验)"""
+    query = text("""
+        SELECT * FROM dws_market_indicators
+        WHERE ts_code = ANY(:codes)
+        ORDER BY ts_code, trade_date
+    """)
+    return pd.read_sql(query, db.bind, params={"codes": list(codes)})
+
+
+def run_benchmark(limit=None, rounds=1):
+    """
+    DWS 行情炼制引擎对比: 同一批标的依次以 pandas / sql 引擎全量重算，
+    记录耗时并校验两者结果的一致性
+    注意: 会覆盖所选标的的 dws_market_indicators (结果与日常炼制等价)
+    """
+    updater = DataUpdater()
+    db = SessionLocal()
+    try:
+        codes = sorted(updater._get_universe_pool())
+        if limit:
+            codes = codes[:limit]
+        if not codes:
+            print("⚠️ Universe 为空，请先同步股票列表与行情。")
+            return
+
+        print(f"\n⏱️ === DWS 行情炼制引擎基准测试: {len(codes)} 只 × {rounds} 轮 ===")
+        results = {}
+        for name, engine_cls in MARKET_ENGINES.items():
+            timings = []
+            for _ in range(rounds):
+                db.execute(text("DELETE FROM dws_market_indicators WHERE ts_code = ANY(:codes)"), {"codes": codes})
+                db.commit()
+                start = time.perf_counter()
+                stats = engine_cls(db).refine(codes, incremental=False)
+                timings.append(time.perf_counter() - start)
+            results[name] = snapshot(db, codes)
+            best = min(timings)
+            print(f"  - {name:<7}: 最佳 {best:.2f}s | 平均 {np.mean(timings):.2f}s | "
+                  f"{stats['rows']} 行 ({stats['rows'] / best:.0f} rows/s)")
+
+        # 交叉校验: 两个引擎的 HFQ 价格与均线应逐行一致
+        names = list(results)
+        base, other = results[names[0]], results[names[1]]
+        if len(base) != len(other):
+            print(f"  ❌ 行数不一致: {names[0]}={len(base)}, {names[1]}={len(other)}")
+            return
+        cols = [c for c in HFQ_PRICE_COLS + ['adj_factor'] if c in base.columns]
+        a = base[cols].to_numpy(dtype=float)
+        b = other[cols].to_numpy(dtype=float)
+        same_nan = np.array_equal(np.isnan(a), np.isnan(b))
+        max_diff = np.nanmax(np.abs(a - b)) if a.size else 0.0
+        status = "✅" if same_nan and max_diff < 1e-6 else "❌"
+        print(f"  {status} 结果校验: NULL 分布{'一致' if same_nan else '不一致'}，最大绝对误差 {max_diff:.2e}")
+    finally:
+        db.close()
+        updater.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DWS market engines (pandas vs sql)")
+    parser.add_argument("-n", "--limit", type=int, help="Only benchmark the first N universe stocks")
+    parser.add_argument("-r", "--rounds", type=int, default=1, help="Rounds per engine")
+    args = parser.parse_args()
+    run_benchmark(limit=args.limit, rounds=args.rounds)
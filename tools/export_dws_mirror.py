@@ -0,0 +1,48 @@
+import sys
+import os
+import argparse
+import time
+
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import SessionLocal
+from engine.dws_mirror import DWSMirror, MIRROR_TABLES, load_dws, read_manifest
+
+
+def export(tables, years=None):
+    db = SessionLocal()
+    try:
+        mirror = DWSMirror(db)
+        for table in tables:
+            start = time.perf_counter()
+            rows = mirror.rebuild(table, years)
+            print(f"✅ {table}: 导出 {rows} 行，耗时 {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+
+def show_status():
+    manifest = read_manifest()
+    if not manifest:
+        print("⚠️ 镜像尚未生成。")
+        return
+    for table, entry in manifest.items():
+        files = sum(len(v) for v in entry["years"].values())
+        print(f"📦 {table}: {len(entry['years'])} 个年份 / {files} 个文件，高水位 {entry['high_water']}，更新于 {entry.get('updated_at')}")
+        start = time.perf_counter()
+        df = load_dws(table)
+        print(f"   全量读取 {len(df)} 行，耗时 {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DWS 列式镜像 (Parquet) 重导与检查")
+    parser.add_argument("--table", choices=list(MIRROR_TABLES), help="只处理指定表 (默认全部)")
+    parser.add_argument("--years", type=int, nargs="*", help="只重导指定年份 (默认全部)")
+    parser.add_argument("--status", action="store_true", help="查看镜像状态并测试读取速度")
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    else:
+        export([args.table] if args.table else list(MIRROR_TABLES), args.years or None)
@@ -0,0 +1,52 @@
+import sys
+import os
+import argparse
+
+# 将项目根目录添加到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database.models import init_db, engine
+from database.migrate import MIGRATIONS, OFFLINE_MIGRATIONS, applied_versions
+
+
+def show_status():
+    done = applied_versions()
+    print("📋 结构迁移状态:")
+    for version, description, _ in sorted(MIGRATIONS):
+        mark = "✅" if version in done else "⏳"
+        tag = " [离线]" if version in OFFLINE_MIGRATIONS else ""
+        print(f"  {mark} #{version} {description}{tag}")
+
+
+def running_jobs() -> int:
+    """后台任务队列中正在运行的任务数 (离线迁移前检查)"""
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT to_regclass('job_queue') IS NOT NULL")).scalar():
+            return 0
+        return conn.execute(text("SELECT count(*) FROM job_queue WHERE status = 'running'")).scalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据库结构迁移 (保留数据，替代 reset_db 重建)")
+    parser.add_argument("--status", action="store_true", help="仅查看迁移状态，不执行")
+    parser.add_argument("--offline", action="store_true",
+                        help="同时执行离线迁移 (如行情表分区转换，会锁表，需停止同步任务)")
+    parser.add_argument("--force", action="store_true", help="离线迁移时忽略运行中任务检查")
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+    elif args.offline:
+        busy = running_jobs()
+        if busy and not args.force:
+            print(f"❌ 有 {busy} 个后台任务正在运行，请等待完成或停止服务后再执行离线迁移 (或加 --force)。")
+            sys.exit(1)
+        print("⚠️ 离线迁移会锁表直至完成，期间请勿启动同步任务。")
+        try:
+            init_db(offline=True)
+        except RuntimeError as e:
+            print(f"❌ 离线迁移中止: {e}")
+            sys.exit(1)
+    else:
+        init_db()
@@ -8,6 +8,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.models import SessionLocal, StockBasic, DWSMarketIndicators, DWSFinanceStd
 from core.mapping import FIELD_MAPPING
+from engine.adjust import hfq_to_qfq
+from engine.factors import evaluate
+
+# 行情表导出列 (前复权口径，与改存后复权前的 DWS 列一致；close_hfq / adj_factor 仅供内部换算，不导出)
+MARKET_EXPORT_COLS = ['ts_code', 'trade_date', 'pe_ttm', 'pb', 'total_mv', 'turnover_rate',
+                      'close_qfq', 'ma_20', 'ma_50', 'ma_120', 'ma_250', 'ma_850']
 
 class ReportFactory:
     def __init__(self, ts_code: str):
@@ -22,18 +28,10 @@ class ReportFactory:
         if df_f.empty:
             return df_f
         
-        # 1. 计算净现比 (经营现金流 / 归母净利润)
-        # 处理分母为0的情况
-        df_f['ocf_to_profit'] = df_f.apply(
-            lambda x: x['n_cashflow_act'] / x['n_income_attr_p'] if x['n_income_attr_p'] and x['n_income_attr_p'] != 0 else 0, 
-            axis=1
-        )
-        
-        # 2. 计算商誉占比 (商誉 / 总资产)
-        # 注意：此处需确保 DWSFinanceStd 包含 goodwill 和 total_assets
-        if 'goodwill' in df_f.columns and 'total_assets' in df_f.columns:
-            df_f['goodwill_to_assets'] = df_f['goodwill'] / df_f['total_assets']
-            
+        # 净现比 (经营现金流 / 归母净利润) 与 商誉占总资产比，分母为 0 时取 0
+        df_f['ocf_to_profit'] = evaluate(df_f, 'ocf_to_net_profit')
+        df_f['goodwill_to_assets'] = evaluate(df_f, 'goodwill_to_assets')
+
         return df_f
 
     def fetch_full_dataset(self):
@@ -48,6 +46,8 @@ class ReportFactory:
         # B. 提取 DWS 行情指标 (⚖️秤) [cite: 24]
         m_query = self.db.query(DWSMarketIndicators).filter(DWSMarketIndicators.ts_code == self.ts_code).statement
         df_m = pd.read_sql(m_query, self.db.bind).sort_values('trade_date', ascending=False)
+        # DWS 存后复权，导出时按最新复权因子换算为前复权，只保留前复权口径的列
+        df_m = hfq_to_qfq(df_m)[MARKET_EXPORT_COLS]
         
         return df_f, df_m
 
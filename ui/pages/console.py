@@ -1,27 +1,81 @@
 # FILE PATH: ui/pages/console.py
 
-from nicegui import ui
-from engine.updater import DataUpdater
 import asyncio
+from nicegui import ui, run
+from engine.jobs import JobQueue, JOB_TYPES, get_job_worker
 from datetime import datetime
 
+STATUS_ICONS = {"queued": "⏳ 排队", "running": "🔄 运行", "done": "✅ 完成", "failed": "❌ 失败", "cancelled": "🛑 取消"}
+
 class ConsolePage:
     def __init__(self):
-        self.updater = DataUpdater()
+        self.jobs = JobQueue()
+        # 数据库操作均在线程池中执行 (run.io_bound)；会话非线程安全，用锁保证同一时刻只有一个线程使用
+        self.db_lock = asyncio.Lock()
+        self.worker = get_job_worker()
         self.log_view = None
+        self.job_table = None
+        # 打开页面时回放最近 200 条日志，之后按序号增量推送
+        recent = self.worker.logs_since(0)[-200:]
+        self.log_cursor = recent[0][0] - 1 if recent else self.worker.seq
+
+    async def submit(self, job_type, **params):
+        """提交任务到队列 (同类同参数任务已在排队/运行时不重复提交)，params 透传给 DataUpdater 对应方法"""
+        async with self.db_lock:
+            job_id, created = await run.io_bound(self.jobs.submit, job_type, **params)
+        label = JOB_TYPES[job_type]['label']
+        if created:
+            ui.notify(f'已提交任务 #{job_id}: {label}', type='positive')
+        else:
+            ui.notify(f'{label} 已在队列中 (#{job_id})，未重复提交', type='warning')
+        await self.refresh()
+
+    async def cancel_selected(self):
+        if not self.job_table or not self.job_table.selected:
+            ui.notify('请先在任务列表中选择一个任务', type='warning')
+            return
+        job_id = self.job_table.selected[0]['id']
+        async with self.db_lock:
+            cancelled = await run.io_bound(self.jobs.request_cancel, job_id)
+        if cancelled:
+            ui.notify(f'已请求取消任务 #{job_id}', type='info')
+        else:
+            ui.notify(f'任务 #{job_id} 已结束，无需取消', type='warning')
+        await self.refresh()
+
+    async def close(self):
+        """页面断开时释放任务队列的数据库会话"""
+        async with self.db_lock:
+            await run.io_bound(self.jobs.close)
+
+    def _job_rows(self) -> list:
+        """任务列表行 (在线程池中执行: 查询及 ORM 属性加载都会访问数据库)"""
+        return [{
+            'id': j.id,
+            'job': JOB_TYPES.get(j.job_type, {}).get('label', j.job_type),
+            'status': STATUS_ICONS.get(j.status, j.status) + (' (取消中)' if j.cancel_requested and j.status == 'running' else ''),
+            'priority': j.priority,
+            'created': j.created_at.strftime('%m-%d %H:%M:%S') if j.created_at else '',
+            'duration': f"{j.duration:.0f}s" if j.duration is not None else
+                        (f"{(datetime.now() - j.started_at).total_seconds():.0f}s" if j.started_at else '-'),
+            'message': (j.message or '')[:80],
+        } for j in self.jobs.history(20)]
 
-    async def run_task(self, task_func):
-        """通用异步任务处理器"""
-        if self.log_view:
-            self.log_view.push(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 启动...")
-        try:
-            # 这里的 task_func 是 updater 中的生成器函数
-            for message in task_func():
-                self.log_view.push(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
-                # 强制 UI 刷新，防止日志堆积导致的浏览器卡顿
-                await asyncio.sleep(0.01)
-        except Exception as e:
-            self.log_view.push(f"❌ 运行异常: {str(e)}")
+    async def refresh(self):
+        """定时刷新: 增量推送日志 + 刷新任务列表 (读取放到线程池，不阻塞事件循环)"""
+        if self.db_lock.locked():
+            return  # 上一次刷新或提交尚未完成，跳过本轮
+        async with self.db_lock:
+            logs = await run.io_bound(self.worker.logs_since, self.log_cursor)
+            rows = await run.io_bound(self._job_rows) if self.job_table is not None else None
+
+        for seq, job_id, ts, message in logs:
+            self.log_view.push(f"[{ts.strftime('%H:%M:%S')}] #{job_id} {message}")
+            self.log_cursor = seq
+
+        if rows is not None:
+            self.job_table.rows = rows
+            self.job_table.update()
 
     def content(self):
         with ui.column().classes('w-full p-8 max-w-6xl mx-auto'):
@@ -35,31 +89,52 @@ class ConsolePage:
                 with ui.card().props('flat bordered').classes('p-6 flex-1 bg-white'):
                     ui.label('日常同步').classes('text-xs text-slate-400 uppercase tracking-widest')
                     ui.label('收盘数据补全').classes('text-lg font-medium mb-4')
-                    ui.button('一键日更', on_click=lambda: self.run_task(self.updater.run_daily_routine)) \
+                    ui.button('一键日更', on_click=lambda: self.submit('run_daily_routine')) \
                         .props('flat color=primary').classes('px-4 border border-slate-200')
 
                 # 磁贴 2: 元数据同步 (CSI800)
                 with ui.card().props('flat bordered').classes('p-6 flex-1 bg-white'):
                     ui.label('底座维护').classes('text-xs text-slate-400 uppercase tracking-widest')
                     ui.label('同步成分股').classes('text-lg font-medium mb-4')
-                    ui.button('同步 CSI800', on_click=lambda: self.run_task(self.updater.sync_stock_list)) \
+                    ui.button('同步 CSI800', on_click=lambda: self.submit('sync_stock_list')) \
                         .props('flat color=primary').classes('px-4 border border-slate-200')
 
                 # 磁贴 3: 初始化 (S5)
                 with ui.card().props('flat bordered').classes('p-6 flex-1 bg-white'):
                     ui.label('初始化').classes('text-xs text-slate-400 uppercase tracking-widest')
                     ui.label('核心池全回溯').classes('text-lg font-medium mb-4')
-                    ui.button('开始回溯', on_click=lambda: self.run_task(self.updater.run_full_backfill)) \
+                    # 默认断点续跑；勾选后忽略 sync_state 完成记录，全部标的重新回溯
+                    rerun = ui.checkbox('忽略断点重跑').props('dense').classes('text-xs text-slate-500 mb-2')
+                    ui.button('开始回溯', on_click=lambda: self.submit('run_full_backfill', **({'resume': False} if rerun.value else {}))) \
                         .props('flat color=primary').classes('px-4 border border-slate-200')
 
                 # 磁贴 4: 专项同步 (S1/S2) - 修正点
                 with ui.card().props('flat bordered').classes('p-6 flex-1 bg-white'):
                     ui.label('专项同步').classes('text-xs text-slate-400 uppercase tracking-widest')
                     ui.label('自选池深度同步').classes('text-lg font-medium mb-4')
-                    ui.button('立即同步自选池', on_click=lambda: self.run_task(self.updater.run_watchlist_backfill)) \
+                    ui.button('立即同步自选池', on_click=lambda: self.submit('run_watchlist_backfill')) \
                         .props('flat color=primary').classes('px-4 border border-slate-200')
 
+            # 任务队列 (优先级: 日更 > 成分股 > 自选池 > 全回溯；写入类任务互斥执行)
+            with ui.row().classes('w-full items-center mt-12 mb-2'):
+                ui.label('🗂️ 任务队列').classes('text-sm font-medium text-slate-500')
+                ui.space()
+                ui.button('取消选中任务', icon='cancel', on_click=self.cancel_selected) \
+                    .props('flat dense color=negative no-caps')
+            self.job_table = ui.table(columns=[
+                {'name': 'id', 'label': '#', 'field': 'id', 'align': 'left'},
+                {'name': 'job', 'label': '任务', 'field': 'job', 'align': 'left'},
+                {'name': 'status', 'label': '状态', 'field': 'status', 'align': 'left'},
+                {'name': 'priority', 'label': '优先级', 'field': 'priority'},
+                {'name': 'created', 'label': '提交时间', 'field': 'created'},
+                {'name': 'duration', 'label': '耗时', 'field': 'duration'},
+                {'name': 'message', 'label': '最近进度', 'field': 'message', 'align': 'left'},
+            ], rows=[], row_key='id', selection='single').props('flat dense').classes('w-full')
+
             # 极简日志区
             ui.label('📡 实时日志').classes('text-sm font-medium text-slate-500 mt-12 mb-2')
             with ui.card().props('flat').classes('w-full bg-slate-900 overflow-hidden rounded-lg'):
-                self.log_view = ui.log().classes('w-full h-80 text-emerald-400 font-mono text-[11px] p-6')
\ No newline at end of file
+                self.log_view = ui.log().classes('w-full h-80 text-emerald-400 font-mono text-[11px] p-6')
+
+            ui.timer(1.0, self.refresh)
+            ui.context.client.on_disconnect(self.close)
\ No newline at end of file
@@ -1,6 +1,6 @@
 # FILE PATH: ui/pages/radar.py
 from nicegui import ui
-from engine.radar import RadarEngine
+from engine.radar import RadarEngine, invalidate_radar_cache
 import pandas as pd
 import json
 import os
@@ -94,6 +94,7 @@ class RadarPage:
             )
             db.add(new_item)
             db.commit()
+            invalidate_radar_cache()  # Watchlist 范围随之变化
             ui.notify(f"🌟 已将 {name} 加入自选池", type='positive')
         except Exception as e:
             db.rollback()
@@ -3,6 +3,7 @@ from database.models import SessionLocal, Watchlist, StockBasic
 from core.mapping import FIELD_MAPPING
 from datetime import datetime
 from sqlalchemy import or_
+from engine.radar import invalidate_radar_cache
 
 class WatchlistPage:
     def __init__(self):
@@ -66,6 +67,7 @@ class WatchlistPage:
         )
         self.db.add(new_item)
         self.db.commit()
+        invalidate_radar_cache()
         ui.notify(f'✅ 已成功添加: {basic.name}', type='positive')
         self.update_grid()
 
@@ -136,6 +138,7 @@ class WatchlistPage:
         for row in selected:
             self.db.query(Watchlist).filter(Watchlist.ts_code == row['ts_code']).delete()
         self.db.commit()
+        invalidate_radar_cache()
         dialog.close()
         ui.notify(f'🗑️ 已成功移除所选标的', type='info')
         self.update_grid()